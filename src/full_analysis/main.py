@@ -2,7 +2,6 @@ import os
 import time
 import threading
 import subprocess
-import whisper
 import sys
 
 # Ensure project root is in python path
@@ -13,22 +12,21 @@ if PROJECT_ROOT not in sys.path:
 
 from src.ser.recorder import record_audio
 from src.ser.ser_engine import SEREngine
+from src.ser.emotion_aggregate import voice_timeline
 from src.faceexpression.classifier import analyze_openface_csv
-from src.text_emotion.analysis import analyze_text_emotion
+from src.text_emotion.analysis import analyze_text_emotion, text_emotion_timeline
+from src.stt.batch_transcriber import get_batch_transcriber, print_transcription_stats
 
 # CONFIG
 DATA_DIR = os.path.join(PROJECT_ROOT, "data", "recordings")
 PROCESSED_DIR = os.path.join(PROJECT_ROOT, "data", "processed")
 OPENFACE_DIR = os.path.join(PROJECT_ROOT, "external", "openface", "OpenFace_2.2.0_win_x64")
 OPENFACE_EXE = os.path.join(OPENFACE_DIR, "FeatureExtraction.exe")
-WHISPER_MODEL_DIR = os.path.join(PROJECT_ROOT, "external", "whisper")
 
 if not os.path.exists(DATA_DIR):
     os.makedirs(DATA_DIR)
 if not os.path.exists(PROCESSED_DIR):
     os.makedirs(PROCESSED_DIR)
-if not os.path.exists(WHISPER_MODEL_DIR):
-    os.makedirs(WHISPER_MODEL_DIR)
 
 def run_full_analysis():
     print("\n==========================================")
@@ -106,9 +104,16 @@ def run_full_analysis():
     # A. SER Analysis
     print("\n--- 🗣️ Voice Emotion Analysis ---")
     ser_result = "N/A"
+    voice_timeline_str = ""
     try:
         ser_engine = SEREngine() # Loads model
-        ser_result = ser_engine.predict_emotion(wav_path)
+        # Memory-mapped, 1 s windows in batches instead of one pass over the whole recording
+        ser_timeline = ser_engine.predict_emotion_timeline(wav_path)
+        voice_state = ser_timeline["voice_state"]
+        if voice_state["emotion"]:
+            ser_result = (f"{voice_state['emotion']} ({voice_state['confidence']:.2f}, "
+                          f"reliability {voice_state['reliability']:.2f})")
+            voice_timeline_str = voice_timeline(ser_timeline["times"], ser_timeline["probs"], ser_timeline["labels"])
         print(f"Detected Voice Emotion: {ser_result}")
     except Exception as e:
         print(f"SER Failed: {e}")
@@ -116,18 +121,24 @@ def run_full_analysis():
     # B. STT Analysis
     print("\n--- 📝 Speech-to-Text (Whisper) ---")
     stt_result = "N/A"
+    stt_segments = []
     try:
-        model = whisper.load_model("base", download_root=WHISPER_MODEL_DIR)
-        transcription = model.transcribe(wav_path)
+        transcription = get_batch_transcriber("base").transcribe_file(wav_path)
+        print_transcription_stats(transcription)
         stt_result = transcription["text"].strip()
+        stt_segments = transcription["segments"]
         print(f"Transcription: \"{stt_result}\"")
     except Exception as e:
         print(f"STT Failed: {e}")
 
     # B.2 Text Emotion Analysis
     text_emotion_result = "N/A"
+    text_timeline = ""
     if stt_result != "N/A":
-        te_res_list = analyze_text_emotion(stt_result)
+        if stt_segments:
+            te_res_list, text_timeline = text_emotion_timeline(stt_segments)
+        else:
+            te_res_list = analyze_text_emotion(stt_result)
         if te_res_list:
             text_emotion_result = ", ".join([f"{res['label']} ({res['score']:.2f})" for res in te_res_list])
             print(f"Detected Text Emotion: {text_emotion_result}")
@@ -157,6 +168,16 @@ def run_full_analysis():
     print(f"📝 Transcription  : \"{stt_result}\"")
     print("="*50)
     
+    if voice_timeline_str:
+        print("\n🗣️ Voice Emotion Timeline:")
+        print(voice_timeline_str)
+        print("="*50)
+
+    if text_timeline:
+        print("\n💭 Text Emotion Timeline:")
+        print(text_timeline)
+        print("="*50)
+
     if face_timeline:
         print("\n☺️ Face Expression Timeline:")
         print(face_timeline)
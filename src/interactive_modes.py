@@ -4,7 +4,6 @@ import time
 import datetime
 import subprocess
 import threading
-import numpy as np
 
 # Adjust SCRIPT_DIR to be the project root since this file is inside src/
 SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -15,27 +14,31 @@ if SCRIPT_DIR not in sys.path:
 
 try:
     from src.ser.ser_engine import SEREngine
+    from src.ser.emotion_aggregate import voice_timeline
 except ImportError as e:
     print(f"Warning: Could not import SER Engine: {e}")
     SEREngine = None
 
 try:
-    from src.ser.recorder import record_audio
+    from src.ser.recorder import record_audio, record_until_silence, open_trimmed_audio
 except ImportError as e:
     print(f"Warning: Could not import audio recorder: {e}")
     record_audio = None
+    record_until_silence = None
+    open_trimmed_audio = None
 
 try:
-    import whisper
+    from src.stt.batch_transcriber import get_batch_transcriber, print_transcription_stats
 except ImportError as e:
     print(f"Warning: Could not import Whisper: {e}")
-    whisper = None
+    get_batch_transcriber = None
 
 try:
-    from src.text_emotion.analysis import analyze_text_emotion, load_emotion_model
+    from src.text_emotion.analysis import analyze_text_emotion, load_emotion_model, text_emotion_timeline
 except ImportError as e:
     print(f"Warning: Could not import Text Emotion module: {e}")
     def analyze_text_emotion(text, threshold=0.1): return []
+    def text_emotion_timeline(segments, threshold=0.1): return [], ""
     def load_emotion_model(): return None
 
 try:
@@ -48,11 +51,11 @@ except ImportError as e:
 
 try:
     import sounddevice as sd
-    from scipy.io.wavfile import write as wav_write
+    import soundfile as sf
 except ImportError as e:
-    print(f"Warning: Could not import sounddevice/scipy: {e}")
+    print(f"Warning: Could not import sounddevice/soundfile: {e}")
     sd = None
-    wav_write = None
+    sf = None
 
 from src.streaming.unified_pipeline import build_text_state, process_and_print_unified_json
 
@@ -112,8 +115,9 @@ def run_text_emotion_input():
 def run_voice_combined_pipeline(wav_path=None):
     """
     Runs SER + Whisper STT + Text Emotion on audio.
-    If wav_path is None  → records a fresh 10-second clip first.
+    If wav_path is None  → records a fresh clip first (auto-stops once you stop speaking, 2–15 s).
     If wav_path is given → skips recording and reuses that file.
+    Leading/trailing silence is trimmed before analysis so the models only see speech.
     Returns (text_state, voice_state, stt_result, ser_result) for callers that need the data.
     """
     standalone = (wav_path is None)  # True when called directly from Option 2
@@ -130,13 +134,13 @@ def run_voice_combined_pipeline(wav_path=None):
     if not SEREngine:
         print("❌ SER Engine not available.")
         return "N/A", "N/A", "N/A"
-    if not whisper:
+    if not get_batch_transcriber:
         print("❌ Whisper not available.")
         return "N/A", "N/A", "N/A"
 
     # ── Step 1: Record Audio (only if no file was passed in) ──
     if wav_path is None:
-        if not record_audio:
+        if not record_until_silence:
             print("❌ Audio recorder not available.")
             return "N/A", "N/A", "N/A"
 
@@ -147,11 +151,11 @@ def run_voice_combined_pipeline(wav_path=None):
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
         wav_path = os.path.join(DATA_DIR, f"voice_analysis_{timestamp}.wav")
 
-        print(f"\n🎙️  Recording for 10 seconds...")
+        print(f"\n🎙️  Recording (stops automatically when you finish speaking, max 15 seconds)...")
         print("👉  Speak now!\n")
 
         try:
-            record_audio(duration=10, filename=wav_path)
+            record_until_silence(filename=wav_path, min_duration=2.0, max_duration=15.0)
         except Exception as e:
             print(f"❌ Recording failed: {e}")
             return "N/A", "N/A", "N/A"
@@ -162,25 +166,46 @@ def run_voice_combined_pipeline(wav_path=None):
         print(f"\n🔁 Reusing recorded audio: {wav_path}")
         print("-" * 50)
 
+    # ── Map once & trim silence (both models read the same speech-only region block by block) ──
+    audio = None
+    try:
+        audio, fs, offset = open_trimmed_audio(wav_path)
+        print(f"✂️  Analysing {len(audio) / fs:.1f}s of speech (trimmed from {offset:.1f}s in).")
+    except Exception as e:
+        print(f"⚠️  Could not load audio: {e}")
+
     # ── Step 2: SER ──
     ser_result = "N/A"
+    voice_state = None
     print("\n🧠 Running Speech Emotion Recognition...")
     try:
         engine = SEREngine()
-        ser_result = engine.predict_emotion(wav_path)
+        # 1 s windows in batches: a probability timeline plus aggregate label, confidence and reliability
+        if audio is not None:
+            ser_timeline = engine.predict_emotion_timeline(audio, fs=fs, offset=offset)
+        else:
+            ser_timeline = engine.predict_emotion_timeline(wav_path)
+        if ser_timeline["voice_state"]["emotion"]:
+            voice_state = ser_timeline["voice_state"]
+            ser_result = voice_state["emotion"]
+            print("\n🗣️ Voice Emotion Timeline:")
+            print(voice_timeline(ser_timeline["times"], ser_timeline["probs"], ser_timeline["labels"]).rstrip())
     except Exception as e:
         print(f"⚠️  SER failed: {e}")
 
     # ── Step 3: Whisper STT ──
     stt_result = "N/A"
+    stt_segments = []
     print("\n📖 Transcribing with Whisper...")
     try:
-        whisper_cache = os.path.join(SCRIPT_DIR, "external", "whisper")
-        if not os.path.exists(whisper_cache):
-            os.makedirs(whisper_cache)
-        model = whisper.load_model("base", download_root=whisper_cache)
-        transcription = model.transcribe(wav_path)
+        transcriber = get_batch_transcriber("base")
+        if audio is not None:
+            transcription = transcriber.transcribe(audio, offset=offset, fs=fs)
+        else:
+            transcription = transcriber.transcribe_file(wav_path)
+        print_transcription_stats(transcription)
         stt_result = transcription["text"].strip()
+        stt_segments = transcription["segments"]
     except Exception as e:
         print(f"⚠️  Transcription failed: {e}")
 
@@ -189,22 +214,18 @@ def run_voice_combined_pipeline(wav_path=None):
     if stt_result and stt_result != "N/A":
         print("\n💬 Analyzing Text Emotion...")
         try:
-            te_results = analyze_text_emotion(stt_result, threshold=0.05)
+            # One batched pass over the timestamped segments instead of one long sequence
+            if stt_segments:
+                te_results, text_timeline = text_emotion_timeline(stt_segments, threshold=0.05)
+                if text_timeline:
+                    print("\n💭 Text Emotion Timeline:")
+                    print(text_timeline.rstrip())
+            else:
+                te_results = analyze_text_emotion(stt_result, threshold=0.05)
             text_state = build_text_state(stt_result, te_results)
         except Exception as e:
             print(f"⚠️  Text emotion analysis failed: {e}")
 
-    voice_state = None
-    if ser_result and ser_result != "N/A":
-        voice_state = {
-            "source": "voice",
-            "emotion": ser_result,
-            "confidence": 0.8,
-            "average_emotion": ser_result,
-            "peak_emotion": ser_result,
-            "reliability": 1.0
-        }
-
     # ── Final Report (only when called standalone from Option 2) ──
     if standalone:
         process_and_print_unified_json(
@@ -237,13 +258,13 @@ def run_multimodal_recording():
     print("  • Speech-to-Text (Whisper)")
     print("  • Text Emotion (RoBERTa)")
 
-    if sd is None or wav_write is None:
-        print("❌ sounddevice / scipy not available. Cannot record audio.")
+    if sd is None or sf is None:
+        print("❌ sounddevice / soundfile not available. Cannot record audio.")
         return
     if not SEREngine:
         print("❌ SER Engine not available.")
         return
-    if not whisper:
+    if not get_batch_transcriber:
         print("❌ Whisper not available.")
         return
 
@@ -271,16 +292,18 @@ def run_multimodal_recording():
         face_available = True
 
     # ── Audio recording state ──
-    FS           = 16000
-    audio_chunks = []
-    stop_event   = threading.Event()
+    FS             = 16000
+    frames_written = [0]
+    stop_event     = threading.Event()
 
     def _audio_worker():
-        """Continuously records 0.5-second chunks until stop_event is set."""
-        with sd.InputStream(samplerate=FS, channels=1, dtype='int16') as stream:
+        """Continuously records 0.5-second chunks straight to disk until stop_event is set (constant memory)."""
+        with sf.SoundFile(wav_path, mode='w', samplerate=FS, channels=1, subtype='PCM_16') as out, \
+             sd.InputStream(samplerate=FS, channels=1, dtype='int16') as stream:
             while not stop_event.is_set():
                 chunk, _ = stream.read(FS // 2)   # 0.5 s chunks
-                audio_chunks.append(chunk.copy())
+                out.write(chunk)
+                frames_written[0] += len(chunk)
 
     # ── 1. Launch OpenFace (non-blocking) ──
     of_process = None
@@ -326,10 +349,8 @@ def run_multimodal_recording():
             of_process.kill()
         print("✅ OpenFace stopped.")
 
-    # ── 5. Save WAV ──
-    if audio_chunks:
-        audio_data = np.concatenate(audio_chunks, axis=0)
-        wav_write(wav_path, FS, audio_data)
+    # ── 5. WAV was written incrementally; the header is finalised when the writer closes ──
+    if frames_written[0] > 0:
         print(f"✅ Audio saved: {wav_path}")
     else:
         print("⚠️  No audio captured.")
@@ -0,0 +1,287 @@
+import os
+import sys
+import csv
+import glob
+import time
+import contextlib
+import multiprocessing
+from collections import deque
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+# Ensure project root is in python path
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from src.ser.emotion_aggregate import SER_LABELS
+from src.ser.ser_engine import SEREngine
+from src.ser.ser_backends import probe_signals
+from src.ser.recorder import load_trimmed_audio
+from src.streaming.resample import PolyphaseResampler
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+DATA_DIR = os.path.join(PROJECT_ROOT, "data", "recordings")
+COLUMNS = (["path", "emotion", "confidence"] + [f"p_{label.lower()}" for label in SER_LABELS]
+           + ["seconds", "analyzed_seconds", "offset", "error"])
+
+def _decode_clip(job):
+    """Worker process: memory-map, trim, downmix and resample one WAV to 16 kHz float32."""
+    path, max_seconds = job
+    try:
+        audio, fs, offset = load_trimmed_audio(path)
+        if fs != 16000:
+            audio = PolyphaseResampler(fs, 16000).process(audio).copy()
+        seconds = len(audio) / 16000
+        if max_seconds:
+            audio = audio[:int(max_seconds * 16000)]
+        return path, np.ascontiguousarray(audio, dtype=np.float32), offset, seconds, ""
+    except Exception as e:
+        return path, None, 0.0, 0.0, str(e)
+
+class ResultWriter:
+    def __init__(self, output_path, flush_rows=256):
+        """
+        Appends result rows to a Parquet file (one row group per flush) or, without pyarrow, a CSV file.
+        Rows reach the disk every flush_rows, so an interrupted run keeps what it scored.
+        """
+        if output_path.endswith(".parquet") and pa is None:
+            output_path = output_path[:-len(".parquet")] + ".csv"
+            print(f"⚠️ pyarrow not installed (pip install pyarrow); writing CSV instead: {output_path}")
+        self.output_path = output_path
+        self.flush_rows = flush_rows
+        self.rows = []
+        self.written = 0
+        self._parquet = None
+        self._csv_file = None
+        self._csv = None
+
+    def write(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        if self.output_path.endswith(".parquet"):
+            table = pa.Table.from_pylist(self.rows, schema=self._schema())
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.output_path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            if self._csv is None:
+                self._csv_file = open(self.output_path, "w", newline="", encoding="utf-8")
+                self._csv = csv.DictWriter(self._csv_file, fieldnames=COLUMNS)
+                self._csv.writeheader()
+            self._csv.writerows(self.rows)
+            self._csv_file.flush()
+        self.written += len(self.rows)
+        self.rows = []
+
+    def _schema(self):
+        fields = [(name, pa.string() if name in ("path", "emotion", "error") else pa.float32()) for name in COLUMNS]
+        return pa.schema(fields)
+
+    def close(self):
+        self.flush()
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._csv_file is not None:
+            self._csv_file.close()
+
+class BatchSER:
+    def __init__(self, backend="eager", workers=None, batch_size=16, max_batch_seconds=120.0,
+                 max_clip_seconds=30.0, prefetch_batches=4, max_padding=0.1):
+        """
+        Scores many recordings with the SER model: worker processes decode audio ahead of the model,
+        clips are bucketed by length and run as padded batches with attention masks.
+        - workers: decode processes (default: a quarter of the cores); the remaining cores run the model
+        - batch_size / max_batch_seconds: clips per batch, capped by total padded audio per batch
+        - max_clip_seconds: only the first N seconds of each (trimmed) clip are analysed (attention is O(T^2))
+        - prefetch_batches: decoded clips are sorted by length in pools of batch_size x prefetch_batches
+        - max_padding: largest share of a clip's row that may be padding. Padding is masked out of attention
+          and pooling, but wav2vec2-base normalizes its first conv layer over the whole row (GroupNorm),
+          so padded clips score slightly differently from the same clip alone (see padding_parity())
+        - backend: "eager", "int8" or "bf16". The ONNX export has no attention-mask input, so padded
+          batches cannot run on it and "onnx" is rejected rather than silently scored on eager PyTorch.
+        """
+        if backend == "onnx":
+            raise ValueError("BatchSER runs padded batches with an attention mask, which the ONNX export does not take; "
+                             "use the eager, int8 or bf16 backend")
+        cores = os.cpu_count() or 1
+        self.workers = workers or max(1, cores // 4)
+        self.batch_size = batch_size
+        self.max_batch_samples = int(max_batch_seconds * 16000)
+        self.max_clip_seconds = max_clip_seconds
+        self.pool_size = batch_size * prefetch_batches
+        self.max_padding = max_padding
+        torch.set_num_threads(max(1, cores - self.workers))
+        self.engine = SEREngine(backend=backend)
+
+    def _batches(self, clips):
+        """Length-sorted batches from a pool of decoded clips, bounded by batch_size and padded samples."""
+        clips = sorted(clips, key=lambda clip: len(clip[1]))
+        batch = []
+        for clip in clips:
+            longest = max(len(clip[1]), 1)  # sorted ascending: the new clip is the longest so far
+            if batch and (len(batch) >= self.batch_size or longest * (len(batch) + 1) > self.max_batch_samples
+                          or len(batch[0][1]) < (1.0 - self.max_padding) * longest):
+                yield batch
+                batch = []
+            batch.append(clip)
+        if batch:
+            yield batch
+
+    def _classify(self, batch):
+        return self._classify_padded([audio for _, audio, _, _ in batch])
+
+    def _classify_padded(self, clips):
+        """
+        Class probabilities (Batch, 4) for float32 clips of any lengths, run as one zero-padded batch.
+        classify_batch only passes wav_lens to the pooling, so the padding would leak into the waveform
+        normalization and the attention; this is the wav2vec2 wrapper's forward with per-clip statistics
+        and an attention mask instead.
+        """
+        model = self.engine.classifier
+        eager = getattr(model, "classifier", model)  # int8/bf16/onnx backends wrap the eager classifier
+        wrapper = getattr(model, "wav2vec2", eager.mods.wav2vec2)
+        output_mlp = getattr(model, "output_mlp", eager.mods.output_mlp)
+        autocast_dtype = getattr(model, "autocast_dtype", None)
+        precision = torch.autocast("cpu", dtype=autocast_dtype) if autocast_dtype is not None else contextlib.nullcontext()
+
+        lengths = torch.tensor([len(audio) for audio in clips])
+        wavs = torch.zeros(len(clips), int(lengths.max()))
+        for i, audio in enumerate(clips):
+            clip = torch.from_numpy(audio)
+            wavs[i, :len(audio)] = F.layer_norm(clip, clip.shape) if wrapper.normalize_wav else clip
+        attention_mask = (torch.arange(wavs.shape[1])[None, :] < lengths[:, None]).long()
+
+        with torch.inference_mode(), precision:
+            hidden = wrapper.model(wavs, attention_mask=attention_mask).last_hidden_state
+            frames = wrapper.model._get_feat_extract_output_lengths(lengths).clamp(min=1, max=hidden.shape[1])
+            if wrapper.output_norm:
+                hidden = hidden.clone()
+                for i, n in enumerate(frames.tolist()):
+                    hidden[i, :n] = F.layer_norm(hidden[i, :n], hidden[i, :n].shape)
+            pooled = eager.mods.avg_pool(hidden, frames.float() / hidden.shape[1])
+            out_prob = eager.hparams.softmax(output_mlp(pooled.view(pooled.shape[0], -1)).float())
+        if out_prob.dim() == 3:
+            out_prob = out_prob.squeeze(1)
+        return torch.softmax(out_prob, dim=1).numpy()
+
+    def padding_parity(self, longest_seconds=3.0, count=4):
+        """
+        Largest class-probability difference between clips scored in one padded batch and the same clips
+        scored one at a time, for lengths spread over the range one batch may hold (see max_padding).
+        """
+        probe = probe_signals(count=count, seconds=longest_seconds).numpy()
+        lengths = np.linspace((1.0 - self.max_padding) * probe.shape[1], probe.shape[1], count).astype(int)
+        clips = [probe[i, :n] for i, n in enumerate(lengths)]
+        batched = self._classify_padded(clips)
+        single = np.concatenate([self._classify_padded([clip]) for clip in clips])
+        return float(np.abs(batched - single).max())
+
+    def _rows(self, batch):
+        probs = self._classify(batch)
+        # probs columns follow the classifier's output order; the file columns keep a fixed SER_LABELS order
+        labels = self.engine.labels
+        for (path, audio, offset, seconds), p in zip(batch, probs):
+            idx = int(np.argmax(p))
+            row = {"path": path, "emotion": str(labels[idx]), "confidence": float(p[idx]),
+                   "seconds": seconds, "analyzed_seconds": len(audio) / 16000, "offset": offset, "error": ""}
+            row.update({f"p_{label.lower()}": float(v) for label, v in zip(labels, p)})
+            yield row
+
+    def score(self, paths, writer):
+        """Scores every path into writer (a ResultWriter). Returns throughput stats."""
+        start_time = time.perf_counter()
+        stats = {"files": 0, "failed": 0, "audio_seconds": 0.0, "model_seconds": 0.0}
+        pending = []
+
+        def run_pool(clips):
+            for batch in self._batches(clips):
+                model_start = time.perf_counter()
+                rows = list(self._rows(batch))
+                stats["model_seconds"] += time.perf_counter() - model_start
+                for row in rows:
+                    writer.write(row)
+                    stats["files"] += 1
+                    stats["audio_seconds"] += row["analyzed_seconds"]
+
+        # Decoding runs ahead of the model by at most two pools of clips, so memory stays bounded
+        jobs = iter(paths)
+        in_flight = deque()
+        with multiprocessing.Pool(self.workers) as pool:
+            while True:
+                while len(in_flight) < 2 * self.pool_size:
+                    path = next(jobs, None)
+                    if path is None:
+                        break
+                    in_flight.append(pool.apply_async(_decode_clip, ((path, self.max_clip_seconds),)))
+                if not in_flight:
+                    break
+                path, audio, offset, seconds, error = in_flight.popleft().get()
+                if audio is None or len(audio) == 0:
+                    stats["failed"] += 1
+                    writer.write(dict({name: None for name in COLUMNS}, path=path, error=error or "empty audio"))
+                    continue
+                pending.append((path, audio, offset, seconds))
+                if len(pending) >= self.pool_size:
+                    run_pool(pending)
+                    pending = []
+        run_pool(pending)
+        writer.flush()
+
+        stats["wall_seconds"] = time.perf_counter() - start_time
+        stats["files_per_second"] = stats["files"] / stats["wall_seconds"] if stats["wall_seconds"] else 0.0
+        stats["realtime_factor"] = stats["audio_seconds"] / stats["wall_seconds"] if stats["wall_seconds"] else 0.0
+        return stats
+
+def print_batch_stats(stats):
+    print(f"⚡ Scored {stats['files']} file(s) ({stats['failed']} failed) in {stats['wall_seconds']:.1f}s: "
+          f"{stats['files_per_second']:.2f} files/s, {stats['realtime_factor']:.1f}x real time "
+          f"(model busy {stats['model_seconds']:.1f}s)")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Batch speech emotion recognition over a directory of recordings.")
+    parser.add_argument("inputs", nargs="*", default=[DATA_DIR], help="WAV files or directories (default: data/recordings)")
+    parser.add_argument("--output", default="ser_results.parquet", help="Output .parquet (needs pyarrow) or .csv")
+    parser.add_argument("--backend", default="eager", choices=["eager", "int8", "bf16"],
+                        help="SER backend (default: eager); onnx has no attention mask for padded batches")
+    parser.add_argument("--workers", type=int, default=None, help="Decode processes (default: a quarter of the cores)")
+    parser.add_argument("--batch-size", type=int, default=16, help="Clips per batch (default: 16)")
+    parser.add_argument("--max-seconds", type=float, default=30.0, help="Seconds analysed per clip, 0 = all (default: 30)")
+    args = parser.parse_args()
+
+    paths = []
+    for entry in args.inputs:
+        if os.path.isdir(entry):
+            paths += sorted(glob.glob(os.path.join(entry, "**", "*.wav"), recursive=True))
+        else:
+            paths.append(entry)
+    if not paths:
+        print("❌ No WAV files found.")
+        sys.exit(1)
+
+    print(f"🎧 Scoring {len(paths)} recording(s)...")
+    scorer = BatchSER(backend=args.backend, workers=args.workers, batch_size=args.batch_size,
+                      max_clip_seconds=args.max_seconds)
+    print(f"🔬 Padded vs single-clip scoring: max prob diff {scorer.padding_parity():.3f}")
+    writer = ResultWriter(args.output)
+    try:
+        stats = scorer.score(paths, writer)
+    finally:
+        writer.close()
+    print_batch_stats(stats)
+    print(f"💾 Results: {writer.output_path} ({writer.written} rows)")
@@ -0,0 +1,107 @@
+import numpy as np
+
+# Display names of the SpeechBrain IEMOCAP classifier's label codes
+LABEL_NAMES = {'ang': 'Angry', 'hap': 'Happy', 'neu': 'Neutral', 'sad': 'Sad'}
+# Output order of the classifier as published (ang, hap, neu, sad); classifier_labels() reads the actual one
+SER_LABELS = np.array(['Angry', 'Happy', 'Neutral', 'Sad'])
+
+def classifier_labels(classifier):
+    """Display names in the classifier's output order, read from its label encoder (ind2lab)."""
+    encoder = getattr(classifier, "classifier", classifier).hparams.label_encoder
+    return np.array([LABEL_NAMES.get(encoder.ind2lab[i], encoder.ind2lab[i]) for i in range(len(encoder.ind2lab))])
+
+def _neutral_index(labels):
+    matches = np.flatnonzero(np.asarray(labels) == 'Neutral')
+    return int(matches[0]) if len(matches) else -1
+
+def empty_voice_state():
+    return {
+        "source": "voice", "emotion": None, "confidence": 0.0,
+        "reliability": 0.0, "peak_emotion": None, "average_emotion": None
+    }
+
+def aggregate_emotions(probs, energy_score=1.0, labels=SER_LABELS):
+    """
+    Peak + Average hybrid over per-window class probabilities, vectorized over all windows.
+
+    Args:
+        probs (np.ndarray): (num_windows, classes) softmax probabilities in `labels` order.
+        energy_score (float): 0..1 loudness score that feeds the reliability.
+        labels (np.ndarray): Class names in output order (SEREngine.labels).
+
+    Returns:
+        dict: voice state (emotion, confidence, average_emotion, peak_emotion, reliability).
+    """
+    probs = np.asarray(probs, dtype=np.float32)
+    if probs.ndim != 2 or len(probs) == 0:
+        return empty_voice_state()
+    labels = np.asarray(labels)
+    neutral = _neutral_index(labels)
+
+    # 1. Average emotion, with anti-neutral logic: a weak Neutral average yields to the runner-up
+    avg_probs = probs.mean(axis=0)
+    avg_order = np.argsort(-avg_probs)[:2]
+    avg_top = avg_probs[avg_order]
+    avg_idx, avg_conf = int(avg_order[0]), float(avg_top[0])
+    if avg_idx == neutral and avg_conf < 0.60:
+        avg_idx, avg_conf = int(avg_order[1]), float(avg_top[1])
+
+    # 2. Peak emotion: the strongest non-neutral spike across windows. Each window offers its top class
+    # if non-neutral, or its runner-up when a weak Neutral (< 0.60) is on top.
+    order = np.argsort(-probs, axis=1)[:, :2]
+    top_p = np.take_along_axis(probs, order, axis=1)
+    top_is_neutral = order[:, 0] == neutral
+    cand_idx = np.where(top_is_neutral, order[:, 1], order[:, 0])
+    cand_conf = np.where(top_is_neutral, top_p[:, 1], top_p[:, 0])
+    valid = ~top_is_neutral | (top_p[:, 0] < 0.60)
+    cand_conf = np.where(valid, cand_conf, 0.0)
+
+    best = int(np.argmax(cand_conf))
+    if cand_conf[best] > 0.0:
+        peak_idx, peak_conf = int(cand_idx[best]), float(cand_conf[best])
+    else:
+        # Fallback if no non-neutral spikes found
+        peak_idx, peak_conf = avg_idx, avg_conf
+
+    # 3. Hybrid fusion
+    final_idx = peak_idx
+    final_conf = (0.6 * avg_conf) + (0.4 * peak_conf)
+    if peak_idx != avg_idx:
+        if avg_idx == neutral and peak_conf > 0.5:
+            # A strong non-neutral peak beats a neutral average, with a small decay (it was only a peak)
+            final_idx, final_conf = peak_idx, peak_conf * 0.9
+        else:
+            # Let average win if multiple non-neutral emotions conflict
+            final_idx, final_conf = avg_idx, avg_conf
+
+    # 4. Reliability: loud speech with a clear top-2 spread in the average is fully reliable
+    spread_score = min(1.0, float(avg_top[0] - avg_top[1]) * 2.0)
+    reliability = (0.5 * energy_score) + (0.5 * spread_score)
+
+    return {
+        "source": "voice",
+        "emotion": str(labels[final_idx]),
+        "confidence": final_conf,
+        "average_emotion": str(labels[avg_idx]),
+        "peak_emotion": str(labels[peak_idx]),
+        "reliability": reliability
+    }
+
+def voice_timeline(times, probs, labels=SER_LABELS):
+    """
+    Timeline in the face timeline format ("0.00s – 3.20s : Angry") from per-window (start, end) times
+    and probabilities in `labels` order, with consecutive windows of the same top emotion merged.
+    """
+    if len(probs) == 0:
+        return ""
+    times = np.asarray(times, dtype=np.float64)
+    # Overlapping windows (hop < window) hand over at the next window's start
+    ends = np.minimum(times[:, 1], np.append(times[1:, 0], np.inf))
+    timeline = []
+    for start, end, idx in zip(times[:, 0], ends, np.argmax(probs, axis=1)):
+        label = str(labels[idx])
+        if timeline and timeline[-1][2] == label:
+            timeline[-1][1] = end
+        else:
+            timeline.append([start, end, label])
+    return "".join(f"{start:.2f}s – {end:.2f}s : {label}\n" for start, end, label in timeline)
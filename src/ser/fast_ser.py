@@ -0,0 +1,269 @@
+import os
+import sys
+import glob
+import time
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import torch
+import torch.nn.functional as F
+
+# Ensure project root is in python path
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from src.ser.emotion_aggregate import SER_LABELS, classifier_labels
+from src.ser.recorder import load_trimmed_audio
+from src.streaming.resample import PolyphaseResampler
+
+HEAD_DIR = os.path.join(PROJECT_ROOT, "external", "ser-fast")
+
+# Folder names accepted for each class by the evaluation tool (IEMOCAP codes or full names)
+LABEL_ALIASES = {"ang": "Angry", "angry": "Angry", "anger": "Angry", "hap": "Happy", "happy": "Happy",
+                 "happiness": "Happy", "exc": "Happy", "neu": "Neutral", "neutral": "Neutral",
+                 "sad": "Sad", "sadness": "Sad"}
+
+def head_path(num_layers):
+    return os.path.join(HEAD_DIR, f"head_{num_layers}_layers.pt")
+
+class PooledHead(torch.nn.Module):
+    def __init__(self, dim, num_classes=len(SER_LABELS)):
+        """Multinomial logistic regression on standardized mean-pooled encoder states."""
+        super().__init__()
+        self.register_buffer("mean", torch.zeros(dim))
+        self.register_buffer("std", torch.ones(dim))
+        self.linear = torch.nn.Linear(dim, num_classes)
+
+    def forward(self, pooled):
+        return self.linear((pooled - self.mean) / self.std)
+
+    def fit(self, features, labels, weight_decay=1e-3, max_iter=200):
+        """Fits on (N, dim) pooled features and integer labels with L-BFGS (full batch, L2-regularized)."""
+        features = torch.as_tensor(features, dtype=torch.float32)
+        labels = torch.as_tensor(labels, dtype=torch.long)
+        self.mean.copy_(features.mean(dim=0))
+        self.std.copy_(features.std(dim=0).clamp(min=1e-5))
+        optimizer = torch.optim.LBFGS(self.linear.parameters(), max_iter=max_iter, line_search_fn="strong_wolfe")
+
+        def closure():
+            optimizer.zero_grad()
+            loss = F.cross_entropy(self(features), labels) + weight_decay * self.linear.weight.pow(2).sum()
+            loss.backward()
+            return loss
+
+        optimizer.step(closure)
+        return self.eval()
+
+class TruncatedSER:
+    def __init__(self, classifier, num_layers, head=None):
+        """
+        classify_batch() that runs only the first num_layers transformer layers of wav2vec2.
+        - classifier: eager SpeechBrain classifier, or an int8 module backend from ser_backends
+        - head: PooledHead fitted on this depth (see fit_heads); None = the original output MLP,
+                which expects last-layer states and is only sensible when num_layers is the full depth
+        """
+        self.classifier = getattr(classifier, "classifier", classifier)
+        self.wav2vec2 = getattr(classifier, "wav2vec2", self.classifier.mods.wav2vec2)
+        self.model = self.wav2vec2.model
+        self.num_layers = min(num_layers, len(self.model.encoder.layers))
+        self.output_mlp = head if head is not None else getattr(classifier, "output_mlp", self.classifier.mods.output_mlp)
+        self.name = f"fast-{self.num_layers}"
+
+    def pooled_states(self, wavs, wav_lens=None, all_layers=False):
+        """
+        Mean-pooled encoder states (Batch, dim) after num_layers layers, or, with all_layers,
+        a list with the pooled states after every layer up to num_layers (one forward pass).
+        """
+        wavs = wavs.float()
+        if self.wav2vec2.normalize_wav:
+            wavs = F.layer_norm(wavs, wavs.shape[1:])
+        with torch.inference_mode():
+            hidden = self.model.feature_extractor(wavs).transpose(1, 2)
+            hidden = self.model.feature_projection(hidden)
+            if isinstance(hidden, tuple):
+                hidden = hidden[0]
+        return self.pool_encoder(hidden, wav_lens, all_layers)
+
+    def pool_encoder(self, hidden, wav_lens=None, all_layers=False):
+        """pooled_states() from projected CNN features (Batch, frames, dim), e.g. from Wav2Vec2FeatureCache."""
+        if wav_lens is None:
+            wav_lens = torch.ones(hidden.shape[0])
+        encoder = self.model.encoder
+        stable_layer_norm = getattr(self.model.config, "do_stable_layer_norm", False)
+        with torch.inference_mode():
+            hidden = hidden + encoder.pos_conv_embed(hidden)
+            if not stable_layer_norm:
+                hidden = encoder.layer_norm(hidden)
+
+            pooled = []
+            for i, layer in enumerate(encoder.layers[:self.num_layers]):
+                hidden = layer(hidden)
+                if isinstance(hidden, tuple):
+                    hidden = hidden[0]
+                if all_layers or i == self.num_layers - 1:
+                    pooled.append(self._pool(encoder.layer_norm(hidden) if stable_layer_norm else hidden, wav_lens))
+        return pooled if all_layers else pooled[-1]
+
+    def _pool(self, hidden, wav_lens):
+        if self.wav2vec2.output_norm:
+            hidden = F.layer_norm(hidden, hidden.shape[1:])
+        pooled = self.classifier.mods.avg_pool(hidden, wav_lens)
+        return pooled.view(pooled.shape[0], -1)
+
+    def classify_batch(self, wavs, wav_lens=None):
+        """Same contract as CustomEncoderWav2vec2Classifier.classify_batch: (out_prob, score, index, text_lab)."""
+        pooled = self.pooled_states(wavs, wav_lens)
+        with torch.inference_mode():
+            out_prob = self.classifier.hparams.softmax(self.output_mlp(pooled))
+        score, index = torch.max(out_prob, dim=-1)
+        text_lab = self.classifier.hparams.label_encoder.decode_torch(index)
+        return out_prob, score, index, text_lab
+
+def load_fast_classifier(classifier, num_layers):
+    """TruncatedSER with the head fitted for num_layers, or the unchanged classifier if none was fitted."""
+    path = head_path(num_layers)
+    if not os.path.exists(path):
+        print(f"⚠️ No fast SER head for {num_layers} layers ({path}); run src/ser/fast_ser.py on a labelled folder "
+              f"first. Using the full model.")
+        return classifier
+    state = torch.load(path, map_location="cpu")
+    head = PooledHead(state["linear.weight"].shape[1])
+    head.load_state_dict(state)
+    return TruncatedSER(classifier, num_layers, head=head.eval())
+
+def load_labelled_folder(root, max_seconds=8.0, class_names=SER_LABELS):
+    """
+    Clips from root/<label>/*.wav as (16 kHz float32 audio, index into class_names); unknown folder names
+    are skipped. Pass the classifier's order (classifier_labels) when the indices are compared with its outputs.
+    """
+    class_names = list(class_names)
+    clips = []
+    for folder in sorted(os.listdir(root)):
+        name = LABEL_ALIASES.get(folder.lower())
+        if name not in class_names or not os.path.isdir(os.path.join(root, folder)):
+            continue
+        label = class_names.index(name)
+        for path in sorted(glob.glob(os.path.join(root, folder, "*.wav"))):
+            audio, fs, _ = load_trimmed_audio(path)
+            if fs != 16000:
+                audio = PolyphaseResampler(fs, 16000).process(audio).copy()
+            clips.append((audio[:int(max_seconds * 16000)], label))
+    return clips
+
+def clip_windows(clips, seconds=1.0, fs=16000):
+    """
+    Non-overlapping windows of every clip, the unit StreamingSER classifies; clips shorter than one window give none.
+
+    Returns:
+        (np.ndarray, np.ndarray, np.ndarray): windows (N, samples), their labels (N,) and clip indices (N,).
+    """
+    size = int(seconds * fs)
+    windows, labels, owners = [], [], []
+    for i, (audio, label) in enumerate(clips):
+        if len(audio) < size:
+            continue
+        clip = sliding_window_view(audio, size)[::size]
+        windows.append(clip)
+        labels += [label] * len(clip)
+        owners += [i] * len(clip)
+    if not windows:
+        return np.zeros((0, size), dtype=np.float32), np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    return np.concatenate(windows), np.array(labels), np.array(owners)
+
+def stratified_split(labels, test_fraction=0.25, seed=0):
+    """Boolean test mask holding out test_fraction of each class (at least one item), so every class is in both halves."""
+    rng = np.random.default_rng(seed)
+    test = np.zeros(len(labels), dtype=bool)
+    for label in np.unique(labels):
+        members = rng.permutation(np.flatnonzero(labels == label))
+        test[members[:max(1, int(round(len(members) * test_fraction)))]] = True
+    return test
+
+def extract_layer_features(classifier, windows, max_layers, batch_size=16):
+    """Pooled states after each of the first max_layers layers for every window: list of (N, dim) arrays."""
+    truncated = TruncatedSER(classifier, max_layers)
+    per_layer = [[] for _ in range(truncated.num_layers)]
+    for start in range(0, len(windows), batch_size):
+        batch = torch.from_numpy(np.ascontiguousarray(windows[start:start + batch_size]))
+        for i, states in enumerate(truncated.pooled_states(batch, all_layers=True)):
+            per_layer[i].append(states.numpy())
+    return [np.concatenate(states) for states in per_layer]
+
+def predict_windows(model, windows, batch_size=16):
+    """Top class index per window from classify_batch, in batches of equal-length windows (no padding)."""
+    predictions = []
+    for start in range(0, len(windows), batch_size):
+        out_prob, _, _, _ = model.classify_batch(torch.from_numpy(np.ascontiguousarray(windows[start:start + batch_size])))
+        predictions.append(out_prob.reshape(-1, out_prob.shape[-1]).argmax(dim=-1).numpy())
+    return np.concatenate(predictions)
+
+def window_latency(model, repeats=5, seconds=1.0):
+    """Median seconds of one classify_batch call on a single window (the per-turn unit in StreamingSER)."""
+    wav = torch.from_numpy(np.random.default_rng(0).standard_normal((1, int(seconds * 16000))).astype(np.float32) * 0.05)
+    model.classify_batch(wav)  # warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.classify_batch(wav)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+def fit_heads(classifier, root, layer_counts, test_fraction=0.25, seed=0, save=True):
+    """
+    Fits a PooledHead per layer count on root/<label>/*.wav and measures held-out accuracy and window latency,
+    next to the full model's. Heads are fitted and scored on the 1 s windows StreamingSER classifies, with the
+    train/test split made by clip so windows of one recording never land on both sides.
+    Returns rows {layers, accuracy, latency_seconds}; the full model has layers=None.
+    """
+    # Labels in the classifier's output order: the full model is scored against them and the heads replace its MLP
+    clips = [clip for clip in load_labelled_folder(root, class_names=classifier_labels(classifier)) if len(clip[0]) >= 16000]
+    if len(clips) < 8:
+        raise ValueError(f"Need at least 8 labelled clips of 1 s or longer under {root} (found {len(clips)})")
+    test_clips = stratified_split(np.array([label for _, label in clips]), test_fraction, seed)
+    windows, labels, owners = clip_windows(clips)
+    test = test_clips[owners]
+    print(f"🗂️ {len(clips)} clips, {len(windows)} windows ({int((~test).sum())} train / {int(test.sum())} test)")
+
+    rows = [{"layers": None, "accuracy": float(np.mean(predict_windows(classifier, windows[test]) == labels[test])),
+             "latency_seconds": window_latency(classifier)}]
+
+    features = extract_layer_features(classifier, windows, max(layer_counts))
+    for n in sorted(set(layer_counts)):
+        if n > len(features):
+            continue
+        layer_features = features[n - 1]
+        head = PooledHead(layer_features.shape[1]).fit(layer_features[~test], labels[~test])
+        with torch.inference_mode():
+            predictions = head(torch.from_numpy(layer_features[test])).argmax(dim=-1).numpy()
+        truncated = TruncatedSER(classifier, n, head=head)
+        rows.append({"layers": n, "accuracy": float(np.mean(predictions == labels[test])),
+                     "latency_seconds": window_latency(truncated)})
+        if save:
+            os.makedirs(HEAD_DIR, exist_ok=True)
+            torch.save(head.state_dict(), head_path(n))
+    return rows
+
+def print_accuracy_latency(rows):
+    full = rows[0]
+    print(f"\n{'layers':>8} {'accuracy':>9} {'ms/window':>10} {'speedup':>8}")
+    for row in rows:
+        layers = "full" if row["layers"] is None else str(row["layers"])
+        speedup = full["latency_seconds"] / row["latency_seconds"] if row["latency_seconds"] else 0.0
+        print(f"{layers:>8} {row['accuracy']:>9.1%} {row['latency_seconds'] * 1000:>10.1f} {speedup:>7.2f}x")
+
+if __name__ == "__main__":
+    import argparse
+    from src.ser.ser_engine import SEREngine
+
+    parser = argparse.ArgumentParser(description="Fit layer-truncated SER heads and report accuracy vs latency.")
+    parser.add_argument("root", help="Labelled folder: root/<angry|happy|neutral|sad>/*.wav")
+    parser.add_argument("--layers", default="2,4,6,8,10", help="Comma-separated layer counts (default: 2,4,6,8,10)")
+    parser.add_argument("--test-fraction", type=float, default=0.25, help="Held-out share per class (default: 0.25)")
+    parser.add_argument("--no-save", action="store_true", help="Do not write the fitted heads to external/ser-fast")
+    args = parser.parse_args()
+
+    engine = SEREngine()
+    rows = fit_heads(engine.classifier, args.root, [int(n) for n in args.layers.split(",")],
+                     test_fraction=args.test_fraction, save=not args.no_save)
+    print_accuracy_latency(rows)
@@ -0,0 +1,165 @@
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from src.ser.ser_backends import probe_signals
+
+class Wav2Vec2FeatureCache:
+    def __init__(self, classifier):
+        """
+        Streaming front end for the wav2vec2 SER model: the CNN feature encoder and the feature projection run
+        once per audio position of the utterance, and each window only pays for the transformer and the head.
+        Uses the quantized modules of the int8 backend when given one (ser_backends); otherwise the eager model.
+
+        Approximation: wav2vec2-base normalizes the first conv layer per channel over its whole input
+        (GroupNorm), which makes the features depend on the window they were computed in. Here those
+        statistics accumulate over the utterance so far instead of being taken per window, so probabilities
+        differ slightly from classify_batch on the same window (the waveform layer_norm drops out either way:
+        GroupNorm cancels its offset and scale).
+        """
+        eager = getattr(classifier, "classifier", classifier)
+        wrapper = getattr(classifier, "wav2vec2", eager.mods.wav2vec2)
+        self.model = wrapper.model
+        self.output_norm = getattr(wrapper, "output_norm", False)
+        self.output_mlp = getattr(classifier, "output_mlp", eager.mods.output_mlp)
+        self.log_softmax = eager.hparams.softmax
+        # A fast_ser.TruncatedSER runs only its first N layers and its own head
+        self.truncated = classifier if hasattr(classifier, "pool_encoder") else None
+
+        config = self.model.config
+        self.stride = int(np.prod(config.conv_stride))
+        receptive_field = config.conv_kernel[-1]
+        for kernel, stride in zip(reversed(config.conv_kernel[:-1]), reversed(config.conv_stride[:-1])):
+            receptive_field = (receptive_field - 1) * stride + kernel
+        self.receptive_field = receptive_field
+        self.group_norm = config.feat_extract_norm == "group"
+        self.reset()
+
+    def reset(self):
+        """Forgets the utterance (features and normalization statistics)."""
+        self.features = None
+        self.num_frames = 0
+        self._channel_sum = None
+        self._channel_sumsq = None
+        self._channel_count = 0
+
+    def frames_in(self, num_samples):
+        """Number of feature frames whose receptive field lies within the first num_samples samples."""
+        return max(0, (num_samples - self.receptive_field) // self.stride + 1)
+
+    def extend(self, buffer):
+        """Computes features for every frame of `buffer` (SegmentBuffer or 1D array) not computed yet."""
+        end_frame = self.frames_in(len(buffer))
+        if end_frame <= self.num_frames:
+            return
+        start = self.num_frames * self.stride
+        end = (end_frame - 1) * self.stride + self.receptive_field
+        samples = buffer.as_float(start, end) if hasattr(buffer, "as_float") else buffer[start:end]
+        x = torch.from_numpy(np.ascontiguousarray(samples, dtype=np.float32))[None, None]
+
+        with torch.inference_mode():
+            hidden = self._cnn(x).transpose(1, 2)
+            hidden = self.model.feature_projection(hidden)
+            if isinstance(hidden, tuple):
+                hidden = hidden[0]
+        self._append(hidden[0])
+
+    def _cnn(self, x):
+        layers = self.model.feature_extractor.conv_layers
+        if not self.group_norm:
+            for layer in layers:
+                x = layer(x)
+            return x
+
+        # First layer with GroupNorm statistics accumulated over the utterance; later layers are local
+        first = layers[0]
+        hidden = first.conv(x)
+        if self._channel_sum is None:
+            self._channel_sum = torch.zeros(hidden.shape[1], dtype=torch.float64)
+            self._channel_sumsq = torch.zeros(hidden.shape[1], dtype=torch.float64)
+        self._channel_sum += hidden[0].double().sum(dim=1)
+        self._channel_sumsq += (hidden[0].double() ** 2).sum(dim=1)
+        self._channel_count += hidden.shape[2]
+        mean = self._channel_sum / self._channel_count
+        var = (self._channel_sumsq / self._channel_count - mean ** 2).clamp(min=0.0)
+        norm = first.layer_norm
+        scale = (norm.weight.double() / torch.sqrt(var + norm.eps)).float()
+        shift = (norm.bias.double() - mean * norm.weight.double() / torch.sqrt(var + norm.eps)).float()
+        hidden = first.activation(hidden * scale[None, :, None] + shift[None, :, None])
+        for layer in layers[1:]:
+            hidden = layer(hidden)
+        return hidden
+
+    def _append(self, frames):
+        needed = self.num_frames + len(frames)
+        if self.features is None:
+            self.features = torch.zeros(max(needed, 256), frames.shape[1])
+        elif needed > len(self.features):
+            grown = torch.zeros(max(needed, 2 * len(self.features)), frames.shape[1])
+            grown[:self.num_frames] = self.features[:self.num_frames]
+            self.features = grown
+        self.features[self.num_frames:needed] = frames
+        self.num_frames = needed
+
+    def classify(self, starts, window):
+        """
+        Log-probabilities (Batch, Classes) for windows of `window` samples starting at `starts`
+        (multiples of `stride`), like classify_batch's out_prob. extend() must cover the windows first.
+        """
+        n = self.frames_in(window)
+        first_frames = [int(start) // self.stride for start in starts]
+        if not first_frames or first_frames[-1] + n > self.num_frames:
+            raise ValueError("Feature cache does not cover the requested windows; call extend() first")
+        batch = torch.stack([self.features[k:k + n] for k in first_frames])
+
+        if self.truncated is not None:
+            pooled = self.truncated.pool_encoder(batch)
+            with torch.inference_mode():
+                return self.log_softmax(self.output_mlp(pooled))
+
+        with torch.inference_mode():
+            hidden = self.model.encoder(batch)[0]
+            if self.output_norm:
+                hidden = F.layer_norm(hidden, hidden.shape[1:])
+            # Full windows: statistics pooling reduces to a plain mean over frames
+            outputs = self.output_mlp(hidden.mean(dim=1))
+            return self.log_softmax(outputs)
+
+def check_cache_parity(classifier, utterances=None, window=16000, hop=8000, max_prob_diff=0.1, min_agreement=0.9):
+    """
+    Compares Wav2Vec2FeatureCache against the uncached path (classify_batch on the same windows), the way
+    ser_backends.check_parity compares a backend against the eager model. Each utterance goes through a
+    fresh cache, so later windows see statistics accumulated over the audio before them, as when streaming.
+
+    Args:
+        utterances: (Batch, samples) float audio (default: 3 s probe_signals()).
+        hop: Window step in samples, rounded to a multiple of the cache stride.
+
+    Returns:
+        dict: max/mean absolute probability difference, top-1 agreement and passed.
+    """
+    if utterances is None:
+        utterances = probe_signals(count=2, seconds=3.0)
+    cache = Wav2Vec2FeatureCache(classifier)
+    hop = max(cache.stride, hop // cache.stride * cache.stride)
+
+    cached, uncached = [], []
+    for utterance in np.asarray(utterances, dtype=np.float32):
+        starts = np.arange(0, len(utterance) - window + 1, hop)
+        cache.reset()
+        cache.extend(utterance)
+        cached.append(torch.softmax(cache.classify(starts, window).float(), dim=-1).numpy())
+        out_prob, _, _, _ = classifier.classify_batch(torch.from_numpy(np.stack([utterance[s:s + window] for s in starts])))
+        if out_prob.dim() == 3:
+            out_prob = out_prob.squeeze(1)
+        uncached.append(torch.softmax(out_prob.float(), dim=-1).numpy())
+
+    cached, uncached = np.concatenate(cached), np.concatenate(uncached)
+    diff = np.abs(cached - uncached)
+    agreement = float(np.mean(cached.argmax(axis=1) == uncached.argmax(axis=1)))
+    return {
+        "max_prob_diff": float(diff.max()),
+        "mean_prob_diff": float(diff.mean()),
+        "agreement": agreement,
+        "passed": bool(diff.max() <= max_prob_diff and agreement >= min_agreement),
+    }
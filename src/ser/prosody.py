@@ -0,0 +1,192 @@
+import os
+import sys
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Ensure project root is in python path
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from src.ser.emotion_aggregate import SER_LABELS
+
+GATE_PATH = os.path.join(PROJECT_ROOT, "external", "ser-prosody", "prosody_gate.npz")
+FEATURE_NAMES = ["energy_mean_db", "energy_std_db", "energy_range_db", "voiced_ratio",
+                 "f0_mean_st", "f0_std_st", "f0_range_st", "f0_slope_st", "speaking_rate"]
+
+def prosodic_features(windows, fs=16000, frame_ms=25, hop_ms=10, f0_min=70.0, f0_max=400.0):
+    """
+    Prosodic features of a batch of windows, vectorized over windows and frames (no per-frame Python loop).
+    - energy contour: frame RMS in dB (mean, std, p90 - p10 range)
+    - pitch: autocorrelation (via FFT) peak between f0_min and f0_max on voiced frames, in semitones re 100 Hz
+      (voiced ratio, mean, std, p90 - p10 range, slope in semitones per second)
+    - speaking rate: peaks of the smoothed energy contour (syllable nuclei) per second
+
+    Args:
+        windows (np.ndarray): (Batch, samples) or (samples,) float audio in -1..1.
+
+    Returns:
+        np.ndarray: (Batch, len(FEATURE_NAMES)) float32.
+    """
+    windows = np.atleast_2d(np.asarray(windows, dtype=np.float32))
+    frame = int(fs * frame_ms / 1000)
+    hop = int(fs * hop_ms / 1000)
+    if windows.shape[1] < frame:
+        # Shorter than one analysis frame: nothing to measure
+        return np.zeros((len(windows), len(FEATURE_NAMES)), dtype=np.float32)
+    frames = sliding_window_view(windows, frame, axis=1)[:, ::hop]  # (B, F, frame), zero-copy
+    batch, n_frames = frames.shape[:2]
+
+    # Energy contour
+    energy = np.einsum("bfn,bfn->bf", frames, frames) / frame
+    energy_db = 10.0 * np.log10(energy + 1e-10)
+    loud = energy_db > np.percentile(energy_db, 90, axis=1, keepdims=True) - 30.0
+    p10, p90 = np.percentile(energy_db, [10, 90], axis=1)
+
+    # Pitch: normalized autocorrelation of Hann-windowed frames, best lag within the f0 range
+    n_fft = 1 << int(np.ceil(np.log2(2 * frame)))
+    hann = np.hanning(frame)
+    spectrum = np.fft.rfft((frames - frames.mean(axis=2, keepdims=True)) * hann, n=n_fft, axis=2)
+    autocorr = np.fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, n=n_fft, axis=2)
+    # Dividing by the window's own autocorrelation undoes the taper's decay with lag (Boersma, 1993)
+    window_spectrum = np.abs(np.fft.rfft(hann, n=n_fft)) ** 2
+    window_autocorr = np.fft.irfft(window_spectrum, n=n_fft)
+    min_lag, max_lag = int(fs / f0_max), min(int(fs / f0_min), frame // 2)
+    lags = slice(min_lag, max_lag + 1)
+    normalized = (autocorr[:, :, lags] / (autocorr[:, :, :1] + 1e-10)) / (window_autocorr[lags] / window_autocorr[0])
+    best = np.argmax(normalized, axis=2)
+    peak = np.take_along_axis(normalized, best[..., None], axis=2)[..., 0]
+    voiced = (peak > 0.45) & loud & (energy_db > -50.0)
+    semitones = 12.0 * np.log2((fs / (best + min_lag)) / 100.0)
+
+    count = voiced.sum(axis=1)
+    safe = np.maximum(count, 1)
+    st = np.where(voiced, semitones, 0.0)
+    f0_mean = st.sum(axis=1) / safe
+    f0_std = np.sqrt(np.maximum((np.where(voiced, semitones - f0_mean[:, None], 0.0) ** 2).sum(axis=1) / safe, 0.0))
+    # p90 - p10 of voiced frames: sort with unvoiced frames pushed to the end, then index by rank
+    ranked = np.sort(np.where(voiced, semitones, np.inf), axis=1)
+    lo = np.take_along_axis(ranked, (0.1 * (count - 1)).astype(int)[:, None], axis=1)[:, 0]
+    hi = np.take_along_axis(ranked, (0.9 * (count - 1)).astype(int)[:, None], axis=1)[:, 0]
+    f0_range = np.where(count > 0, hi, 0.0) - np.where(count > 0, lo, 0.0)
+
+    # Slope of the voiced pitch track (least squares over frame times)
+    t = np.arange(n_frames) * hop / fs
+    t_mean = np.where(voiced, t, 0.0).sum(axis=1) / safe
+    dt = np.where(voiced, t - t_mean[:, None], 0.0)
+    f0_slope = (dt * np.where(voiced, semitones - f0_mean[:, None], 0.0)).sum(axis=1) / np.maximum((dt ** 2).sum(axis=1), 1e-6)
+
+    # Speaking rate: local maxima of the smoothed energy contour that rise 3 dB above the window median
+    padded = np.pad(energy_db, ((0, 0), (2, 2)), mode="edge")
+    smooth = sliding_window_view(padded, 5, axis=1).mean(axis=2)
+    peaks = (smooth[:, 1:-1] > smooth[:, :-2]) & (smooth[:, 1:-1] >= smooth[:, 2:]) \
+        & (smooth[:, 1:-1] > np.median(smooth, axis=1, keepdims=True) + 3.0)
+    rate = peaks.sum(axis=1) / (windows.shape[1] / fs)
+
+    has_pitch = count > 1
+    features = np.stack([
+        energy_db.mean(axis=1), energy_db.std(axis=1), p90 - p10, count / n_frames,
+        np.where(has_pitch, f0_mean, 0.0), np.where(has_pitch, f0_std, 0.0),
+        np.where(has_pitch, f0_range, 0.0), np.where(has_pitch, f0_slope, 0.0), rate,
+    ], axis=1)
+    return features.astype(np.float32)
+
+class ProsodyGate:
+    def __init__(self, weights, threshold=0.85):
+        """
+        First SER tier: a tiny classifier on prosodic features decides a window on its own when it is
+        confident, and asks for wav2vec2 otherwise.
+        - weights: fitted multinomial logistic regression (mean, std, weight, bias, labels; see fit)
+        - threshold: top-class probability needed to skip wav2vec2
+        """
+        self.weights = weights
+        self.threshold = threshold
+        # Gates saved before the class order was stored were fitted in SER_LABELS order
+        self.labels = np.asarray(weights.get("labels", SER_LABELS)).astype(str)
+
+    @classmethod
+    def load(cls, path=GATE_PATH, threshold=0.85):
+        """Gate with the fitted weights at path, or None (no gate: every window goes to wav2vec2) if it was never fitted."""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return cls({key: data[key] for key in data.files}, threshold=threshold)
+
+    def aligned(self, labels):
+        """The same gate with its classes reordered to `labels` (e.g. SEREngine.labels)."""
+        labels = np.asarray(labels).astype(str)
+        if sorted(labels) != sorted(self.labels):
+            raise ValueError(f"Prosody gate classes {list(self.labels)} do not match the SER classes {list(labels)}")
+        order = [int(np.flatnonzero(self.labels == label)[0]) for label in labels]
+        weights = dict(self.weights, weight=self.weights["weight"][order], bias=self.weights["bias"][order], labels=labels)
+        return ProsodyGate(weights, threshold=self.threshold)
+
+    def predict(self, features):
+        """(Batch, classes) class probabilities in self.labels order."""
+        z = (features - self.weights["mean"]) / self.weights["std"]
+        logits = z @ self.weights["weight"].T + self.weights["bias"]
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+    def classify(self, windows, fs=16000):
+        """Returns ((Batch, classes) probabilities, (Batch,) bool mask of windows decided without wav2vec2)."""
+        probs = self.predict(prosodic_features(windows, fs))
+        return probs, probs.max(axis=1) >= self.threshold
+
+    @staticmethod
+    def fit(features, labels, class_names=SER_LABELS, weight_decay=1e-3, iterations=2000, learning_rate=0.1):
+        """
+        Fits the multinomial logistic regression (full-batch gradient descent) on integer labels that index
+        class_names. Returns the weights dict.
+        """
+        mean = features.mean(axis=0)
+        std = np.maximum(features.std(axis=0), 1e-5)
+        z = (features - mean) / std
+        num_classes = len(class_names)
+        onehot = np.eye(num_classes)[labels]
+        weight = np.zeros((num_classes, z.shape[1]))
+        bias = np.zeros(num_classes)
+        for _ in range(iterations):
+            logits = z @ weight.T + bias
+            logits -= logits.max(axis=1, keepdims=True)
+            probs = np.exp(logits)
+            probs /= probs.sum(axis=1, keepdims=True)
+            grad = (probs - onehot) / len(z)
+            weight -= learning_rate * (grad.T @ z + weight_decay * weight)
+            bias -= learning_rate * grad.sum(axis=0)
+        return {"mean": mean, "std": std, "weight": weight, "bias": bias, "labels": np.asarray(class_names).astype(str)}
+
+if __name__ == "__main__":
+    import argparse
+    from src.ser.fast_ser import load_labelled_folder, clip_windows, stratified_split
+
+    parser = argparse.ArgumentParser(description="Fit the prosodic SER gate and report coverage vs accuracy.")
+    parser.add_argument("root", help="Labelled folder: root/<angry|happy|neutral|sad>/*.wav")
+    parser.add_argument("--test-fraction", type=float, default=0.25, help="Held-out share of clips per class (default: 0.25)")
+    args = parser.parse_args()
+
+    # One feature row per 1 s window, split by clip (stratified) so windows of one recording stay together
+    clips = [clip for clip in load_labelled_folder(args.root) if len(clip[0]) >= 16000]
+    clip_labels = np.array([label for _, label in clips], dtype=int)
+    if len(np.unique(clip_labels)) < len(SER_LABELS) or np.bincount(clip_labels).min() < 2:
+        print(f"❌ Need at least two clips of 1 s or longer per class ({', '.join(SER_LABELS)}) under {args.root}")
+        sys.exit(1)
+    windows, labels, owners = clip_windows(clips)
+    is_test = stratified_split(clip_labels, args.test_fraction)[owners]
+    features = prosodic_features(windows)
+    print(f"🗂️ {len(features)} windows ({int((~is_test).sum())} train / {int(is_test.sum())} test)")
+
+    weights = ProsodyGate.fit(features[~is_test], labels[~is_test])
+    probs = ProsodyGate(weights).predict(features[is_test])
+    correct = probs.argmax(axis=1) == labels[is_test]
+    print(f"\n{'threshold':>9} {'hit rate':>9} {'acc. on hits':>13}")
+    for threshold in (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95):
+        hits = probs.max(axis=1) >= threshold
+        accuracy = f"{correct[hits].mean():.1%}" if hits.any() else "-"
+        print(f"{threshold:>9.2f} {hits.mean():>9.1%} {accuracy:>13}")
+
+    os.makedirs(os.path.dirname(GATE_PATH), exist_ok=True)
+    np.savez(GATE_PATH, **weights)
+    print(f"\n💾 Saved prosody gate: {GATE_PATH}")
@@ -1,11 +1,11 @@
 import time
 import os
 try:
-    from .recorder import record_audio
+    from .recorder import record_until_silence
     from .ser_engine import SEREngine
 except ImportError:
     # Fallback for running directly
-    from recorder import record_audio
+    from recorder import record_until_silence
     from ser_engine import SEREngine
 
 # Define project root and data directory
@@ -38,7 +38,7 @@ def main():
             timestamp = time.strftime("%Y-%m-%d-%H-%M-%S")
             wav_file = os.path.join(DATA_DIR, f"ser_{timestamp}.wav")
             print(f"Recording to {wav_file}...")
-            record_audio(duration=10, filename=wav_file) # Reduced to 5s for quick testing, user can change later
+            record_until_silence(filename=wav_file, min_duration=2.0, max_duration=10.0)  # Stops once you stop speaking
             
             # 2. Analyze
             print("Analyzing emotion...")
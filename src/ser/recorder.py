@@ -1,7 +1,10 @@
 import sounddevice as sd
-from scipy.io.wavfile import write
+from scipy.io.wavfile import write, read
 import numpy as np
 
+# RMS (on a -1..1 scale) below which audio is treated as silence, matching the streaming STT default
+SILENCE_RMS = 0.01
+
 def record_audio(duration=20, fs=16000, filename="input.wav"):
     """
     Records audio from the microphone.
@@ -24,6 +27,164 @@ def record_audio(duration=20, fs=16000, filename="input.wav"):
     write(filename, fs, recording)
     print(f"Recording saved to {filename}")
 
+def record_until_silence(filename="input.wav", fs=16000, min_duration=2.0, max_duration=20.0,
+                         trailing_silence=1.5, block_duration=0.1, threshold=None):
+    """
+    Records until the speaker has stopped talking, bounded by min_duration and max_duration.
+
+    Args:
+        filename (str): Name of the file to save.
+        fs (int): Sample rate.
+        min_duration (float): Never stop before this many seconds.
+        max_duration (float): Always stop after this many seconds.
+        trailing_silence (float): Seconds of silence after speech that end the recording.
+        block_duration (float): Analysis block length in seconds.
+        threshold (float): Fixed RMS speech threshold. None = adapt to the room's noise floor.
+
+    Returns:
+        float: Recorded duration in seconds.
+    """
+    block = int(fs * block_duration)
+    max_blocks = int(np.ceil(max_duration / block_duration))
+    min_blocks = int(np.ceil(min_duration / block_duration))
+    silence_blocks_needed = int(np.ceil(trailing_silence / block_duration))
+
+    # Preallocated for the maximum length; we only keep what was actually recorded
+    recording = np.zeros(max_blocks * block, dtype=np.int16)
+    noise_floor = None
+    has_spoken = False
+    silent_run = 0
+    n_blocks = 0
+
+    print(f"Recording (auto-stop after {trailing_silence:.1f}s of silence, max {max_duration:.0f}s)...")
+    with sd.InputStream(samplerate=fs, channels=1, dtype='int16', blocksize=block) as stream:
+        while n_blocks < max_blocks:
+            data, _ = stream.read(block)
+            samples = data[:, 0]
+            recording[n_blocks * block:(n_blocks + 1) * block] = samples
+            n_blocks += 1
+
+            x = samples.astype(np.float32) / 32768.0
+            rms = float(np.sqrt(np.dot(x, x) / len(x)))
+
+            # Track the quietest recent level as the noise floor (slowly forgetting it)
+            if noise_floor is None:
+                noise_floor = rms
+            elif rms < noise_floor:
+                noise_floor = rms
+            else:
+                noise_floor = 0.98 * noise_floor + 0.02 * min(rms, noise_floor * 2.0)
+            speech_threshold = threshold if threshold is not None else max(SILENCE_RMS, 3.0 * noise_floor)
+
+            if rms >= speech_threshold:
+                has_spoken = True
+                silent_run = 0
+            else:
+                silent_run += 1
+
+            if has_spoken and silent_run >= silence_blocks_needed and n_blocks >= min_blocks:
+                break
+
+    recording = recording[:n_blocks * block]
+    write(filename, fs, recording)
+    duration = len(recording) / fs
+    print(f"Recording saved to {filename} ({duration:.1f}s)")
+    return duration
+
+def to_float_mono(samples):
+    """int16 or float samples, (time,) or (time, channels), as float32 mono on a -1..1 scale (channels averaged)."""
+    scale = 32768.0 if samples.dtype == np.int16 else 1.0
+    samples = np.asarray(samples, dtype=np.float32)
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1, dtype=np.float32)
+    return samples / scale if scale != 1.0 else samples
+
+def frame_rms(audio, frame, block_frames=4096):
+    """
+    Per-frame RMS (on a -1..1 scale) of a clip, mono or (time, channels) downmixed, computed block by block
+    so that memory stays constant even for hour-long memory-mapped recordings.
+    """
+    n_frames = len(audio) // frame
+    rms = np.empty(n_frames, dtype=np.float32)
+    for start in range(0, n_frames, block_frames):
+        stop = min(n_frames, start + block_frames)
+        frames = to_float_mono(audio[start * frame:stop * frame]).reshape(stop - start, frame)
+        rms[start:stop] = np.sqrt(np.mean(frames * frames, axis=1))
+    return rms
+
+def trim_silence(audio, fs, threshold=None, frame_duration=0.03, pad=0.25):
+    """
+    Cuts leading and trailing silence from a clip (multichannel clips are judged on their downmix).
+
+    Args:
+        audio (np.ndarray): (time,) or (time, channels) int16 or float samples (a memory-mapped array is fine).
+        fs (int): Sample rate.
+        threshold (float): RMS speech threshold on a -1..1 scale. None = derive from the clip's quietest frames.
+        frame_duration (float): Analysis frame length in seconds.
+        pad (float): Seconds of context kept on each side of the detected speech.
+
+    Returns:
+        (np.ndarray, int): The trimmed view and the index of its first sample in the original clip.
+    """
+    frame = max(1, int(fs * frame_duration))
+    if len(audio) // frame == 0:
+        return audio, 0
+
+    rms = frame_rms(audio, frame)
+
+    if threshold is None:
+        threshold = max(SILENCE_RMS, 3.0 * float(np.percentile(rms, 10)))
+    voiced = np.flatnonzero(rms >= threshold)
+    if len(voiced) == 0:
+        # Nothing clearly above the floor: keep the clip and let the models decide
+        return audio, 0
+
+    pad_samples = int(pad * fs)
+    start = max(0, int(voiced[0]) * frame - pad_samples)
+    end = min(len(audio), (voiced[-1] + 1) * frame + pad_samples)
+    return audio[start:end], start
+
+def open_wav_memmap(filename):
+    """
+    Opens a PCM WAV as a read-only memory-mapped array instead of decoding it into RAM.
+
+    Returns:
+        (np.ndarray, int): The (time,) or (time, channels) memmap and the sample rate.
+    """
+    fs, audio = read(filename, mmap=True)
+    return audio, fs
+
+def open_trimmed_audio(filename, threshold=None, pad=0.25):
+    """
+    Memory-maps a WAV and trims its leading/trailing silence without decoding it: the kept region stays a
+    memmap slice in the file's own dtype and channel layout, for consumers that read it block by block
+    (SEREngine.predict_emotion_timeline, BatchTranscriber.transcribe; to_float_mono converts a block).
+
+    Returns:
+        (np.ndarray, int, float): Trimmed (time,) or (time, channels) memmap, sample rate, and the offset
+        (seconds) of the first kept sample.
+    """
+    audio, fs = open_wav_memmap(filename)
+    trimmed, start = trim_silence(audio, fs, threshold=threshold, pad=pad)
+    return trimmed, fs, start / fs
+
+def load_trimmed_audio(filename, threshold=None, pad=0.25, block_samples=1 << 20):
+    """
+    open_trimmed_audio() decoded into RAM: the kept region as float32 mono, for short clips that a model
+    takes whole. Multichannel files are downmixed (channel mean) block by block, so only the output is held.
+
+    Returns:
+        (np.ndarray, int, float): Trimmed samples, sample rate, and the offset (seconds) of the first kept sample.
+    """
+    trimmed, fs, offset = open_trimmed_audio(filename, threshold=threshold, pad=pad)
+    if trimmed.ndim == 1 and trimmed.dtype == np.float32:
+        return np.asarray(trimmed), fs, offset
+
+    mono = np.empty(len(trimmed), dtype=np.float32)
+    for i in range(0, len(trimmed), block_samples):
+        mono[i:i + block_samples] = to_float_mono(trimmed[i:i + block_samples])
+    return mono, fs, offset
+
 if __name__ == "__main__":
     # Test the recorder
     record_audio()
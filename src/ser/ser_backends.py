@@ -0,0 +1,230 @@
+import os
+import sys
+import copy
+import time
+import contextlib
+import numpy as np
+import torch
+
+# Ensure project root is in python path
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+ONNX_DIR = os.path.join(PROJECT_ROOT, "external", "ser-onnx")
+BACKENDS = ("eager", "int8", "bf16", "onnx")
+
+def bf16_supported():
+    """True if the CPU has native bf16 matmuls (AVX512-BF16 or AMX); elsewhere bf16 is emulated and slower than fp32."""
+    for probe in ("_is_avx512_bf16_supported", "_is_amx_tile_supported"):
+        check = getattr(torch.cpu, probe, None)
+        if check is not None and check():
+            return True
+    return False
+
+class ModuleBackend:
+    def __init__(self, classifier, wav2vec2, output_mlp, autocast_dtype=None, name="eager"):
+        """
+        Drop-in replacement for the SpeechBrain classifier's classify_batch() that runs its own
+        (quantized / reduced precision) copies of the wav2vec2 encoder and the output MLP.
+        The eager classifier still provides pooling, the log-softmax and the label encoder.
+        """
+        self.classifier = classifier
+        self.wav2vec2 = wav2vec2.eval()
+        self.output_mlp = output_mlp.eval()
+        self.autocast_dtype = autocast_dtype
+        self.name = name
+
+    def classify_batch(self, wavs, wav_lens=None):
+        """Same contract as CustomEncoderWav2vec2Classifier.classify_batch: (out_prob, score, index, text_lab)."""
+        wavs = wavs.float()
+        if wav_lens is None:
+            wav_lens = torch.ones(wavs.shape[0])
+        precision = (torch.autocast("cpu", dtype=self.autocast_dtype) if self.autocast_dtype is not None
+                     else contextlib.nullcontext())
+        with torch.inference_mode(), precision:
+            outputs = self.wav2vec2(wavs)
+            outputs = self.classifier.mods.avg_pool(outputs, wav_lens)
+            outputs = self.output_mlp(outputs.view(outputs.shape[0], -1))
+        return _decode_outputs(self.classifier, outputs.float())
+
+class OnnxBackend:
+    def __init__(self, classifier, model_path=None, threads=None):
+        """
+        classify_batch() on an ONNX Runtime export of wav2vec2 + mean pooling + output MLP.
+        The graph assumes full-length inputs; batches with padding (wav_lens < 1) go to the eager classifier.
+        - model_path: exported graph (created on first use under external/ser-onnx)
+        - threads: ONNX Runtime intra-op threads (default: all cores)
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The ONNX SER backend requires the 'onnxruntime' package: pip install onnxruntime") from e
+
+        self.classifier = classifier
+        self.name = "onnx"
+        self.model_path = model_path or os.path.join(ONNX_DIR, "wav2vec2_iemocap.onnx")
+        if not os.path.exists(self.model_path):
+            export_onnx(classifier, self.model_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+
+    def classify_batch(self, wavs, wav_lens=None):
+        if wav_lens is not None and bool((wav_lens < 1.0).any()):
+            return self.classifier.classify_batch(wavs, wav_lens)
+        logits = self.session.run(["logits"], {"wavs": wavs.float().numpy()})[0]
+        return _decode_outputs(self.classifier, torch.from_numpy(logits))
+
+class _ExportGraph(torch.nn.Module):
+    def __init__(self, wav2vec2, output_mlp):
+        super().__init__()
+        self.wav2vec2 = wav2vec2
+        self.output_mlp = output_mlp
+
+    def forward(self, wavs):
+        # Full-length inputs: statistics pooling reduces to a plain mean over frames
+        outputs = self.wav2vec2(wavs).mean(dim=1)
+        return self.output_mlp(outputs)
+
+def _decode_outputs(classifier, outputs):
+    out_prob = classifier.hparams.softmax(outputs)
+    score, index = torch.max(out_prob, dim=-1)
+    text_lab = classifier.hparams.label_encoder.decode_torch(index)
+    return out_prob, score, index, text_lab
+
+def export_onnx(classifier, model_path, opset=17):
+    """Exports the eager classifier to ONNX with dynamic batch and time axes."""
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    graph = _ExportGraph(classifier.mods.wav2vec2, classifier.mods.output_mlp).eval()
+    print(f"📦 Exporting SER model to ONNX: {model_path}")
+    with torch.inference_mode():
+        torch.onnx.export(graph, (torch.zeros(1, 16000),), model_path, input_names=["wavs"], output_names=["logits"],
+                          dynamic_axes={"wavs": {0: "batch", 1: "time"}, "logits": {0: "batch"}}, opset_version=opset)
+
+def build_backend(classifier, backend):
+    """Wraps the eager SpeechBrain classifier in the requested backend (the eager model is left untouched)."""
+    if backend == "eager":
+        return classifier
+    if backend == "int8":
+        # Dynamic quantization covers the Linear layers (attention + feed-forward, most of the FLOPs);
+        # the CNN feature encoder stays fp32
+        quantize = torch.ao.quantization.quantize_dynamic
+        return ModuleBackend(classifier,
+                             quantize(copy.deepcopy(classifier.mods.wav2vec2), {torch.nn.Linear}, dtype=torch.qint8),
+                             quantize(copy.deepcopy(classifier.mods.output_mlp), {torch.nn.Linear}, dtype=torch.qint8),
+                             name="int8")
+    if backend == "bf16":
+        if not bf16_supported():
+            raise RuntimeError("bf16 backend needs a CPU with AVX512-BF16 or AMX")
+        return ModuleBackend(classifier, classifier.mods.wav2vec2, classifier.mods.output_mlp,
+                             autocast_dtype=torch.bfloat16, name="bf16")
+    if backend == "onnx":
+        return OnnxBackend(classifier)
+    raise ValueError(f"Unknown SER backend '{backend}' (choose from {', '.join(BACKENDS)})")
+
+def probe_signals(count=4, seconds=1.0, fs=16000, seed=0):
+    """Deterministic voice-like test batch (harmonic tones with vibrato plus noise) for quick parity checks."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * fs)) / fs
+    signals = []
+    for i in range(count):
+        f0 = 110.0 + 40.0 * i
+        phase = 2 * np.pi * np.cumsum(f0 * (1 + 0.03 * np.sin(2 * np.pi * 5 * t))) / fs
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+        signals.append(0.1 * voiced / np.abs(voiced).max() + 0.005 * rng.standard_normal(len(t)))
+    return torch.from_numpy(np.stack(signals).astype(np.float32))
+
+def check_parity(reference, candidate, wavs, max_prob_diff=0.1, min_agreement=0.9, repeats=3):
+    """
+    Compares the label distributions of a candidate backend against the eager classifier on the same batch.
+
+    Returns:
+        dict: max/mean absolute probability difference, top-1 agreement, per-batch latency of both and passed.
+    """
+    def run(model):
+        best, out_prob = float("inf"), None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            out_prob, _, _, _ = model.classify_batch(wavs)
+            best = min(best, time.perf_counter() - start)
+        if out_prob.dim() == 3:
+            out_prob = out_prob.squeeze(1)
+        # classify_batch returns log-probabilities
+        return torch.softmax(out_prob.float(), dim=-1).numpy(), best
+
+    ref_probs, ref_seconds = run(reference)
+    cand_probs, cand_seconds = run(candidate)
+    diff = np.abs(ref_probs - cand_probs)
+    agreement = float(np.mean(ref_probs.argmax(axis=1) == cand_probs.argmax(axis=1)))
+    return {
+        "max_prob_diff": float(diff.max()),
+        "mean_prob_diff": float(diff.mean()),
+        "agreement": agreement,
+        "eager_seconds": ref_seconds,
+        "backend_seconds": cand_seconds,
+        "speedup": ref_seconds / cand_seconds if cand_seconds else 0.0,
+        "passed": bool(diff.max() <= max_prob_diff and agreement >= min_agreement),
+    }
+
+def load_backend(classifier, backend, verify=True, wavs=None):
+    """
+    build_backend() plus a parity check on `wavs` (default: probe_signals()). If the backend cannot be
+    built or drifts from the eager model, the eager classifier is returned instead.
+    """
+    if backend == "eager":
+        return classifier
+    try:
+        candidate = build_backend(classifier, backend)
+    except (ImportError, RuntimeError) as e:
+        print(f"⚠️ SER backend '{backend}' unavailable ({e}); using eager PyTorch.")
+        return classifier
+    if not verify:
+        return candidate
+
+    parity = check_parity(classifier, candidate, probe_signals() if wavs is None else wavs)
+    print(f"🔬 SER backend '{backend}': max prob diff {parity['max_prob_diff']:.3f}, "
+          f"top-1 agreement {parity['agreement']:.0%}, {parity['speedup']:.2f}x vs eager")
+    if not parity["passed"]:
+        print(f"⚠️ SER backend '{backend}' failed the parity check; using eager PyTorch.")
+        return classifier
+    return candidate
+
+if __name__ == "__main__":
+    import argparse
+    from src.ser.ser_engine import SEREngine, _custom_load
+
+    parser = argparse.ArgumentParser(description="Check SER backends against the eager model (accuracy and speed).")
+    parser.add_argument("wavs", nargs="*", help="16 kHz recordings to cut into 1 s test windows (default: synthetic probe)")
+    parser.add_argument("--backend", default="all", help=f"One of {', '.join(BACKENDS)} or 'all' (default)")
+    parser.add_argument("--max-windows", type=int, default=16, help="Windows per test batch (default: 16)")
+    args = parser.parse_args()
+
+    wavs = None
+    if args.wavs:
+        windows = []
+        for path in args.wavs:
+            signal, fs = _custom_load(path)
+            if fs != 16000:
+                print(f"⚠️ Skipping {path}: {fs} Hz (16 kHz expected)")
+                continue
+            mono = signal.mean(dim=0)
+            windows += [mono[i:i + fs] for i in range(0, len(mono) - fs + 1, fs)]
+        wavs = torch.stack(windows[:args.max_windows]) if windows else None
+
+    engine = SEREngine()
+    for name in (BACKENDS[1:] if args.backend == "all" else [args.backend]):
+        try:
+            candidate = build_backend(engine.classifier, name)
+        except (ImportError, RuntimeError) as e:
+            print(f"⏭️ {name}: {e}")
+            continue
+        parity = check_parity(engine.classifier, candidate, probe_signals() if wavs is None else wavs)
+        verdict = "✅" if parity["passed"] else "❌"
+        print(f"{verdict} {name}: max prob diff {parity['max_prob_diff']:.3f}, mean {parity['mean_prob_diff']:.4f}, "
+              f"agreement {parity['agreement']:.0%}, {parity['backend_seconds'] * 1000:.0f} ms vs "
+              f"{parity['eager_seconds'] * 1000:.0f} ms eager ({parity['speedup']:.2f}x)")
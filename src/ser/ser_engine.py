@@ -72,9 +72,28 @@ if not hasattr(torchaudio, "list_audio_backends"):
 # --- ROBUST MONKEYPATCH END ---
 
 from speechbrain.inference.interfaces import foreign_class
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Ensure project root is in python path
+import os
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from src.ser.emotion_aggregate import LABEL_NAMES, aggregate_emotions, classifier_labels, empty_voice_state
+from src.ser.recorder import open_wav_memmap, trim_silence, to_float_mono
+from src.streaming.resample import PolyphaseResampler
 
 class SEREngine:
-    def __init__(self):
+    def __init__(self, backend="eager", verify_backend=True, fast_layers=None):
+        """
+        backend: "eager" (fp32 PyTorch), "int8" (dynamic quantization), "bf16" (autocast, needs AVX512-BF16/AMX)
+                 or "onnx" (ONNX Runtime); see src/ser/ser_backends.py
+        verify_backend: run a parity check against the eager model and fall back to it on drift
+        fast_layers: run only the first N transformer layers with a head fitted for that depth
+                     (src/ser/fast_ser.py); None = all layers
+        """
         print("Loading SpeechBrain SER Model (CPU Optimized)...", flush=True)
         # Suppress the specific warning about pretrained/inference redirection
         import warnings
@@ -88,7 +107,18 @@ class SEREngine:
             classname="CustomEncoderWav2vec2Classifier",
             run_opts={"device": "cpu"} 
         )
-        print("Model loaded successfully!", flush=True)
+        # Class names in output order, for every probs array this engine returns
+        self.labels = classifier_labels(self.classifier)
+        self.backend = "eager"
+        if backend != "eager":
+            from src.ser.ser_backends import load_backend
+            self.classifier = load_backend(self.classifier, backend, verify=verify_backend)
+            self.backend = getattr(self.classifier, "name", "eager")
+        if fast_layers:
+            from src.ser.fast_ser import load_fast_classifier
+            self.classifier = load_fast_classifier(self.classifier, fast_layers)
+            self.backend = f"{self.backend}, {getattr(self.classifier, 'name', 'full')}"
+        print(f"Model loaded successfully! (backend: {self.backend})", flush=True)
 
     def predict_emotion(self, audio_file):
         """
@@ -96,23 +126,114 @@ class SEREngine:
         """
         # Manual load to ensure we control the shape
         signal, fs = _custom_load(audio_file)
-        
+        return self.predict_emotion_signal(signal)
+
+    def predict_emotion_signal(self, signal):
+        """
+        Predicts emotion from an in-memory 16 kHz signal (1D numpy array or (Batch, Time) tensor).
+        """
+        if isinstance(signal, np.ndarray):
+            signal = torch.from_numpy(np.ascontiguousarray(signal, dtype=np.float32))
+        if signal.dim() == 1:
+            signal = signal.unsqueeze(0)
+
         # classify_batch expects (Batch, Time)
         out_prob, score, index, text_lab = self.classifier.classify_batch(signal)
         
         # Map labels to human readable
-        label_map = {
-            'hap': 'Happy',
-            'ang': 'Angry',
-            'neu': 'Neutral',
-            'sad': 'Sad'
-        }
-        
         raw_label = text_lab[0]
-        return label_map.get(raw_label, raw_label)
+        return LABEL_NAMES.get(raw_label, raw_label)
+
+    def predict_emotion_timeline(self, audio, fs=16000, offset=0.0, window_seconds=1.0, hop_seconds=1.0,
+                                 batch_size=16, block_seconds=30.0):
+        """
+        Windowed SER over a whole recording with constant memory: the audio is read block by block
+        (a WAV path is memory-mapped and silence-trimmed), cut into fixed windows and classified in batches.
+
+        Args:
+            audio: WAV path, or an int16/float (time,) or (time, channels) array (a memmap is fine) sampled at fs;
+                   channels are averaged.
+            offset (float): Seconds added to every window time (where the array starts in the recording).
+            window_seconds / hop_seconds (float): Window length and step.
+
+        Returns:
+            dict: times (N, 2) window start/end seconds, probs (N, classes) in `labels` order, rms (N,),
+                  labels, voice_state (aggregate emotion, confidence, reliability, peak/average) and audio_seconds.
+        """
+        if isinstance(audio, str):
+            audio, fs = open_wav_memmap(audio)
+            audio, start = trim_silence(audio, fs)
+            offset += start / fs
+
+        rate = 16000
+        window = int(window_seconds * rate)
+        hop = max(1, int(hop_seconds * rate))
+        resampler = PolyphaseResampler(fs, rate) if fs != rate else None
+        block = max(1, int(block_seconds * fs))
+
+        times, probs, rms = [], [], []
+        pending = np.zeros(0, dtype=np.float32)
+        tail = pending  # last `window` samples of the stream
+        consumed = 0  # 16 kHz samples dropped from the front of `pending`
+        covered = 0  # end of the last classified window
+        total = 0
+
+        def classify(windows, first_start):
+            tensor = torch.from_numpy(np.ascontiguousarray(windows))
+            out_prob, _, _, _ = self.classifier.classify_batch(tensor)
+            if out_prob.dim() == 3:
+                out_prob = out_prob.squeeze(1)
+            probs.append(torch.softmax(out_prob, dim=1).numpy())
+            nonlocal covered
+            covered = first_start + (len(windows) - 1) * hop + windows.shape[1]
+            rms.append(np.sqrt(np.mean(windows * windows, axis=1)))
+            starts = first_start + np.arange(len(windows)) * hop
+            times.append(np.stack([starts, starts + windows.shape[1]], axis=1) / rate + offset)
+
+        for i in range(0, len(audio), block):
+            chunk = to_float_mono(audio[i:i + block])
+            if resampler is not None:
+                chunk = resampler.process(chunk)
+            total += len(chunk)
+            pending = np.concatenate([pending, chunk])
+            tail = np.concatenate([tail, chunk])[-window:]
+
+            # Classify every full batch of windows available so far, keep only the unconsumed tail
+            n_windows = (len(pending) - window) // hop + 1 if len(pending) >= window else 0
+            for first in range(0, n_windows - batch_size + 1, batch_size):
+                classify(sliding_window_view(pending[first * hop:first * hop + (batch_size - 1) * hop + window], window)[::hop],
+                         consumed + first * hop)
+            done = (n_windows // batch_size) * batch_size
+            pending = pending[done * hop:]
+            consumed += done * hop
+
+        if len(pending) >= window:
+            classify(sliding_window_view(pending, window)[::hop], consumed)
+        if total < window:
+            if total:
+                # Shorter than one window: classify what there is
+                classify(tail[None], 0)
+        elif total - covered >= window // 2:
+            # Speech left over by the hop: one more window aligned to the end of the recording
+            classify(tail[None], total - window)
+
+        if not probs:
+            return {"times": np.zeros((0, 2)), "probs": np.zeros((0, len(self.labels))), "rms": np.zeros(0),
+                    "labels": list(self.labels), "voice_state": empty_voice_state(), "audio_seconds": 0.0}
+
+        probs, rms, times = np.concatenate(probs), np.concatenate(rms), np.concatenate(times)
+        # Same energy scale as the streaming worker: ~0.02 RMS is reasonably audible speech
+        energy_score = min(1.0, float(np.sqrt(np.mean(rms * rms))) / 0.02)
+        return {
+            "times": times,
+            "probs": probs,
+            "rms": rms,
+            "labels": list(self.labels),
+            "voice_state": aggregate_emotions(probs, energy_score, self.labels),
+            "audio_seconds": total / rate,
+        }
 
 if __name__ == "__main__":
-    import os
     if os.path.exists("input.wav"):
         engine = SEREngine()
         emotion = engine.predict_emotion("input.wav")
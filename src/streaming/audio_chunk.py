@@ -0,0 +1,43 @@
+import time
+import numpy as np
+
+def block_stats(samples):
+    """Returns (rms, peak) of a float32 block without allocating temporaries."""
+    n = len(samples)
+    if n == 0:
+        return 0.0, 0.0
+    rms = float(np.sqrt(np.dot(samples, samples) / n))
+    peak = float(max(samples.max(), -samples.min()))
+    return rms, peak
+
+class AudioChunk:
+    __slots__ = ("seq", "capture_time", "samples", "rms", "peak")
+
+    def __init__(self, seq, capture_time, samples, rms, peak):
+        """
+        Compact envelope for one captured audio block.
+        - seq: monotonically increasing block number (gaps mean dropped blocks)
+        - capture_time: time.monotonic() when the block was captured
+        - samples: 1D float32 array (usually a view into the streamer's ring buffer)
+        - rms / peak: block energy, computed once at capture so downstream stages never recompute it
+        """
+        self.seq = seq
+        self.capture_time = capture_time
+        self.samples = samples
+        self.rms = rms
+        self.peak = peak
+
+    @classmethod
+    def from_samples(cls, samples, seq=0, capture_time=None):
+        """Wraps a bare array (tests, file replay, legacy producers) and computes its stats."""
+        samples = np.asarray(samples, dtype=np.float32)
+        rms, peak = block_stats(samples)
+        if capture_time is None:
+            capture_time = time.monotonic()
+        return cls(seq, capture_time, samples, rms, peak)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __repr__(self):
+        return f"AudioChunk(seq={self.seq}, n={len(self.samples)}, rms={self.rms:.4f}, peak={self.peak:.4f})"
@@ -1,26 +1,76 @@
 import time
 import queue
-import numpy as np
 import sounddevice as sd
 
+from src.streaming.audio_chunk import AudioChunk
+from src.streaming.ring_buffer import AudioRingBuffer
+from src.streaming.queues import DROP_OLDEST, BLOCK
+from src.streaming.resample import PolyphaseResampler
+from src.streaming.rt_log import get_logger
+
+log = get_logger("audio")
+
 class AudioStreamer:
-    def __init__(self, sample_rate=16000, chunk_duration=0.25):
+    def __init__(self, sample_rate=16000, chunk_duration=0.25, ring_seconds=60.0,
+                 device=None, capture_rate=None, capture_channels=None):
         """
         Initializes the non-blocking audio stream using sounddevice.
-        - sample_rate: 16000 Hz (standard for whisper/wav2vec)
+        - sample_rate: 16000 Hz (standard for whisper/wav2vec), the rate delivered to consumers
         - chunk_duration: Time in seconds per chunk (0.25 = 250ms buffer)
+        - ring_seconds: History retained in the shared ring buffer before slow readers are lapped
+        - device: sounddevice input device (None = system default)
+        - capture_rate / capture_channels: override the device's native format (None = query the device)
+        Audio is captured at the device's native rate and channel count, then downmixed and
+        resampled to sample_rate mono inside the callback.
         """
         self.sample_rate = sample_rate
         self.chunk_duration = chunk_duration
         self.blocksize = int(self.sample_rate * self.chunk_duration)
+        self.device = device
+        self.capture_rate = capture_rate
+        self.capture_channels = capture_channels
+        self.resampler = None
         
-        # We'll push numpy arrays into these registered queues
+        # One preallocated ring per stream; consumers read it through independent cursors.
+        # One spare sample per slot absorbs the +/-1 jitter of non-integer resampling ratios.
+        num_slots = max(4, int(round(ring_seconds / chunk_duration)))
+        self.ring = AudioRingBuffer(self.blocksize + 1, num_slots=num_slots)
+
+        # Legacy consumers that still want their own copy of every chunk
         self.audio_queues = []
+        self.readers = {}
+        self.queue_drops = {}
         self.stream = None
         
+    def add_reader(self, name=None, policy=DROP_OLDEST, max_lag_seconds=None):
+        """
+        Registers a zero-copy consumer. Returns a RingReader with a queue-like get(timeout=...).
+        - policy: DROP_OLDEST or COALESCE, applied when the consumer falls more than max_lag_seconds behind
+        """
+        name = name or f"reader_{len(self.readers)}"
+        max_lag = None
+        if max_lag_seconds is not None:
+            max_lag = int(round(max_lag_seconds / self.chunk_duration))
+        reader = self.ring.reader(policy=policy, max_lag=max_lag, name=name)
+        self.readers[name] = reader
+        return reader
+
     def add_queue(self, q):
         """Registers a queue to receive a copy of the audio stream."""
+        if getattr(q, "policy", None) == BLOCK:
+            raise ValueError("BLOCK overflow policy would stall the real-time audio callback")
         self.audio_queues.append(q)
+        self.queue_drops[id(q)] = 0
+
+    def get_queue_stats(self):
+        """Drop / high-watermark counters for every consumer, safe to call at runtime."""
+        stats = {name: reader.stats() for name, reader in self.readers.items()}
+        for i, q in enumerate(self.audio_queues):
+            if hasattr(q, "stats"):
+                stats[getattr(q, "name", f"queue_{i}")] = q.stats()
+            else:
+                stats[f"queue_{i}"] = {"depth": q.qsize(), "maxsize": q.maxsize, "dropped": self.queue_drops.get(id(q), 0)}
+        return stats
 
     def _audio_callback(self, indata, frames, time_info, status):
         """
@@ -28,57 +78,88 @@ class AudioStreamer:
         Runs in a separate C-thread, must be fast and non-blocking.
         """
         if status:
-            print(f"[!] Audio Stream Status: {status}")
+            log.warning("[!] Audio Stream Status: %s", status)
             
-        # indata is shape (frames, channels), e.g., (16000, 1)
-        # We flatten it to a 1D array of float32 for downstream tasks
-        audio_chunk = indata[:, 0].copy()
+        # indata is shape (frames, channels) at the device's native rate, e.g., (12000, 2) at 48 kHz
+        # The resampler downmixes to mono at sample_rate into preallocated buffers, which is then
+        # written straight into the preallocated ring (no allocation in this thread)
+        capture_time = time.monotonic()
+        seq = self.ring.write_seq
+        mono = self.resampler.process(indata)
+        self.ring.write(mono, capture_time=capture_time)
         
-        # Push to all registered queues (broadcasting)
+        if not self.audio_queues:
+            return
+
+        # Legacy broadcasting path: one copied envelope shared by all registered queues
+        audio_chunk = AudioChunk.from_samples(mono.copy(), seq=seq, capture_time=capture_time)
         for q in self.audio_queues:
             try:
-                q.put_nowait(audio_chunk)
+                q.put_nowait(audio_chunk)  # MonitoredQueue applies its own overflow policy here
             except queue.Full:
-                pass # Depending on architecture, silent drop can be intentional
+                self.queue_drops[id(q)] += 1
 
     def start(self):
         """Starts the non-blocking audio stream."""
         if self.stream is not None:
             return
 
-        print("[Audio] Starting continuous audio stream...")
+        capture_rate, capture_channels = self._native_format()
+        capture_blocksize = int(round(capture_rate * self.chunk_duration))
+        self.resampler = PolyphaseResampler(capture_rate, self.sample_rate,
+                                            channels=capture_channels, max_block=capture_blocksize)
+
+        log.info("[Audio] Starting continuous audio stream (%d Hz x%d -> %d Hz mono, +%.2f ms)...",
+                 capture_rate, capture_channels, self.sample_rate, self.resampler.latency_seconds * 1000)
         self.stream = sd.InputStream(
-            samplerate=self.sample_rate,
-            channels=1,
+            device=self.device,
+            samplerate=capture_rate,
+            channels=capture_channels,
             dtype='float32',
-            blocksize=self.blocksize,
+            blocksize=capture_blocksize,
             callback=self._audio_callback
         )
         self.stream.start()
 
+    def _native_format(self):
+        """Returns (rate, channels) to capture at, preferring the device's own defaults."""
+        rate, channels = self.capture_rate, self.capture_channels
+        if rate is None or channels is None:
+            try:
+                info = sd.query_devices(self.device, 'input')
+                if rate is None:
+                    rate = int(info['default_samplerate'])
+                if channels is None:
+                    channels = max(1, int(info['max_input_channels']))
+            except Exception as e:
+                log.warning("[!] Could not query input device, falling back to %d Hz mono: %s", self.sample_rate, e)
+                rate = rate or self.sample_rate
+                channels = channels or 1
+        return int(rate), int(channels)
+
     def stop(self):
         """Stops the audio stream."""
         if self.stream:
             self.stream.stop()
             self.stream.close()
             self.stream = None
-            print("[Audio] Audio stream stopped.")
+            log.info("[Audio] Audio stream stopped.")
 
     def clear_queues(self):
         self.audio_queues = []
+        self.queue_drops = {}
 
 # Simple test block
 if __name__ == "__main__":
     streamer = AudioStreamer(chunk_duration=1.0)
-    q1 = queue.Queue()
-    streamer.add_queue(q1)
+    q1 = streamer.add_reader()
     streamer.start()
     
     print("Listening for 5 seconds...")
     try:
         for _ in range(5):
             chunk = q1.get(timeout=2.0)
-            print(f"Received chunk: shape={chunk.shape}, max_amp={np.max(np.abs(chunk)):.4f}")
+            print(f"Received chunk #{chunk.seq}: shape={chunk.samples.shape}, rms={chunk.rms:.4f}, max_amp={chunk.peak:.4f}")
     except queue.Empty:
         print("Timeout waiting for audio.")
     finally:
@@ -0,0 +1,76 @@
+import queue
+import threading
+import time
+
+from src.streaming.queues import MonitoredQueue, BLOCK
+from src.streaming.rt_log import get_logger
+
+log = get_logger("decode")
+
+class DecodeExecutor(threading.Thread):
+    def __init__(self, backlog=8, block_timeout=5.0, name="decode"):
+        """
+        Single background thread that runs model decodes handed over by an intake thread, in order.
+        - backlog: maximum number of queued jobs; a full backlog makes submit() wait (BLOCK policy)
+        - block_timeout: seconds submit() waits for room before the job is dropped and counted
+        The intake thread keeps draining audio while a decode runs, so slow decodes show up as
+        backlog depth here instead of silent drops in the audio readers.
+        """
+        super().__init__(daemon=True, name=name)
+        self.jobs = MonitoredQueue(maxsize=backlog, policy=BLOCK, block_timeout=block_timeout, name=name)
+        self.running = False
+
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+        self.completed = 0
+        self.busy_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @property
+    def pending(self):
+        """Jobs queued or currently running."""
+        return self._pending
+
+    def idle(self):
+        return self._pending == 0
+
+    def submit(self, fn, *args):
+        """Queues fn(*args) for the decode thread. Returns False if the backlog stayed full and the job was dropped."""
+        with self._pending_lock:
+            self._pending += 1
+        if self.jobs.offer((time.perf_counter(), fn, args)):
+            return True
+        with self._pending_lock:
+            self._pending -= 1
+        log.warning("[Decode] Backlog full (%d jobs), dropped a decode job.", self.jobs.maxsize)
+        return False
+
+    def run(self):
+        self.running = True
+        while self.running:
+            try:
+                submitted, fn, args = self.jobs.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            start = time.perf_counter()
+            self.max_wait_seconds = max(self.max_wait_seconds, start - submitted)
+            try:
+                fn(*args)
+            except Exception as e:
+                log.error("Decode job failed: %s", e)
+            finally:
+                self.busy_seconds += time.perf_counter() - start
+                self.completed += 1
+                with self._pending_lock:
+                    self._pending -= 1
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        stats = self.jobs.stats()
+        stats.update(pending=self._pending, completed=self.completed,
+                     busy_seconds=round(self.busy_seconds, 3), max_wait_seconds=round(self.max_wait_seconds, 3))
+        return stats
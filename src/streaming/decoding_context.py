@@ -0,0 +1,56 @@
+from collections import deque
+
+# faster-whisper options suited to short conversational turns: greedy, single temperature,
+# no timestamp tokens, and no internal VAD (StreamingSTT already cut the audio at speech boundaries)
+SHORT_UTTERANCE_OPTIONS = {
+    "beam_size": 1,
+    "best_of": 1,
+    "temperature": 0.0,
+    "without_timestamps": True,
+    "condition_on_previous_text": False,
+    "vad_filter": False,
+}
+
+class DecodingContext:
+    def __init__(self, language=None, min_language_probability=0.8, prompt_words=40, **decode_options):
+        """
+        Per-session decoding state shared by every faster-whisper call of one StreamingSTT.
+        - language: pin the language up front (e.g. "en"); None = detect once, then pin
+        - min_language_probability: detection confidence required before the language is pinned
+        - prompt_words: how many words of the previous turns are passed as initial_prompt
+        - decode_options: overrides for SHORT_UTTERANCE_OPTIONS (any model.transcribe() keyword)
+        """
+        self.language = language
+        self.min_language_probability = min_language_probability
+        self.decode_options = dict(SHORT_UTTERANCE_OPTIONS, **decode_options)
+        self.history = deque(maxlen=prompt_words)
+        self.language_detections = 0
+
+    def options(self, pending_text=""):
+        """
+        Keyword arguments for model.transcribe(). pending_text is text already decoded for the
+        current utterance (earlier forced segments); it continues the prompt.
+        """
+        options = dict(self.decode_options)
+        if self.language:
+            options["language"] = self.language
+        words = list(self.history) + pending_text.split()
+        if words:
+            options["initial_prompt"] = " ".join(words[-self.history.maxlen:])
+        return options
+
+    def observe(self, info):
+        """Pins the detected language once faster-whisper is confident about it."""
+        if self.language is not None or info is None:
+            return
+        self.language_detections += 1
+        if getattr(info, "language_probability", 0.0) >= self.min_language_probability:
+            self.language = info.language
+
+    def remember(self, text):
+        """Adds a published turn to the rolling prompt."""
+        self.history.extend(text.split())
+
+    def reset(self):
+        """Forgets the prompt history (e.g. a new speaker); a pinned language is kept."""
+        self.history.clear()
@@ -18,17 +18,195 @@ from src.streaming.assistant_response_engine import AssistantResponseEngine
 from src.text_emotion.analysis import analyze_text_emotion
 from src.streaming.llm_adapter import LLMAdapter
 from src.streaming.unified_pipeline import build_text_state, process_and_print_unified_json
+from src.streaming.queues import MonitoredQueue, BLOCK, COALESCE, DROP_OLDEST
+from src.streaming.rt_log import flush_logging
+from src.streaming.tiering import TierController, STT_TIERS, SER_TIERS
+from src.ser.prosody import ProsodyGate
+
+def print_queue_stats(audio_streamer, queues):
+    """Prints drop and high-watermark counters for the audio readers and the inter-stage queues."""
+    stats = audio_streamer.get_queue_stats()
+    for q in queues:
+        stats[q.name] = q.stats()
+    print("[Queues] " + " | ".join(
+        f"{name}: dropped={s.get('dropped', 0)} hwm={s.get('high_watermark', '-')}/{s.get('maxsize') or 'inf'}"
+        for name, s in stats.items()
+    ))
+
+def _process_turn(text, ser_worker, face_worker, text_emotion_cache=None, speculation=None):
+    """
+    Fuses one finished utterance with the current SER / Face snapshots. Returns (payload, timings in ms).
+    speculation: OPTIONAL {"text", "voice_state"} computed at a provisional pause; reused when the final text matches.
+    """
+    t0 = time.perf_counter()
+
+    # 2. Run mock Text Emotion Analysis (reusing the result from a partial transcript when it already matches)
+    text_emotions = text_emotion_cache.pop(text, None) if text_emotion_cache is not None else None
+    if text_emotions is None:
+        text_emotions = analyze_text_emotion(text, threshold=0.1)
+    if text_emotion_cache is not None:
+        text_emotion_cache.clear()
+    text_state = build_text_state(text, text_emotions)
+    t1 = time.perf_counter()
+
+    # 3. Snapshot the latest SER and Face states (SER was already run at the provisional pause if the speculation held);
+    #    the SER worker adds the speech after its last full window before answering
+    if speculation is not None and speculation["text"] == text:
+        voice_state = speculation["voice_state"]
+    else:
+        voice_state = ser_worker.finish_utterance()
+    t2 = time.perf_counter()
+    face_state = face_worker.get_current_emotion()
+    t3 = time.perf_counter()
+
+    # 4. Process and Print via the Unified Central Pipeline (shares history with Options 1-3)
+    payload = process_and_print_unified_json(
+        text_state=text_state,
+        voice_state=voice_state,
+        face_state=face_state,
+        raw_text=text,
+        voice_emo_raw=voice_state.get('emotion', 'neutral'),
+        face_emo_raw=face_state.get('emotion', 'neutral')
+    )
+    t4 = time.perf_counter()
+
+    # Let the assistant react synchronously right after the sentence block
+    # response_engine.react(unified_emotion)  # Removed for json payload only
+
+    # 6. Flush the audio/face buffers so the next sentence isn't polluted with old history
+    ser_worker.clear_buffer()
+    face_worker.clear_buffer()
+
+    timings = {
+        "text_emotion_ms": (t1 - t0) * 1000,
+        "ser_ms": (t2 - t1) * 1000,
+        "face_ms": (t3 - t2) * 1000,
+        "fusion_ms": (t4 - t3) * 1000,
+        "turn_ms": (time.perf_counter() - t0) * 1000
+    }
+    return payload, timings
+
+def _run_turn_loop(text_stt_queue, ui_status_queue, ser_worker, face_worker, should_stop=None, on_turn=None,
+                   partial_queue=None, speculation_queue=None):
+    """
+    Main Thread Loop acts as the Turn-Based Orchestrator. Runs until should_stop() is True (or forever).
+    While the user is still speaking, stable partial transcripts are shown and their text emotion is
+    computed ahead of time, so a final transcript that matches the last partial skips that step.
+    Speculative transcripts (provisional pause) also pre-run SER, so a confirmed endpoint only fuses.
+    """
+    text_emotion_cache = {}
+    speculation = None
+
+    # Initial UI State
+    sys.stdout.write("\r[ 💤 Waiting for speech...  ]")
+    sys.stdout.flush()
+
+    while should_stop is None or not should_stop():
+        try:
+            # 0. Check for UI State changes from the STT worker (Non-blocking)
+            try:
+                ui_state = ui_status_queue.get_nowait()
+                if ui_state == "LISTENING":
+                    sys.stdout.write("\r[ 🎤 Listening to user...   ]")
+                elif ui_state == "ANALYZING":
+                    sys.stdout.write("\r[ ⚙️ Analyzing speech...    ]")
+                sys.stdout.flush()
+            except queue.Empty:
+                pass
+
+            # 0b. Partial transcript while the user is still talking (Non-blocking)
+            if partial_queue is not None:
+                try:
+                    partial = partial_queue.get_nowait()
+                    sys.stdout.write(f"\r[ 🎤 ...{partial[-50:]:<50} ]")
+                    sys.stdout.flush()
+                    text_emotion_cache[partial] = analyze_text_emotion(partial, threshold=0.1)
+                except queue.Empty:
+                    pass
+
+            # 0c. Speculative transcript at a provisional pause: do the turn-end work ahead of the endpoint
+            if speculation_queue is not None:
+                try:
+                    speculative_text = speculation_queue.get_nowait()
+                    if speculative_text not in text_emotion_cache:
+                        text_emotion_cache[speculative_text] = analyze_text_emotion(speculative_text, threshold=0.1)
+                    speculation = {"text": speculative_text, "voice_state": ser_worker.finish_utterance()}
+                    speculation_queue.task_done()
+                except queue.Empty:
+                    pass
+
+            # 1. Wait for user to stop speaking & STT to yield a transcribed sentence
+            text = text_stt_queue.get(timeout=0.1)
+
+            payload, timings = _process_turn(text, ser_worker, face_worker, text_emotion_cache, speculation)
+            timings["speculation_hit"] = speculation is not None and speculation["text"] == text
+            speculation = None
+            if on_turn:
+                on_turn(text, payload, timings)
+
+            # Reset UI state
+            sys.stdout.write("\n\n\r[ 💤 Waiting for speech...  ]")
+            sys.stdout.flush()
+
+        except queue.Empty:
+            # Sleep briefly and keep waiting for STT to produce a sentence
+            time.sleep(0.01)
+
+def _build_queues():
+    # 1. Initialize Communication Queues
+    # Transcripts must not be lost, so STT waits briefly for room; the UI only needs the latest VAD state.
+    text_stt_queue = MonitoredQueue(maxsize=32, policy=BLOCK, block_timeout=1.0, name="text")       # STT outputs raw text here
+    ui_status_queue = MonitoredQueue(maxsize=1, policy=COALESCE, name="ui_status")                # STT VAD sends LISTENING/ANALYZING flags here
+    partial_queue = MonitoredQueue(maxsize=1, policy=COALESCE, name="partial")                    # STT stable partial transcripts (latest wins)
+    speculation_queue = MonitoredQueue(maxsize=1, policy=COALESCE, name="speculation")            # STT speculative transcripts at provisional pauses
+    return text_stt_queue, ui_status_queue, partial_queue, speculation_queue
+
+def _build_audio_workers(audio_source, text_stt_queue, ui_status_queue, partial_queue=None, speculation_queue=None):
+    # STT and SER each read the shared ring buffer through their own cursor instead of receiving copies
+    stt_audio_queue = audio_source.add_reader(name="stt", policy=DROP_OLDEST)
+    ser_audio_queue = audio_source.add_reader(name="ser", policy=DROP_OLDEST)
+
+    # Model tiers adapt to the host's load at runtime: start cheap, move up while the latency SLO allows
+    stt_tiers = TierController(STT_TIERS, slo_seconds=1.0, start_tier=0, name="stt")
+    ser_tiers = TierController(SER_TIERS, slo_seconds=0.4, start_tier=0, short_seconds=0.0, name="ser")  # 1 s windows
+
+    # STT (Faster-Whisper CPU) waits for trailing silence to extract sentences naturally
+    stt_worker = StreamingSTT(audio_queue=stt_audio_queue, text_queue=text_stt_queue, status_queue=ui_status_queue, trailing_silence_seconds=1.5,
+                              partial_queue=partial_queue, partial_interval_seconds=1.0,
+                              provisional_silence_seconds=0.5, speculation_queue=speculation_queue,
+                              tier_controller=stt_tiers)
+    
+    # SER (Wav2Vec2 Dynamic Build)
+    # int8 dynamic quantization; falls back to eager fp32 if it does not match the eager model's labels.
+    # A prosodic first tier settles confident windows without wav2vec2 once it has been fitted
+    # (python src/ser/prosody.py <labelled folder>); until then load() returns None and every window escalates.
+    ser_worker = StreamingSER(audio_queue=ser_audio_queue, emotion_queue=None, tier_controller=ser_tiers,
+                              backend="int8", prosody_gate=ProsodyGate.load()) # queue no longer needed
+    return stt_worker, ser_worker
+
+def _shutdown(audio_source, workers, queues):
+    audio_source.stop()
+    for worker in workers:
+        worker.stop()
+
+    # Wait for threads
+    for worker in workers:
+        worker.join(timeout=2)
+    flush_logging()
+    print_queue_stats(audio_source, queues)
+    for worker in workers:
+        tiers = getattr(worker, "tier_controller", None)
+        if tiers is not None:
+            print(f"[Tiers] {tiers.name}: {tiers.stats()}")
+        if getattr(worker, "prosody_gate", None) is not None:
+            print(f"[SER cascade] {worker.cascade_stats()}")
 
 def run_live_streaming_session():
     print("\n=======================================================")
     print(">>> HUMANOID ASSISTANT V2.1 - TURN-BASED INTERACTION")
     print("=======================================================")
     
-    # 1. Initialize Communication Queues
-    stt_audio_queue = queue.Queue(maxsize=100)
-    ser_audio_queue = queue.Queue(maxsize=100)
-    text_stt_queue = queue.Queue()      # STT outputs raw text here
-    ui_status_queue = queue.Queue()     # STT VAD sends LISTENING/ANALYZING flags here
+    text_stt_queue, ui_status_queue, partial_queue, speculation_queue = _build_queues()
 
     print("\n[INIT] Booting components...")
     
@@ -39,14 +217,8 @@ def run_live_streaming_session():
     # 2. Initialize Workers
     # Audio Input (Non-blocking Broadcaster)
     audio_streamer = AudioStreamer()
-    audio_streamer.add_queue(stt_audio_queue)
-    audio_streamer.add_queue(ser_audio_queue)
-
-    # STT (Faster-Whisper CPU) waits for trailing silence to extract sentences naturally
-    stt_worker = StreamingSTT(audio_queue=stt_audio_queue, text_queue=text_stt_queue, status_queue=ui_status_queue, model_size="tiny", trailing_silence_seconds=1.5)
-    
-    # SER (Wav2Vec2 Dynamic Build)
-    ser_worker = StreamingSER(audio_queue=ser_audio_queue, emotion_queue=None) # queue no longer needed
+    stt_worker, ser_worker = _build_audio_workers(audio_streamer, text_stt_queue, ui_status_queue,
+                                                   partial_queue, speculation_queue)
     
     # Face (OpenFace Subprocess tailing)
     timestamp = time.strftime("%Y-%m-%d-%H-%M-%S")
@@ -70,77 +242,85 @@ def run_live_streaming_session():
         print("\n[OK] System Live! Speak and show expressions into the camera.")
         print("Press Ctrl+C to terminate the live session...\n")
         
-        # Initial UI State
-        sys.stdout.write("\r[ 💤 Waiting for speech...  ]")
-        sys.stdout.flush()
-        
-        # Initial UI State
-        sys.stdout.write("\r[ 💤 Waiting for speech...  ]")
-        sys.stdout.flush()
-        
-        # Main Thread Loop acts as the Turn-Based Orchestrator
-        while True:
-            try:
-                # 0. Check for UI State changes from the STT worker (Non-blocking)
-                try:
-                    ui_state = ui_status_queue.get_nowait()
-                    if ui_state == "LISTENING":
-                        sys.stdout.write("\r[ 🎤 Listening to user...   ]")
-                    elif ui_state == "ANALYZING":
-                        sys.stdout.write("\r[ ⚙️ Analyzing speech...    ]")
-                    sys.stdout.flush()
-                except queue.Empty:
-                    pass
-                
-                # 1. Wait for user to stop speaking & STT to yield a transcribed sentence
-                text = text_stt_queue.get(timeout=0.1)
-                
-                # 2. Run mock Text Emotion Analysis
-                text_emotions = analyze_text_emotion(text, threshold=0.1)
-                text_state = build_text_state(text, text_emotions)
-                
-                # 3. Snapshot the latest SER and Face states
-                voice_state = ser_worker.get_current_emotion()
-                face_state = face_worker.get_current_emotion()
-                
-                # 4. Process and Print via the Unified Central Pipeline (shares history with Options 1-3)
-                payload = process_and_print_unified_json(
-                    text_state=text_state,
-                    voice_state=voice_state,
-                    face_state=face_state,
-                    raw_text=text,
-                    voice_emo_raw=voice_state.get('emotion', 'neutral'),
-                    face_emo_raw=face_state.get('emotion', 'neutral')
-                )
-                
-                # Let the assistant react synchronously right after the sentence block
-                # response_engine.react(unified_emotion)  # Removed for json payload only
-                
-                # 6. Flush the audio/face buffers so the next sentence isn't polluted with old history
-                ser_worker.clear_buffer()
-                face_worker.clear_buffer()
-                
-                # Reset UI state
-                sys.stdout.write("\n\n\r[ 💤 Waiting for speech...  ]")
-                sys.stdout.flush()
-                
-            except queue.Empty:
-                # Sleep briefly and keep waiting for STT to produce a sentence
-                time.sleep(0.01)
+        _run_turn_loop(text_stt_queue, ui_status_queue, ser_worker, face_worker,
+                       partial_queue=partial_queue, speculation_queue=speculation_queue)
 
     except KeyboardInterrupt:
         print("\n\n[!] Shutting down streaming system...")
     finally:
-        audio_streamer.stop()
-        stt_worker.stop()
-        ser_worker.stop()
-        face_worker.stop()
-        
-        # Wait for threads
-        stt_worker.join(timeout=2)
-        ser_worker.join(timeout=2)
-        face_worker.join(timeout=2)
+        _shutdown(audio_streamer, [stt_worker, ser_worker, face_worker],
+                  [text_stt_queue, ui_status_queue, partial_queue, speculation_queue, stt_worker.decoder])
         print("[OK] Shutdown complete.")
 
+def run_replay_session(wav_path, csv_path=None, speed=0.0):
+    """
+    Drives the same turn-based pipeline from a recorded WAV (+ optional OpenFace CSV) instead of live devices.
+    speed: 1.0 = real time, >1.0 = accelerated, 0 = as fast as possible (deterministic lockstep).
+    Returns a list of per-turn timing dicts.
+    """
+    from src.streaming.replay import ReplayClock, ReplayAudioSource, ReplayFace
+
+    print("\n=======================================================")
+    print(">>> HUMANOID ASSISTANT V2.1 - SESSION REPLAY")
+    print("=======================================================")
+
+    text_stt_queue, ui_status_queue, partial_queue, speculation_queue = _build_queues()
+
+    from src.text_emotion.analysis import load_emotion_model
+    load_emotion_model()
+
+    clock = ReplayClock()
+    completed_turns = [0]
+    turn_log = []
+
+    # In lockstep mode the source also waits while Whisper decodes, a speculation is being pre-analyzed or a
+    # transcript is queued / being fused,
+    # so SER never sees audio from the next utterance before the buffers are cleared.
+    audio_source = ReplayAudioSource(wav_path, speed=speed, clock=clock,
+                                     hold=lambda: (not stt_worker.decoder.idle()
+                                                   or speculation_queue.unfinished_tasks > 0
+                                                   or text_stt_queue.put_count > completed_turns[0]))
+    stt_worker, ser_worker = _build_audio_workers(audio_source, text_stt_queue, ui_status_queue,
+                                                   partial_queue, speculation_queue)
+    audio_source.lockstep = [stt_worker, ser_worker]
+
+    face_worker = ReplayFace(csv_path, clock)
+
+    def on_turn(text, payload, timings):
+        timings = dict(timings, turn=len(turn_log) + 1, media_time_s=clock.position,
+                       stt_decode_ms=stt_worker.last_decode_seconds * 1000, text=text)
+        turn_log.append(timings)
+        completed_turns[0] += 1
+
+    def should_stop():
+        return (audio_source.drained() and stt_worker.decoder.idle() and text_stt_queue.empty()
+                and completed_turns[0] >= text_stt_queue.put_count)
+
+    wall_start = time.perf_counter()
+    try:
+        stt_worker.start()
+        ser_worker.start()
+        face_worker.start()
+        audio_source.start()
+        _run_turn_loop(text_stt_queue, ui_status_queue, ser_worker, face_worker,
+                       should_stop=should_stop, on_turn=on_turn, partial_queue=partial_queue,
+                       speculation_queue=speculation_queue)
+    except KeyboardInterrupt:
+        print("\n\n[!] Replay interrupted.")
+    finally:
+        _shutdown(audio_source, [stt_worker, ser_worker, face_worker],
+                  [text_stt_queue, ui_status_queue, partial_queue, speculation_queue, stt_worker.decoder])
+
+    wall = time.perf_counter() - wall_start
+    print(f"\n[Replay] {len(turn_log)} turns, {clock.position:.1f}s of media in {wall:.1f}s wall time")
+    for t in turn_log:
+        print(f"  turn {t['turn']:>3} @ {t['media_time_s']:7.2f}s | stt {t['stt_decode_ms']:7.1f} ms | "
+              f"text {t['text_emotion_ms']:7.1f} ms | ser {t['ser_ms']:7.1f} ms | face {t['face_ms']:6.1f} ms | "
+              f"fusion {t['fusion_ms']:6.1f} ms | turn {t['turn_ms']:7.1f} ms"
+              f"{' | speculative' if t.get('speculation_hit') else ''}")
+    print(f"[Replay] Speculative endpoints: {stt_worker.speculation_hits} committed, "
+          f"{stt_worker.speculation_misses} discarded")
+    return turn_log
+
 if __name__ == "__main__":
     run_live_streaming_session()
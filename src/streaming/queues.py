@@ -0,0 +1,88 @@
+import queue
+
+# Overflow policies shared by MonitoredQueue and RingReader
+DROP_NEWEST = "drop_newest"   # Reject the incoming item when full
+DROP_OLDEST = "drop_oldest"   # Evict the oldest queued item to make room
+COALESCE = "coalesce"         # Only the latest item matters: replace whatever is queued
+BLOCK = "block"               # Wait up to block_timeout for room, then drop the incoming item
+
+OVERFLOW_POLICIES = (DROP_NEWEST, DROP_OLDEST, COALESCE, BLOCK)
+
+def validate_policy(policy, allowed=OVERFLOW_POLICIES):
+    if policy not in allowed:
+        raise ValueError(f"Unknown overflow policy '{policy}'. Expected one of: {', '.join(allowed)}")
+    return policy
+
+class MonitoredQueue(queue.Queue):
+    def __init__(self, maxsize=0, policy=DROP_NEWEST, block_timeout=0.1, name="queue"):
+        """
+        queue.Queue with a configurable overflow policy and runtime counters.
+        put() never raises queue.Full; overflow is resolved by the policy and counted instead.
+        - policy: one of DROP_NEWEST, DROP_OLDEST, COALESCE, BLOCK
+        - block_timeout: seconds a BLOCK producer waits for room before dropping, unless put() passes its own
+                         timeout (put(block=False) / put_nowait() never wait)
+        """
+        super().__init__(maxsize=maxsize)
+        self.policy = validate_policy(policy)
+        self.block_timeout = block_timeout
+        self.name = name
+
+        self.put_count = 0
+        self.dropped = 0
+        self.high_watermark = 0
+
+    def put(self, item, block=True, timeout=None):
+        self.offer(item, block=block, timeout=timeout)
+
+    def put_nowait(self, item):
+        self.offer(item, block=False)
+
+    def offer(self, item, block=True, timeout=None):
+        """
+        Enqueues item according to the overflow policy. Returns False if an item was dropped.
+        Only BLOCK ever waits: up to `timeout` (default block_timeout), or not at all when block is False.
+        """
+        if self.policy == BLOCK:
+            try:
+                super().put(item, block=block, timeout=self.block_timeout if timeout is None else timeout)
+            except queue.Full:
+                self.dropped += 1
+                return False
+            self._record_put()
+            return True
+
+        with self.not_full:
+            accepted = True
+            if self.policy == COALESCE:
+                self.dropped += len(self.queue)
+                self.unfinished_tasks -= len(self.queue)
+                self.queue.clear()
+            elif 0 < self.maxsize <= self._qsize():
+                if self.policy == DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                self.queue.popleft()
+                self.unfinished_tasks -= 1
+                self.dropped += 1
+                accepted = False
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+        self._record_put()
+        return accepted
+
+    def _record_put(self):
+        self.put_count += 1
+        depth = self.qsize()
+        if depth > self.high_watermark:
+            self.high_watermark = depth
+
+    def stats(self):
+        return {
+            "policy": self.policy,
+            "depth": self.qsize(),
+            "maxsize": self.maxsize,
+            "puts": self.put_count,
+            "dropped": self.dropped,
+            "high_watermark": self.high_watermark
+        }
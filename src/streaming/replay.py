@@ -0,0 +1,188 @@
+import os
+import sys
+import time
+import threading
+import numpy as np
+import pandas as pd
+import soundfile as sf
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from src.streaming.audio_stream import AudioStreamer
+from src.streaming.streaming_face import StreamingFace
+from src.streaming.resample import PolyphaseResampler
+from src.streaming.rt_log import get_logger
+
+log = get_logger("replay")
+
+class ReplayClock:
+    def __init__(self):
+        """Media-time clock shared by the replay sources (seconds of recording delivered so far)."""
+        self.position = 0.0
+
+
+class ReplayAudioSource(AudioStreamer):
+    def __init__(self, wav_path, speed=1.0, clock=None, tail_silence=3.0, lockstep=None, hold=None,
+                 sample_rate=16000, chunk_duration=0.25, ring_seconds=60.0):
+        """
+        Drop-in replacement for AudioStreamer that feeds a recorded WAV file to the same ring buffer consumers.
+        - speed: 1.0 = real time, >1.0 = accelerated, 0 / None = as fast as possible
+        - tail_silence: seconds of silence appended after the file so the last utterance reaches its endpoint
+        - lockstep: workers exposing processed_seq; in as-fast-as-possible mode every block waits until
+                    they have fully processed the previous one, which makes runs deterministic
+        - hold: optional callable; while it returns True the source waits (e.g. a turn is being fused)
+        """
+        super().__init__(sample_rate=sample_rate, chunk_duration=chunk_duration, ring_seconds=ring_seconds)
+        self.wav_path = wav_path
+        self.speed = speed or 0.0
+        self.clock = clock or ReplayClock()
+        self.tail_silence = tail_silence
+        self.lockstep = lockstep or []
+        self.hold = hold
+        self.lockstep_timeout = 60.0
+
+        self.finished = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        log.info("[Replay] Streaming %s at %s speed...", self.wav_path, "max" if not self.speed else f"{self.speed:g}x")
+        self._thread = threading.Thread(target=self._feed, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+            log.info("[Replay] Audio replay stopped.")
+
+    def _blocks(self):
+        """Yields 16 kHz mono blocks for the file followed by the silent tail."""
+        with sf.SoundFile(self.wav_path) as f:
+            capture_block = int(round(f.samplerate * self.chunk_duration))
+            self.resampler = PolyphaseResampler(f.samplerate, self.sample_rate, channels=f.channels, max_block=capture_block)
+            for block in f.blocks(blocksize=capture_block, dtype='float32', always_2d=True):
+                yield self.resampler.process(block)
+
+        silence = np.zeros(self.blocksize, dtype=np.float32)
+        for _ in range(int(np.ceil(self.tail_silence / self.chunk_duration))):
+            yield silence
+
+    def _wait_for_consumers(self):
+        """Lockstep: block until every worker has processed the last written block and nothing is on hold."""
+        last_seq = self.ring.write_seq - 1
+        deadline = time.monotonic() + self.lockstep_timeout
+        while not self._stop_event.is_set() and time.monotonic() < deadline:
+            behind = any(getattr(w, "processed_seq", last_seq) < last_seq for w in self.lockstep)
+            if not behind and not (self.hold and self.hold()):
+                return
+            time.sleep(0.002)
+
+    def _feed(self):
+        start = time.monotonic()
+        for block in self._blocks():
+            if self._stop_event.is_set():
+                break
+
+            if self.speed > 0:
+                # Pace against the wall clock so that media time advances at `speed` x real time
+                due = start + self.clock.position / self.speed
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                self._wait_for_consumers()
+
+            self.ring.write(block)
+            self.clock.position += len(block) / self.sample_rate
+
+        if not self.speed:
+            self._wait_for_consumers()
+        self.finished.set()
+
+    def drained(self):
+        """True once the whole file has been delivered and every lockstep worker has caught up."""
+        if not self.finished.is_set():
+            return False
+        last_seq = self.ring.write_seq - 1
+        return all(getattr(w, "processed_seq", last_seq) >= last_seq for w in self.lockstep)
+
+
+class ReplayFace(StreamingFace):
+    def __init__(self, csv_path, clock, poll_interval=0.1):
+        """
+        StreamingFace fed from a recorded OpenFace CSV instead of a live OpenFace process.
+        Rows are released when their 'timestamp' is reached by the shared ReplayClock, so face
+        evidence stays aligned with the replayed audio at any speed.
+        csv_path may be None for audio-only replays.
+        """
+        super().__init__(face_queue=None, csv_path=csv_path, openface_exe=None, poll_interval=poll_interval)
+        self.clock = clock
+        self.lock = threading.Lock()
+
+        self.rows = None
+        self.timestamps = np.array([])
+        if csv_path:
+            df = pd.read_csv(csv_path)
+            df.columns = df.columns.str.strip()
+            self.rows = df.sort_values("timestamp").reset_index(drop=True)
+            self.timestamps = self.rows["timestamp"].to_numpy()
+
+    def start_openface(self):
+        if self.rows is None:
+            log.info("[Face] No OpenFace CSV given, replaying audio only.")
+        else:
+            log.info("[Face] Replaying %d OpenFace rows from %s", len(self.rows), self.csv_path)
+
+    def run(self):
+        self.running = True
+        self.start_openface()
+        while self.running:
+            try:
+                self._poll_csv()
+            except Exception as e:
+                log.error("Error replaying Face CSV: %s", e)
+            time.sleep(self.poll_interval)
+
+    def _poll_csv(self):
+        """Ingests every row whose timestamp is now behind the replay clock."""
+        if self.rows is None:
+            return
+        with self.lock:
+            end = int(np.searchsorted(self.timestamps, self.clock.position, side="right"))
+            if end > self.last_row_read:
+                self._ingest_rows(self.rows.iloc[self.last_row_read:end])
+                self.last_row_read = end
+
+    def stop(self):
+        self.running = False
+        log.info("Stopped Replay Face worker.")
+
+    def get_current_emotion(self):
+        # Catch up to the clock first so the snapshot does not depend on poll timing
+        self._poll_csv()
+        with self.lock:
+            return super().get_current_emotion()
+
+    def clear_buffer(self):
+        with self.lock:
+            super().clear_buffer()
+
+
+if __name__ == "__main__":
+    import argparse
+    from src.streaming.live_orchestrator import run_replay_session
+
+    parser = argparse.ArgumentParser(description="Replay a recorded session through the live turn-based pipeline.")
+    parser.add_argument("wav", help="Recorded audio (any rate / channel count)")
+    parser.add_argument("--csv", default=None, help="Recorded OpenFace CSV for the same session")
+    parser.add_argument("--speed", type=float, default=0.0, help="1 = real time, 4 = 4x, 0 = as fast as possible (default)")
+    args = parser.parse_args()
+
+    run_replay_session(args.wav, csv_path=args.csv, speed=args.speed)
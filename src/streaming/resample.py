@@ -0,0 +1,141 @@
+import time
+from math import gcd, ceil
+import numpy as np
+from scipy.signal import firwin
+
+class PolyphaseResampler:
+    def __init__(self, in_rate, out_rate=16000, channels=1, taps_per_phase=24, max_block=None):
+        """
+        Streaming downmix + rational polyphase resampler (e.g. 44.1/48 kHz stereo -> 16 kHz mono).
+        - taps_per_phase: FIR length per polyphase branch; added latency is about taps_per_phase / 2 input samples
+        - max_block: largest input block expected; enables fully preallocated steady-state processing
+        Filter state is carried across blocks, so consecutive calls produce one continuous signal.
+        """
+        self.in_rate = int(in_rate)
+        self.out_rate = int(out_rate)
+        self.channels = int(channels)
+
+        g = gcd(self.in_rate, self.out_rate)
+        self.up = self.out_rate // g
+        self.down = self.in_rate // g
+        self.passthrough = (self.up == self.down)
+
+        self.taps = taps_per_phase
+        if not self.passthrough:
+            # Low-pass at the narrower of the two Nyquist bands (relative to the upsampled rate)
+            cutoff = 0.95 / max(self.up, self.down)
+            h = firwin(taps_per_phase * self.up, cutoff, window=("kaiser", 6.0)) * self.up
+            # phases[p, k] = h[p + k * up]
+            self.phases = np.ascontiguousarray(h.reshape(taps_per_phase, self.up).T, dtype=np.float32)
+        else:
+            self.phases = None
+
+        # Streaming state: last (taps - 1) input samples and the next output position in upsampled units
+        self.history = np.zeros(self.taps - 1, dtype=np.float32)
+        self.consumed = 0
+        self.next_m = 0
+
+        # Preallocated work buffers, grown on demand
+        self._plan_cache = {}
+        self._alloc(max_block or 0)
+
+    def _alloc(self, block):
+        self._block = block
+        n_out = self.output_length(block) + 1
+        self._mono = np.zeros(block, dtype=np.float32)
+        self._buf = np.zeros(block + self.taps - 1, dtype=np.float32)
+        self._gather = np.zeros((n_out, self.taps), dtype=np.float32)
+        self._out = np.zeros(n_out, dtype=np.float32)
+
+    def output_length(self, n_in):
+        """Upper bound on output samples produced for n_in input samples."""
+        return int(ceil(n_in * self.up / self.down)) + 1
+
+    @property
+    def latency_seconds(self):
+        """Group delay of the anti-aliasing filter, in seconds."""
+        if self.passthrough:
+            return 0.0
+        return ((self.taps * self.up - 1) / 2.0) / self.up / self.in_rate
+
+    def _downmix(self, block):
+        block = np.asarray(block, dtype=np.float32)
+        if block.ndim == 1:
+            return block
+        if block.shape[1] == 1:
+            return block[:, 0]
+        mono = self._mono[:block.shape[0]]
+        np.mean(block, axis=1, out=mono)
+        return mono
+
+    def _plan(self, n_in):
+        """Gather indices and filter rows for one block. Cached, since fixed block sizes repeat the same pattern."""
+        offset = self.next_m - self.consumed * self.up
+        key = (offset, n_in)
+        plan = self._plan_cache.get(key)
+        if plan is None:
+            # Output n uses input samples floor(m/up) - k for k < taps, with m = next_m + n * down
+            n_out = max(0, int(ceil((n_in * self.up - offset) / self.down)))
+            m = offset + np.arange(n_out, dtype=np.int64) * self.down
+            base = m // self.up + (self.taps - 1)
+            idx = base[:, None] - np.arange(self.taps)[None, :]
+            rows = self.phases[m % self.up]
+            plan = (n_out, idx, rows)
+            if len(self._plan_cache) < 64:
+                self._plan_cache[key] = plan
+        return plan
+
+    def process(self, block):
+        """
+        Resamples one (frames,) or (frames, channels) block.
+        Returns a view into an internal buffer, valid until the next call; copy it if you need to keep it.
+        """
+        n_in = len(block)
+        if n_in > self._block:
+            self._alloc(n_in)
+
+        mono = self._downmix(block)
+        if self.passthrough:
+            return mono
+
+        buf = self._buf[:n_in + self.taps - 1]
+        buf[:self.taps - 1] = self.history
+        buf[self.taps - 1:] = mono
+
+        n_out, idx, rows = self._plan(n_in)
+        gather = self._gather[:n_out]
+        out = self._out[:n_out]
+        np.take(buf, idx, out=gather)
+        np.einsum("nk,nk->n", gather, rows, out=out)
+
+        self.history[:] = buf[n_in:]
+        self.next_m += n_out * self.down
+        self.consumed += n_in
+        return out
+
+    def reset(self):
+        self.history[:] = 0.0
+        self.consumed = 0
+        self.next_m = 0
+
+
+def benchmark_resampler(in_rate, channels, out_rate=16000, seconds=30.0, chunk_duration=0.25):
+    """Returns the processing cost in milliseconds per second of captured audio."""
+    block = int(round(in_rate * chunk_duration))
+    resampler = PolyphaseResampler(in_rate, out_rate, channels=channels, max_block=block)
+    rng = np.random.default_rng(0)
+    audio = rng.standard_normal((block, channels)).astype(np.float32) * 0.1
+
+    n_blocks = int(seconds / chunk_duration)
+    start = time.perf_counter()
+    for _ in range(n_blocks):
+        resampler.process(audio)
+    elapsed = time.perf_counter() - start
+    return 1000.0 * elapsed / (n_blocks * chunk_duration)
+
+if __name__ == "__main__":
+    for rate, channels in [(44100, 1), (44100, 2), (48000, 1), (48000, 2), (48000, 4)]:
+        r = PolyphaseResampler(rate, 16000, channels=channels)
+        cost = benchmark_resampler(rate, channels)
+        print(f"{rate:>6} Hz x{channels} -> 16000 Hz mono: {cost:.3f} ms per second of audio "
+              f"(added latency {r.latency_seconds * 1000:.2f} ms)")
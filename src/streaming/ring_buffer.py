@@ -0,0 +1,131 @@
+import queue
+import time
+import threading
+import numpy as np
+
+from src.streaming.audio_chunk import AudioChunk, block_stats
+from src.streaming.queues import DROP_OLDEST, COALESCE, validate_policy
+
+# The callback thread can never block or refuse a block, so readers resolve overflow on their side
+READER_POLICIES = (DROP_OLDEST, COALESCE)
+
+class AudioRingBuffer:
+    def __init__(self, slot_size, num_slots=240):
+        """
+        Preallocated float32 ring of fixed-size audio blocks shared by every consumer of a stream.
+        - slot_size: maximum samples per block (the streamer's blocksize)
+        - num_slots: number of blocks retained (240 x 250ms = 60 seconds of history)
+        The writer (PortAudio callback) never allocates; readers get zero-copy views through RingReader cursors.
+        """
+        self.slot_size = slot_size
+        self.num_slots = num_slots
+        self.samples = np.zeros((num_slots, slot_size), dtype=np.float32)
+        self.lengths = np.zeros(num_slots, dtype=np.int32)
+
+        # Per-slot envelope metadata, filled once at capture time
+        self.seqs = np.zeros(num_slots, dtype=np.int64)
+        self.capture_times = np.zeros(num_slots, dtype=np.float64)
+        self.rms = np.zeros(num_slots, dtype=np.float32)
+        self.peaks = np.zeros(num_slots, dtype=np.float32)
+
+        # Total number of blocks ever written. Slot for block n is n % num_slots.
+        self.write_seq = 0
+        self._cond = threading.Condition()
+
+    def write(self, block, capture_time=None):
+        """Copies one block into the next slot, records its envelope and wakes up any waiting readers."""
+        slot = self.write_seq % self.num_slots
+        n = min(len(block), self.slot_size)
+        self.samples[slot, :n] = block[:n]
+        self.lengths[slot] = n
+
+        rms, peak = block_stats(self.samples[slot, :n])
+        self.seqs[slot] = self.write_seq
+        self.capture_times[slot] = time.monotonic() if capture_time is None else capture_time
+        self.rms[slot] = rms
+        self.peaks[slot] = peak
+
+        with self._cond:
+            self.write_seq += 1
+            self._cond.notify_all()
+
+    def reader(self, policy=DROP_OLDEST, max_lag=None, name="reader"):
+        """Creates an independent cursor starting at the newest block."""
+        return RingReader(self, policy=policy, max_lag=max_lag, name=name)
+
+
+class RingReader:
+    def __init__(self, ring, policy=DROP_OLDEST, max_lag=None, name="reader"):
+        """
+        Independent read cursor into an AudioRingBuffer.
+        Exposes the same get(timeout=...) / queue.Empty contract as queue.Queue so workers can use it as a drop-in.
+        get() returns an AudioChunk whose samples are a view into the ring: they stay valid until the writer laps this reader,
+        so consumers must copy them into their own buffers before falling a full ring behind.
+        - policy: DROP_OLDEST skips just enough old blocks to get back within max_lag,
+                  COALESCE jumps straight to the newest block (for consumers that only care about "now")
+        - max_lag: backlog in blocks tolerated before the policy kicks in (defaults to the whole ring)
+        """
+        self.ring = ring
+        self.policy = validate_policy(policy, READER_POLICIES)
+        self.max_lag = ring.num_slots - 2 if max_lag is None else max(1, min(max_lag, ring.num_slots - 2))
+        self.name = name
+        self.cursor = ring.write_seq
+        self.overruns = 0
+        self.high_watermark = 0
+        self.last_seq = None
+        self.gaps = 0
+
+    def _has_data(self):
+        return self.cursor < self.ring.write_seq
+
+    def get(self, timeout=None):
+        ring = self.ring
+        with ring._cond:
+            if not self._has_data():
+                if not ring._cond.wait_for(self._has_data, timeout=timeout):
+                    raise queue.Empty
+            head = ring.write_seq
+
+        # max_lag always leaves one slot of margin so we never hand out the slot the writer is about to fill
+        lag = head - self.cursor
+        if lag > self.high_watermark:
+            self.high_watermark = lag
+        if lag > self.max_lag:
+            skipped = lag - 1 if self.policy == COALESCE else lag - self.max_lag
+            self.overruns += skipped
+            self.cursor += skipped
+
+        slot = self.cursor % ring.num_slots
+        self.cursor += 1
+        chunk = AudioChunk(
+            int(ring.seqs[slot]), float(ring.capture_times[slot]),
+            ring.samples[slot, :ring.lengths[slot]],
+            float(ring.rms[slot]), float(ring.peaks[slot])
+        )
+        self._track_gap(chunk.seq)
+        return chunk
+
+    def _track_gap(self, seq):
+        if self.last_seq is not None and seq > self.last_seq + 1:
+            self.gaps += seq - self.last_seq - 1
+        self.last_seq = seq
+
+    def get_nowait(self):
+        return self.get(timeout=0)
+
+    def qsize(self):
+        """Number of blocks written but not yet consumed by this reader."""
+        return min(self.ring.write_seq - self.cursor, self.max_lag)
+
+    def empty(self):
+        return not self._has_data()
+
+    def stats(self):
+        return {
+            "policy": self.policy,
+            "depth": self.qsize(),
+            "maxsize": self.max_lag,
+            "dropped": self.overruns,
+            "gaps": self.gaps,
+            "high_watermark": self.high_watermark
+        }
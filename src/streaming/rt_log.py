@@ -0,0 +1,82 @@
+import sys
+import time
+import queue
+import logging
+import threading
+import logging.handlers
+
+# All streaming workers log under this namespace; records are handed to a background
+# listener thread so that no console I/O ever happens on audio callbacks or worker loops.
+ROOT_LOGGER_NAME = "streaming"
+
+_lock = threading.Lock()
+_log_queue = queue.SimpleQueue()
+_listener = None
+
+class RateLimitFilter(logging.Filter):
+    def __init__(self, interval=5.0, min_level=logging.WARNING):
+        """
+        Lets each distinct message template at `min_level` or above through at most once per `interval`
+        seconds (the repeating errors of a hot loop); lower levels always pass.
+        The next message that gets through reports how many similar ones were suppressed.
+        """
+        super().__init__()
+        self.interval = interval
+        self.min_level = min_level
+        self._last_emit = {}
+        self._suppressed = {}
+
+    def filter(self, record):
+        if record.levelno < self.min_level:
+            return True
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        last = self._last_emit.get(key)
+        if last is not None and now - last < self.interval:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return False
+
+        self._last_emit[key] = now
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+def configure_logging(level=logging.INFO, rate_limit_seconds=5.0, stream=None):
+    """
+    (Re)configures the streaming logger: severity threshold, rate limit and console destination.
+    Called implicitly by get_logger() with defaults.
+    """
+    global _listener
+    with _lock:
+        root = logging.getLogger(ROOT_LOGGER_NAME)
+        root.setLevel(level)
+        root.propagate = False
+
+        if _listener is not None:
+            _listener.stop()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+
+        queue_handler = logging.handlers.QueueHandler(_log_queue)
+        queue_handler.addFilter(RateLimitFilter(rate_limit_seconds))
+        root.addHandler(queue_handler)
+
+        console = logging.StreamHandler(stream or sys.stdout)
+        console.setFormatter(logging.Formatter("%(message)s"))
+        _listener = logging.handlers.QueueListener(_log_queue, console, respect_handler_level=True)
+        _listener.start()
+
+def get_logger(name):
+    """Returns a queue-backed, rate-limited logger for a streaming component (e.g. 'stt', 'audio')."""
+    if _listener is None:
+        configure_logging()
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}")
+
+def flush_logging():
+    """Drains pending records to the console. Call at shutdown, outside of any hot loop."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener.start()
@@ -0,0 +1,93 @@
+import numpy as np
+
+class SegmentBuffer:
+    def __init__(self, initial_seconds=10.0, sample_rate=16000, dtype=np.float32, max_retained_seconds=60.0):
+        """
+        Growable utterance buffer with amortized O(1) append and zero-copy views.
+        - initial_seconds: starting capacity; doubles whenever it runs out
+        - dtype: np.float32, or np.int16 for compact storage (half the memory, converted on read)
+        - max_retained_seconds: after clear(), capacity above this is released so one long monologue
+          does not pin memory for the rest of the session
+        """
+        if dtype not in (np.float32, np.int16):
+            raise ValueError("SegmentBuffer supports np.float32 or np.int16 storage")
+        self.sample_rate = sample_rate
+        self.dtype = dtype
+        self.initial_capacity = max(1, int(initial_seconds * sample_rate))
+        self.max_retained = max(self.initial_capacity, int(max_retained_seconds * sample_rate))
+
+        self._data = np.zeros(self.initial_capacity, dtype=dtype)
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def capacity(self):
+        return len(self._data)
+
+    @property
+    def duration(self):
+        return self.length / self.sample_rate
+
+    def _reserve(self, needed):
+        if needed <= len(self._data):
+            return
+        new_capacity = len(self._data)
+        while new_capacity < needed:
+            new_capacity *= 2
+        grown = np.zeros(new_capacity, dtype=self.dtype)
+        grown[:self.length] = self._data[:self.length]
+        self._data = grown
+
+    def append(self, samples):
+        """Appends float samples in -1..1 (converted to int16 when storage is compact)."""
+        n = len(samples)
+        self._reserve(self.length + n)
+        dest = self._data[self.length:self.length + n]
+        if self.dtype == np.int16:
+            dest[:] = np.clip(np.asarray(samples, dtype=np.float32) * 32768.0, -32768, 32767)
+        else:
+            dest[:] = samples
+        self.length += n
+
+    def view(self, start=0, end=None):
+        """Zero-copy view of [start, end) in the storage dtype. Valid until the next append that grows the buffer."""
+        end = self.length if end is None else min(end, self.length)
+        return self._data[start:end]
+
+    def as_float(self, start=0, end=None):
+        """float32 samples of [start, end): a view for float storage, a converted copy for int16 storage."""
+        data = self.view(start, end)
+        if self.dtype == np.int16:
+            return data.astype(np.float32) / 32768.0
+        return data
+
+    def copy_float(self, start=0, end=None):
+        """float32 copy of [start, end) that stays valid after the buffer is cleared or reused."""
+        data = self.as_float(start, end)
+        return data.copy() if self.dtype == np.float32 else data
+
+    def quietest_point(self, start, end, frame):
+        """Start index of the lowest-energy `frame`-sample window in [start, end), e.g. for cutting between words."""
+        end = min(end, self.length)
+        n_frames = (end - start) // frame
+        if n_frames <= 0:
+            return start
+        frames = self._data[start:start + n_frames * frame].reshape(n_frames, frame).astype(np.float32)
+        energy = np.einsum("ij,ij->i", frames, frames)
+        return start + int(np.argmin(energy)) * frame
+
+    def drop_front(self, n):
+        """Discards the first n samples, keeping the rest at the start of the buffer."""
+        n = min(n, self.length)
+        remaining = self.length - n
+        if remaining > 0:
+            self._data[:remaining] = self._data[n:self.length]
+        self.length = remaining
+
+    def clear(self):
+        """Empties the buffer without reallocating (unless it grew past max_retained)."""
+        self.length = 0
+        if len(self._data) > self.max_retained:
+            self._data = np.zeros(self.initial_capacity, dtype=self.dtype)
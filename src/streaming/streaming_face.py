@@ -13,6 +13,9 @@ PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", ".."))
 # Import the existing classification rules from V1
 sys.path.append(PROJECT_ROOT)
 from src.faceexpression.classifier import classify_emotion, smooth_emotions
+from src.streaming.rt_log import get_logger
+
+log = get_logger("face")
 
 class StreamingFace(threading.Thread):
     def __init__(self, face_queue, csv_path, openface_exe, poll_interval=1.0):
@@ -42,7 +45,7 @@ class StreamingFace(threading.Thread):
         self.current_emotion = {"emotion": None, "confidence": 0.0}
 
     def start_openface(self):
-        print("[Face] Starting OpenFace Subprocess for continuous streaming...")
+        log.info("[Face] Starting OpenFace Subprocess for continuous streaming...")
         out_dir = os.path.dirname(self.csv_path)
         out_name = os.path.splitext(os.path.basename(self.csv_path))[0]
         
@@ -60,16 +63,16 @@ class StreamingFace(threading.Thread):
         
         try:
             self.openface_process = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            print(f"[Face] OpenFace running with PID: {self.openface_process.pid}")
+            log.info("[Face] OpenFace running with PID: %s", self.openface_process.pid)
         except Exception as e:
-            print(f"[!] Failed to start OpenFace: {e}")
+            log.error("[!] Failed to start OpenFace: %s", e)
             self.running = False
 
     def run(self):
         self.running = True
         self.start_openface()
         
-        print("[Face] Streaming Face worker started polling.")
+        log.info("[Face] Streaming Face worker started polling.")
         
         # Wait for CSV to be created (OpenFace on Windows can take up to 20-30s to boot)
         retries = 60
@@ -78,7 +81,7 @@ class StreamingFace(threading.Thread):
             retries -= 1
             
         if not os.path.exists(self.csv_path):
-            print("[!] Face streaming failed: CSV file was never fully created.")
+            log.error("[!] Face streaming failed: CSV file was never fully created.")
             self.running = False
             return
             
@@ -86,7 +89,7 @@ class StreamingFace(threading.Thread):
             try:
                 self._poll_csv()
             except Exception as e:
-                print(f"Error reading Face CSV: {e}")
+                log.error("Error reading Face CSV: %s", e)
             time.sleep(self.poll_interval)
             
     def _poll_csv(self):
@@ -110,65 +113,69 @@ class StreamingFace(threading.Thread):
             
             # Update indices and metrics
             self.last_row_read += len(df)
-            self.total_frames_polled += len(df)
-            
-            # Filter valid frames
-            valid_df = df[(df["success"] == 1) & (df["confidence"] > 0.8)].copy()
-            self.valid_frames_polled += len(valid_df)
-            
-            if valid_df.empty:
-                return
-                
-            # Classify
-            valid_df["emotion"] = valid_df.apply(classify_emotion, axis=1)
-            
-            # Add all detected frames to the active sentence pool
-            for emo in valid_df["emotion"].tolist():
-                self.recent_emotions.append(emo)
-            
-            if self.recent_emotions:
-                # Count frequencies across the entire turn
-                counts = Counter(self.recent_emotions)
-                
-                # Instability tracking (emotion transitions / total)
-                transitions = 0
-                for i in range(1, len(self.recent_emotions)):
-                    if self.recent_emotions[i] != self.recent_emotions[i-1]:
-                        transitions += 1
-                instability = transitions / len(self.recent_emotions) if len(self.recent_emotions) > 1 else 0.0
-                
-                # Reliability metric
-                reliability = self.valid_frames_polled / self.total_frames_polled if self.total_frames_polled > 0 else 0.0
-                
-                # Default to the most common emotion
-                dominant_emotion = counts.most_common(1)[0][0]
-                confidence = counts[dominant_emotion] / len(self.recent_emotions)
-                
-                # ==== ANTI-NEUTRAL & ANTI-SPEAKING FILTER ====
-                # 1. Neutral Fallback: If Neutral is dominant but another emotion spiked, promote the spike.
-                # 2. Speaking Mask (Happy) Fallback: Speaking forcefully pulls the lip corners (AU12), which 
-                #    OpenFace falsely detects as 'Happy'. If Happy is dominant but Anger/Sadness/Surprise
-                #    were detected in the background, we assume the 'Happy' was just articulation and promote the real emotion.
-                if dominant_emotion in ["Neutral", "Happy"] and len(counts) > 1:
-                    for emo, count in counts.items():
-                        if emo not in ["Neutral", "Happy"] and count >= 1:
-                            dominant_emotion = emo
-                            # Artificial confidence boost, clamped to 0.95 to prevent numeric overflow in fusion
-                            confidence = min(0.95, 0.60 + (count * 0.02)) 
-                            break
-                            
-                self.current_emotion = {
-                    "source": "face",
-                    "emotion": dominant_emotion,
-                    "confidence": confidence,
-                    "reliability": reliability,
-                    "instability": instability
-                }
+            self._ingest_rows(df)
                 
         except pd.errors.EmptyDataError:
             # File exists but is empty
             pass
 
+    def _ingest_rows(self, df):
+        """Classifies a batch of new OpenFace rows and refreshes the turn-level face state."""
+        self.total_frames_polled += len(df)
+        
+        # Filter valid frames
+        valid_df = df[(df["success"] == 1) & (df["confidence"] > 0.8)].copy()
+        self.valid_frames_polled += len(valid_df)
+        
+        if valid_df.empty:
+            return
+            
+        # Classify
+        valid_df["emotion"] = valid_df.apply(classify_emotion, axis=1)
+        
+        # Add all detected frames to the active sentence pool
+        for emo in valid_df["emotion"].tolist():
+            self.recent_emotions.append(emo)
+        
+        if self.recent_emotions:
+            # Count frequencies across the entire turn
+            counts = Counter(self.recent_emotions)
+            
+            # Instability tracking (emotion transitions / total)
+            transitions = 0
+            for i in range(1, len(self.recent_emotions)):
+                if self.recent_emotions[i] != self.recent_emotions[i-1]:
+                    transitions += 1
+            instability = transitions / len(self.recent_emotions) if len(self.recent_emotions) > 1 else 0.0
+            
+            # Reliability metric
+            reliability = self.valid_frames_polled / self.total_frames_polled if self.total_frames_polled > 0 else 0.0
+            
+            # Default to the most common emotion
+            dominant_emotion = counts.most_common(1)[0][0]
+            confidence = counts[dominant_emotion] / len(self.recent_emotions)
+            
+            # ==== ANTI-NEUTRAL & ANTI-SPEAKING FILTER ====
+            # 1. Neutral Fallback: If Neutral is dominant but another emotion spiked, promote the spike.
+            # 2. Speaking Mask (Happy) Fallback: Speaking forcefully pulls the lip corners (AU12), which 
+            #    OpenFace falsely detects as 'Happy'. If Happy is dominant but Anger/Sadness/Surprise
+            #    were detected in the background, we assume the 'Happy' was just articulation and promote the real emotion.
+            if dominant_emotion in ["Neutral", "Happy"] and len(counts) > 1:
+                for emo, count in counts.items():
+                    if emo not in ["Neutral", "Happy"] and count >= 1:
+                        dominant_emotion = emo
+                        # Artificial confidence boost, clamped to 0.95 to prevent numeric overflow in fusion
+                        confidence = min(0.95, 0.60 + (count * 0.02)) 
+                        break
+                        
+            self.current_emotion = {
+                "source": "face",
+                "emotion": dominant_emotion,
+                "confidence": confidence,
+                "reliability": reliability,
+                "instability": instability
+            }
+
     def stop(self):
         self.running = False
         if self.openface_process and self.openface_process.poll() is None:
@@ -177,7 +184,7 @@ class StreamingFace(threading.Thread):
                 self.openface_process.wait(timeout=3)
             except subprocess.TimeoutExpired:
                 self.openface_process.kill()
-        print("Stopped Streaming Face worker.")
+        log.info("Stopped Streaming Face worker.")
 
     def get_current_emotion(self):
         return getattr(self, "current_emotion", {"emotion": None, "confidence": 0.0, "reliability": 0.0, "instability": 0.0})
@@ -2,6 +2,7 @@ import threading
 import queue
 import time
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import torch
 import sys
 import os
@@ -13,189 +14,301 @@ if PROJECT_ROOT not in sys.path:
     sys.path.append(PROJECT_ROOT)
 
 from src.ser.ser_engine import SEREngine
+from src.ser.emotion_aggregate import aggregate_emotions, empty_voice_state
+from src.ser.feature_cache import Wav2Vec2FeatureCache, check_cache_parity
+from src.streaming.segment_buffer import SegmentBuffer
+from src.streaming.rt_log import get_logger
+
+log = get_logger("ser")
 
 class StreamingSER(threading.Thread):
-    def __init__(self, audio_queue, emotion_queue=None, sample_rate=16000):
+    def __init__(self, audio_queue, emotion_queue=None, sample_rate=16000, buffer_dtype=np.float32,
+                 hop_seconds=1.0, tier_controller=None, backend="eager", feature_cache=False, prosody_gate=None):
         """
         Worker thread for Streaming Speech Emotion Recognition.
-        Maintains a dynamically growing audio buffer, and evaluates the whole sequence when requested.
+        Classifies 1-second windows in the background as soon as they fill and keeps a whole-utterance
+        Peak + Average snapshot up to date, so reading the voice state at turn end costs at most one window
+        (the tail after the last full window, see finish_utterance()).
+        buffer_dtype: np.float32, or np.int16 to halve utterance buffer memory
+        hop_seconds: distance between classified windows, at most 1.0 so every second of speech is classified
+        tier_controller: OPTIONAL TierController over SER_TIERS-style dicts; sets hop_seconds and feature_cache
+                         from measured load
+        backend: SEREngine inference backend ("eager", "int8", "bf16", "onnx"), parity-checked at load
+        feature_cache: run the wav2vec2 CNN once per audio position and only the transformer per window,
+                       which makes overlapping windows (hop_seconds < 1) cheap; approximate, see Wav2Vec2FeatureCache.
+                       Checked against the uncached path at load (check_cache_parity); left off if it drifts
+        prosody_gate: OPTIONAL ProsodyGate; windows it is confident about skip wav2vec2 (see cascade_stats())
         """
         super().__init__(daemon=True)
         self.audio_queue = audio_queue
         self.emotion_queue = emotion_queue
         self.sample_rate = sample_rate
+        self.window = sample_rate  # 1 second
+        if hop_seconds > 1.0:
+            raise ValueError("hop_seconds must not exceed the 1 s window, or speech between windows is never classified")
+        self.hop_seconds = hop_seconds
+        self.tier_controller = tier_controller
         
         self.running = False
-        self.audio_buffer = np.array([], dtype=np.float32)
-        self.current_emotion = {
-            "source": "voice", "emotion": None, "confidence": 0.0, 
-            "reliability": 0.0, "peak_emotion": None, "average_emotion": None
-        }
+        # Only the worker thread touches the buffer and window state; clear_buffer() just bumps a generation
+        self.audio_buffer = SegmentBuffer(sample_rate=sample_rate, dtype=buffer_dtype)
+        self.num_windows = 0
+        self.next_window_start = 0
+        self.covered_end = 0  # End of the last full window
+        self.provisional_length = 0
+        # Running sum of squares from the per-chunk RMS computed at capture (avoids a full-buffer RMS pass)
+        self.energy_sum = 0.0
+        self.processed_seq = -1
+        self._generation = 0
+        self._buffer_generation = 0
+        self._tail_request = None
+
+        # Published by reference assignment: readers always see a complete, immutable snapshot
+        self.current_emotion = empty_voice_state()
         
         # Load model once at startup!
-        print("Loading SER Engine for streaming...")
-        self.ser_engine = SEREngine()
-        print("SER Engine loaded.")
+        log.info("Loading SER Engine for streaming...")
+        self.ser_engine = SEREngine(backend=backend)
+        self.labels = self.ser_engine.labels
+        self.window_probs = np.zeros((64, len(self.labels)), dtype=np.float32)
+        self.use_feature_cache = feature_cache
+        tiers = tier_controller.tiers if tier_controller is not None else []
+        self.feature_cache = None
+        if feature_cache or any(tier.get("feature_cache") for tier in tiers):
+            parity = check_cache_parity(self.ser_engine.classifier)
+            log.info("[SER] Feature cache vs uncached: max prob diff %.3f, top-1 agreement %.0f%%",
+                     parity["max_prob_diff"], 100 * parity["agreement"])
+            if parity["passed"]:
+                self.feature_cache = Wav2Vec2FeatureCache(self.ser_engine.classifier)
+            else:
+                log.warning("[SER] Feature cache failed the parity check; classifying every window uncached.")
+                self.use_feature_cache = False
+        # The gate's classes are put in the engine's output order so both tiers fill the same probs columns
+        self.prosody_gate = prosody_gate.aligned(self.labels) if prosody_gate is not None else None
+        self.prosody_hits = 0
+        self.escalations = 0
+        self.prosody_seconds = 0.0
+        self.wav2vec2_seconds = 0.0
+        log.info("SER Engine loaded.")
 
     def run(self):
         self.running = True
-        print("[SER] Streaming SER worker started.")
+        log.info("[SER] Streaming SER worker started.")
         
         while self.running:
             try:
-                # Wait for audio chunks from the queue
-                chunk = self.audio_queue.get(timeout=0.5)
-                # Accumulate endlessly until the orchestrator clears the buffer (dynamically sized)
-                self.audio_buffer = np.concatenate((self.audio_buffer, chunk))
+                # Wait for audio chunks from the queue (short timeout: finish_utterance() waits on an idle worker)
+                chunk = self.audio_queue.get(timeout=0.1)
             except queue.Empty:
-                continue
+                chunk = None
+
+            try:
+                generation = self._generation
+                if self._buffer_generation != generation:
+                    self._reset_utterance(generation)
+                if chunk is not None:
+                    # Accumulate until the orchestrator clears the buffer (dynamically sized)
+                    self._append_chunk(chunk)
+                    if self._generation != generation:
+                        # clear_buffer() ran during the append: the chunk belongs to the new utterance
+                        generation = self._generation
+                        self._reset_utterance(generation)
+                        self._append_chunk(chunk)
+                    self._classify_new_windows()
+                    self.processed_seq = chunk.seq
+                if self._tail_request is not None and self.audio_queue.qsize() == 0:
+                    self._classify_tail()
             except Exception as e:
-                print(f"SER Worker Error: {e}")
+                log.error("SER Worker Error: %s", e)
+                if chunk is not None:
+                    self.processed_seq = chunk.seq
 
-    def _classify_buffer(self):
-        """Runs Wav2Vec2 on sliding window mini-segments for Peak + Average hybrid, then calculates reliability."""
-        try:
-            # 1. Energy Calculation (Volume)
-            rms = np.sqrt(np.mean(self.audio_buffer**2))
-            # Assume rms around 0.02 is reasonably audible speech, 0.005 is very quiet
-            energy_score = min(1.0, rms / 0.02)
-            
-            label_map = {
-                'hap': 'Happy',
-                'ang': 'Angry',
-                'neu': 'Neutral',
-                'sad': 'Sad'
-            }
-            idx_to_label = {0: 'Angry', 1: 'Happy', 2: 'Neutral', 3: 'Sad'}
-            
-            # Mini-chunk windowing (1 second chunks with NO overlap to maximize CPU efficiency)
-            chunk_size = self.sample_rate  # 1 second
-            step_size = self.sample_rate  # 1 second step
-            
-            all_probs = []
-            
-            if len(self.audio_buffer) >= chunk_size:
-                # Limit to the last 5 seconds to prevent CPU hang on long unbroken sentences
-                process_buffer = self.audio_buffer[-5 * self.sample_rate:]
-                
-                chunks = []
-                for start in range(0, len(process_buffer) - chunk_size + 1, step_size):
-                    end = start + chunk_size
-                    chunks.append(process_buffer[start:end])
-                
-                # Stack all chunks into a single batch for parallel CPU execution
-                tensor = torch.from_numpy(np.array(chunks, dtype=np.float32))
-                out_prob, _, _, _ = self.ser_engine.classifier.classify_batch(tensor)
-                
-                # Flatten the time dimension if SpeechBrain returns (Batch, 1, Classes)
-                if out_prob.dim() == 3:
-                    out_prob = out_prob.squeeze(1)
-                    
-                probs = torch.softmax(out_prob, dim=1)
-                for i in range(len(chunks)):
-                    all_probs.append(probs[i])
+    def _append_chunk(self, chunk):
+        self.audio_buffer.append(chunk.samples)
+        self.energy_sum += (chunk.rms ** 2) * len(chunk.samples)
+
+    def _reset_utterance(self, generation):
+        self._buffer_generation = generation
+        self.audio_buffer.clear()
+        self.energy_sum = 0.0
+        self.num_windows = 0
+        self.next_window_start = 0
+        self.covered_end = 0
+        self.provisional_length = 0
+        if self.feature_cache is not None:
+            self.feature_cache.reset()
+
+    def _classify_new_windows(self):
+        """
+        Classifies every window that filled since the last call: the prosody tier first (if any), then one
+        Wav2Vec2 batch for the windows it escalates. Republishes the snapshot afterwards.
+        """
+        hop_seconds = self.hop_seconds
+        use_cache = self.use_feature_cache
+        tier_index = None
+        if self.tier_controller is not None:
+            tier_index = self.tier_controller.select(self.audio_buffer.duration)
+            tier = self.tier_controller.tiers[tier_index]
+            hop_seconds = tier["hop_seconds"]
+            use_cache = tier.get("feature_cache", use_cache) and self.feature_cache is not None
+        hop = max(1, int(min(hop_seconds, 1.0) * self.sample_rate))
+        if use_cache:
+            # Windows must start on a feature frame
+            stride = self.feature_cache.stride
+            hop = max(stride, int(round(hop / stride)) * stride)
+
+        available = len(self.audio_buffer) - self.next_window_start - self.window
+        if available < 0:
+            self._classify_short_utterance()
+            return
+        n_new = available // hop + 1
+        generation = self._generation
+        classify_start = time.perf_counter()
+
+        starts = self.next_window_start + np.arange(n_new) * hop
+        escalate = np.ones(n_new, dtype=bool)
+        probs = np.zeros((n_new, len(self.labels)), dtype=np.float32)
+        if self.prosody_gate is not None:
+            # First tier: prosodic features decide the windows they are confident about
+            region = self.audio_buffer.as_float(starts[0], starts[-1] + self.window)
+            gate_probs, confident = self.prosody_gate.classify(sliding_window_view(region, self.window)[::hop], self.sample_rate)
+            probs[confident] = gate_probs[confident]
+            escalate = ~confident
+            self.prosody_hits += int(confident.sum())
+        prosody_done = time.perf_counter()
+
+        if escalate.any():
+            probs[escalate] = self._classify_wav2vec2(starts[escalate], hop, escalate.all(), use_cache)
+            self.escalations += int(escalate.sum())
+            self.wav2vec2_seconds += time.perf_counter() - prosody_done
+        self.prosody_seconds += prosody_done - classify_start
+
+        if tier_index is not None:
+            self.tier_controller.record(tier_index, time.perf_counter() - classify_start, n_new * hop / self.sample_rate,
+                                        backlog=self.audio_queue.qsize())
+
+        if generation != self._generation:
+            return  # The orchestrator cleared the utterance while we were classifying
+
+        self._append_window_probs(probs)
+        self.next_window_start += n_new * hop
+        self.covered_end = int(starts[-1]) + self.window
+        self._publish_snapshot()
+
+    def _classify_wav2vec2(self, starts, hop, contiguous, use_cache=False):
+        """Wav2Vec2 probabilities for the windows at `starts` (contiguous: every window from starts[0] on, hop apart)."""
+        if use_cache:
+            # CNN features are computed once per audio position; only the transformer runs per window
+            self.feature_cache.extend(self.audio_buffer)
+            out_prob = self.feature_cache.classify(starts, self.window)
+        else:
+            region = self.audio_buffer.as_float(starts[0], starts[-1] + self.window)
+            if contiguous:
+                # Zero-copy: the windows are strided views into the utterance buffer
+                windows = torch.from_numpy(region).unfold(0, self.window, hop)
             else:
-                # If too small for sliding window, just eval once
-                tensor = torch.from_numpy(self.audio_buffer).unsqueeze(0)
-                out_prob, _, _, _ = self.ser_engine.classifier.classify_batch(tensor)
-                if out_prob.dim() == 3:
-                    out_prob = out_prob.squeeze(1)
-                probs = torch.softmax(out_prob, dim=1)
-                all_probs.append(probs[0])
-
-            # Stack into a 2D tensor: Shape (num_chunks, 4)
-            stacked_probs = torch.stack(all_probs)
-            
-            # 1. Average Emotion Logic
-            avg_probs = torch.mean(stacked_probs, dim=0)
-            avg_top_probs, avg_top_indices = torch.topk(avg_probs, 2)
-            
-            avg_emotion = idx_to_label.get(int(avg_top_indices[0]), 'Neutral')
-            avg_conf = float(avg_top_probs[0])
-            
-            # Anti-neutral logic for Average
-            if avg_emotion == 'Neutral' and avg_conf < 0.60:
-                sec_emotion = idx_to_label.get(int(avg_top_indices[1]), 'Neutral')
-                if sec_emotion != 'Neutral':
-                    avg_emotion = sec_emotion
-                    avg_conf = float(avg_top_probs[1])
-                    
-            # 2. Peak Emotion Logic (Find the highest non-neutral spike across chunks)
-            peak_emotion = avg_emotion
-            peak_conf = 0.0
-            
-            for probs in all_probs:
-                top_p, top_idx = torch.topk(probs, 2)
-                em = idx_to_label.get(int(top_idx[0]), 'Neutral')
-                conf = float(top_p[0])
-                
-                # Favor non-neutral spikes
-                if em != 'Neutral' and conf > peak_conf:
-                    peak_emotion = em
-                    peak_conf = conf
-                elif em == 'Neutral' and conf < 0.60:
-                    sec_em = idx_to_label.get(int(top_idx[1]), 'Neutral')
-                    if sec_em != 'Neutral' and float(top_p[1]) > peak_conf:
-                        peak_emotion = sec_em
-                        peak_conf = float(top_p[1])
-                        
-            # Fallback if no non-neutral spikes found
-            if peak_conf == 0.0:
-                peak_emotion = avg_emotion
-                peak_conf = avg_conf
-
-            # 3. Hybrid Fusion
-            final_emotion = peak_emotion
-            final_conf = (0.6 * avg_conf) + (0.4 * peak_conf)
-            if peak_emotion != avg_emotion:
-                # If there's a strong non-neutral peak that differs from a neutral average, promote the peak slightly
-                if avg_emotion == 'Neutral' and peak_conf > 0.5:
-                    final_emotion = peak_emotion
-                    final_conf = peak_conf * 0.9 # Small decay to reflect it was only a peak
-                else:
-                    # Let average win if multiple non-neutral emotions conflict
-                    final_emotion = avg_emotion
-                    final_conf = avg_conf
-
-            # 4. Reliability Calculation
-            # Spread: Difference between top 2 probs in the average
-            prob_spread = float(avg_top_probs[0] - avg_top_probs[1])
-            spread_score = min(1.0, prob_spread * 2.0) # Map [0.0, 0.5] prob spread to [0.0, 1.0]
-            
-            # Combine energy and spread into reliability
-            # Only highly energized speech with a clear distribution is 100% reliable
-            reliability = (0.5 * energy_score) + (0.5 * spread_score)
-
-            self.current_emotion = {
-                "source": "voice",
-                "emotion": final_emotion,
-                "confidence": final_conf,
-                "average_emotion": avg_emotion,
-                "peak_emotion": peak_emotion,
-                "reliability": reliability
-            }
-            
-        except Exception as e:
-            print(f"SER classification error: {e}")
+                windows = torch.from_numpy(np.stack([region[s - starts[0]:s - starts[0] + self.window] for s in starts]))
+            out_prob, _, _, _ = self.ser_engine.classifier.classify_batch(windows)
+        # Flatten the time dimension if SpeechBrain returns (Batch, 1, Classes)
+        if out_prob.dim() == 3:
+            out_prob = out_prob.squeeze(1)
+        return torch.softmax(out_prob, dim=1).numpy()
+
+    def cascade_stats(self):
+        """Prosody-tier hits vs wav2vec2 escalations, and the wav2vec2 time the hits are estimated to have saved."""
+        windows = self.prosody_hits + self.escalations
+        per_window = self.wav2vec2_seconds / self.escalations if self.escalations else 0.0
+        return {
+            "windows": windows,
+            "prosody_hits": self.prosody_hits,
+            "escalations": self.escalations,
+            "hit_rate": round(self.prosody_hits / windows, 3) if windows else 0.0,
+            "prosody_seconds": round(self.prosody_seconds, 3),
+            "wav2vec2_seconds": round(self.wav2vec2_seconds, 3),
+            "saved_seconds_estimate": round(self.prosody_hits * per_window - self.prosody_seconds, 3),
+        }
+
+    def _classify_short_utterance(self, min_growth=None):
+        """Before the first full window exists, classify the whole (>= 0.5 s) buffer every 0.25 s of growth."""
+        length = len(self.audio_buffer)
+        min_growth = self.window // 4 if min_growth is None else min_growth
+        if self.num_windows or length < self.window // 2 or length - self.provisional_length < min_growth:
+            return
+        self.provisional_length = length
+        generation = self._generation
+        tensor = torch.from_numpy(np.ascontiguousarray(self.audio_buffer.as_float())).unsqueeze(0)
+        out_prob, _, _, _ = self.ser_engine.classifier.classify_batch(tensor)
+        if out_prob.dim() == 3:
+            out_prob = out_prob.squeeze(1)
+        if generation == self._generation:
+            rms = np.sqrt(self.energy_sum / max(1, length))
+            self.current_emotion = aggregate_emotions(torch.softmax(out_prob, dim=1).numpy(), min(1.0, rms / 0.02),
+                                                      self.labels)
+
+    def _append_window_probs(self, probs):
+        needed = self.num_windows + len(probs)
+        if needed > len(self.window_probs):
+            grown = np.zeros((max(needed, 2 * len(self.window_probs)), self.window_probs.shape[1]), dtype=np.float32)
+            grown[:self.num_windows] = self.window_probs[:self.num_windows]
+            self.window_probs = grown
+        self.window_probs[self.num_windows:needed] = probs
+        self.num_windows = needed
+
+    def _classify_tail(self):
+        """
+        Answers finish_utterance(): speech after the last full window (at least half a window of it) gets one
+        more window aligned to the end of the buffer, as in SEREngine.predict_emotion_timeline. The tail only
+        enters the published snapshot, not window_probs, so later full windows replace it.
+        """
+        request, self._tail_request = self._tail_request, None
+        generation = self._generation
+        try:
+            if not self.num_windows:
+                self._classify_short_utterance(min_growth=1)
+                return
+            length = len(self.audio_buffer)
+            if length - self.covered_end < self.window // 2:
+                return
+            tail = self._classify_wav2vec2(np.array([length - self.window]), self.window, True)
+            if generation == self._generation:
+                self._publish_snapshot(tail)
+        finally:
+            request["voice_state"] = self.current_emotion
+            request["done"].set()
+
+    def _publish_snapshot(self, tail=None):
+        """Peak + Average hybrid and reliability over every window of the utterance so far (plus an OPTIONAL tail)."""
+        # Energy (Volume) from the capture-time chunk energies; ~0.02 RMS is reasonably audible speech
+        rms = np.sqrt(self.energy_sum / max(1, len(self.audio_buffer)))
+        energy_score = min(1.0, rms / 0.02)
+        probs = self.window_probs[:self.num_windows]
+        if tail is not None:
+            probs = np.concatenate([probs, tail])
+        self.current_emotion = aggregate_emotions(probs, energy_score, self.labels)
 
     def stop(self):
         self.running = False
-        print("Stopped Streaming SER worker.")
+        log.info("Stopped Streaming SER worker.")
 
     def get_current_emotion(self):
-        """Classify the entire dynamically accumulated sentence buffer on demand."""
-        if len(self.audio_buffer) >= self.sample_rate: # Need at least 1 second to classify safely
-            self._classify_buffer()
-            
-        return getattr(self, "current_emotion", {
-            "source": "voice", "emotion": None, "confidence": 0.0, 
-            "reliability": 0.0, "peak_emotion": None, "average_emotion": None
-        })
+        """Latest whole-utterance snapshot; computed in the background, so this returns immediately."""
+        return self.current_emotion
+
+    def finish_utterance(self, timeout=0.3):
+        """
+        Whole-utterance snapshot including the speech after the last full window, for the end of a turn.
+        The worker classifies that tail once it has caught up with the queue; if it does not answer within
+        `timeout` seconds, the latest snapshot is returned instead.
+        """
+        if not self.is_alive():
+            return self.current_emotion
+        request = {"done": threading.Event(), "voice_state": None}
+        self._tail_request = request
+        if not request["done"].wait(timeout):
+            return self.current_emotion
+        return request["voice_state"]
 
     def clear_buffer(self):
-        """Flushes the accumulated audio history so the next turn starts fresh."""
-        self.audio_buffer = np.array([], dtype=np.float32)
-        self.current_emotion = {
-            "source": "voice", "emotion": None, "confidence": 0.0, 
-            "reliability": 0.0, "peak_emotion": None, "average_emotion": None
-        }
+        """Starts a new utterance. The worker drops its buffer before the next chunk; the snapshot resets now."""
+        self._generation += 1
+        self.current_emotion = empty_voice_state()
@@ -4,53 +4,140 @@ import time
 import numpy as np
 from faster_whisper import WhisperModel
 
+from src.streaming.audio_chunk import AudioChunk
+from src.streaming.segment_buffer import SegmentBuffer
+from src.streaming.transcript_utils import common_prefix_length, stitch_transcripts
+from src.streaming.vad import EnergyVAD
+from src.streaming.decode_executor import DecodeExecutor
+from src.streaming.decoding_context import DecodingContext
+from src.streaming.rt_log import get_logger
+
+log = get_logger("stt")
+
 class StreamingSTT(threading.Thread):
     def __init__(self, audio_queue, text_queue, status_queue=None, model_size="tiny", compute_type="int8", 
-                 silence_threshold=0.01, trailing_silence_seconds=2.0, sample_rate=16000):
+                 silence_threshold=0.01, trailing_silence_seconds=2.0, sample_rate=16000, buffer_dtype=np.float32,
+                 partial_queue=None, partial_interval_seconds=1.0, vad=None, pre_roll_seconds=0.3,
+                 min_speech_seconds=0.25, max_segment_seconds=15.0, segment_overlap_seconds=1.0,
+                 cut_search_seconds=3.0, decode_backlog=8, provisional_silence_seconds=0.5,
+                 speculation_queue=None, decoding_context=None, tier_controller=None):
         """
         Worker thread for Streaming Speech-To-Text using faster-whisper on CPU.
-        - audio_queue: queue to read audio chunks from
+        - audio_queue: queue (or RingReader) to read AudioChunk envelopes from
         - text_queue: queue to push transcribed text to
         - status_queue: OPTIONAL queue to push VAD state strings ("LISTENING", "ANALYZING")
-        - silence_threshold: RMS amplitude below which is considered silence
+        - silence_threshold: RMS amplitude below which is never speech (floor for the default EnergyVAD)
         - trailing_silence_seconds: Seconds of continuous silence required to trigger the end of a sentence.
+        - buffer_dtype: np.float32, or np.int16 to halve utterance buffer memory
+        - partial_queue: OPTIONAL queue for stable partial transcripts while the user is still speaking
+        - partial_interval_seconds: how much new speech triggers a re-decode of the growing utterance
+        - vad: OPTIONAL VoiceActivityDetector (e.g. WebRtcVAD); defaults to an adaptive EnergyVAD
+        - pre_roll_seconds: audio kept from before speech onset so the first syllable is not clipped
+        - min_speech_seconds: utterances with less detected speech than this are dropped without decoding
+        - max_segment_seconds: a speaker who never pauses is cut into segments of at most this length,
+          each decoded as it closes, so decode latency and buffer memory stay bounded
+        - segment_overlap_seconds: audio shared by consecutive segments; the duplicated words are stitched away
+        - cut_search_seconds: the cut is placed at the quietest frame within this final stretch of the segment
+        - decode_backlog: finished segments that may wait for the decode thread before intake blocks
+        - provisional_silence_seconds: a shorter pause after which the utterance is decoded speculatively;
+          the result is committed if the pause reaches trailing_silence_seconds, discarded if speech resumes
+          (0 / None disables speculation)
+        - speculation_queue: OPTIONAL queue receiving speculative transcripts so downstream work can start early
+        - decoding_context: OPTIONAL DecodingContext (pinned language, prompt from prior turns, decoder options);
+          defaults to one that detects the language once and then pins it
+        - tier_controller: OPTIONAL TierController over STT_TIERS-style dicts; picks model size / compute type
+          per decode from the measured real-time factor and backlog (model_size / compute_type are then ignored)
         """
         super().__init__(daemon=True)
         self.audio_queue = audio_queue
         self.text_queue = text_queue
         self.status_queue = status_queue
+        self.partial_queue = partial_queue
+        self.partial_interval_frames = int(partial_interval_seconds * sample_rate)
         
         self.silence_threshold = silence_threshold
         self.trailing_silence_frames = int(trailing_silence_seconds * sample_rate)
         self.current_silence_frames = 0
         self.sample_rate = sample_rate
+        self.vad = vad or EnergyVAD(sample_rate=sample_rate, min_threshold=silence_threshold)
+        self.pre_roll_frames = int(pre_roll_seconds * sample_rate)
+        self.min_speech_frames = int(min_speech_seconds * sample_rate)
+        self.speech_frames = 0
+
+        # Forced segmentation of long utterances
+        self.max_segment_frames = int(max_segment_seconds * sample_rate)
+        self.overlap_frames = int(segment_overlap_seconds * sample_rate)
+        self.cut_search_frames = int(cut_search_seconds * sample_rate)
+        self.segments_in_utterance = 0
+        self.committed_text = ""
+
+        # Speculative endpointing: id of the latest speculation (bumped when speech resumes to invalidate it)
+        self.provisional_silence_frames = int((provisional_silence_seconds or 0) * sample_rate)
+        self.speculation_queue = speculation_queue
+        self.speculation_id = 0
+        self.speculation_pending = False
+        self.speculation = None
+        self.speculation_hits = 0
+        self.speculation_misses = 0
+
+        # Intake + VAD run on this thread; Whisper runs on the decode thread so audio keeps draining
+        self.decoder = DecodeExecutor(backlog=decode_backlog, name="stt_decode")
         
         self.running = False
-        self.audio_buffer = np.array([], dtype=np.float32)
+        self.audio_buffer = SegmentBuffer(sample_rate=sample_rate, dtype=buffer_dtype)
+
+        # Local-agreement state for partial hypotheses
+        self.frames_since_partial = 0
+        self.previous_hypothesis = []
+        self.stable_words = []
+
+        # Progress markers for replay / diagnostics
+        self.processed_seq = -1
+        self.last_decode_seconds = 0.0
 
-        print(f"Loading faster-whisper '{model_size}' model ...")
-        # Initialize model (cpu int8 is very fast)
-        self.model = WhisperModel(model_size, device="cpu", compute_type=compute_type)
-        print("faster-whisper loaded.")
+        # Session-level decoder state, only touched from the decode thread
+        self.context = decoding_context or DecodingContext()
+
+        # Loaded models keyed by (model_size, compute_type); extra tiers load in the background on first use
+        self.tier_controller = tier_controller
+        self.models = {}
+        self._models_lock = threading.Lock()
+        if tier_controller is not None:
+            model_size, compute_type = tier_controller.tier["model_size"], tier_controller.tier["compute_type"]
+        self.default_model_key = (model_size, compute_type)
+        self._load_model(self.default_model_key)
 
     def run(self):
         self.running = True
-        print("[STT] Streaming STT worker started.")
+        self.decoder.start()
+        log.info("[STT] Streaming STT worker started.")
         has_spoken = False
         
         while self.running:
+            chunk = None
             try:
                 # Get audio chunk
                 chunk = self.audio_queue.get(timeout=0.5)
-                self.audio_buffer = np.concatenate((self.audio_buffer, chunk))
+                self.audio_buffer.append(chunk.samples)
                 
-                # Check for silence
-                is_silent = self._is_silent(chunk)
+                # Frame-level speech decisions (with hangover) for this chunk
+                is_speech = self._speech_decisions(chunk)
                 
-                if is_silent:
-                    self.current_silence_frames += len(chunk)
+                if not is_speech.any():
+                    self.current_silence_frames += len(chunk.samples)
+                    if not has_spoken and len(self.audio_buffer) > self.pre_roll_frames:
+                        # Only a short pre-roll of background audio is kept ahead of the next utterance
+                        self.audio_buffer.drop_front(len(self.audio_buffer) - self.pre_roll_frames)
                 else:
-                    self.current_silence_frames = 0
+                    frame = self.vad.frame_samples
+                    self.speech_frames += self.vad.last_raw_speech_frames * frame
+                    last_speech_end = (int(np.flatnonzero(is_speech)[-1]) + 1) * frame
+                    self.current_silence_frames = max(0, len(chunk.samples) - last_speech_end)
+                    if self.speculation_pending:
+                        # Speech resumed after a provisional pause: the speculative transcript is stale
+                        self.speculation_pending = False
+                        self.speculation_id += 1
+                        self.speculation_misses += 1
                     if not has_spoken:
                         has_spoken = True
                         if self.status_queue:
@@ -58,58 +145,231 @@ class StreamingSTT(threading.Thread):
                 
                 # If we detect enough trailing silence
                 if self.current_silence_frames >= self.trailing_silence_frames:
-                    if has_spoken:
+                    if has_spoken and (self.speech_frames >= self.min_speech_frames or self.segments_in_utterance):
                         if self.status_queue:
                             self.status_queue.put("ANALYZING")
                         # Transcription triggered by natural spoken pause
                         self._transcribe_buffer()
-                        has_spoken = False
                     else:
-                        # It's just background silence; flush buffer to prevent memory bloat
-                        self.audio_buffer = np.array([], dtype=np.float32)
+                        # Background noise or a click too short to be speech; never reaches Whisper
+                        self.audio_buffer.clear()
                         
+                    has_spoken = False
+                    self.speech_frames = 0
+                    self.segments_in_utterance = 0
                     self.current_silence_frames = 0
+                    self.frames_since_partial = 0
+                    self.speculation_pending = False
+
+                elif (has_spoken and self.provisional_silence_frames and not self.speculation_pending
+                        and self.current_silence_frames >= self.provisional_silence_frames
+                        and self.speech_frames >= self.min_speech_frames):
+                    # Provisional pause: decode now, so the endpoint only has to confirm the result
+                    self._speculate()
+
+                elif has_spoken and len(self.audio_buffer) >= self.max_segment_frames:
+                    # No pause long enough: close the segment at a quiet point and keep listening
+                    self._force_segment()
+
+                elif has_spoken and self.partial_queue is not None:
+                    self.frames_since_partial += len(chunk.samples)
+                    # Partials are best-effort: only decoded when nothing else is waiting for Whisper
+                    if (self.frames_since_partial >= self.partial_interval_frames
+                            and len(self.audio_buffer) >= self.sample_rate and self.decoder.idle()):
+                        self.frames_since_partial = 0
+                        self.decoder.submit(self._update_partial, self.audio_buffer.copy_float())
+
+                self.processed_seq = chunk.seq
                     
             except queue.Empty:
                 continue
             except Exception as e:
-                print(f"STT Worker Error: {e}")
+                log.error("STT Worker Error: %s", e)
+                # Still count the chunk as handled so replay lockstep does not stall on it
+                if chunk is not None:
+                    self.processed_seq = chunk.seq
 
-    def _is_silent(self, chunk):
-        """Checks if the RMS amplitude of the chunk is below the silence threshold."""
-        rms = np.sqrt(np.mean(chunk**2))
-        return rms < self.silence_threshold
+    def _speech_decisions(self, chunk):
+        """Per-frame VAD decisions (one bool per vad.frame_samples) for the chunk."""
+        return self.vad.process(chunk.samples)
 
     def _transcribe_buffer(self):
-        """Runs faster-whisper on the accumulated buffer."""
+        """Hands the finished utterance to the decode thread and empties the buffer for the next one."""
+        audio_data = self.audio_buffer.copy_float()
+        self.audio_buffer.clear()
+        speculation_id = self.speculation_id if self.speculation_pending else None
+        self.decoder.submit(self._finish_utterance, audio_data, speculation_id)
+
+    def _speculate(self):
+        """Hands a snapshot of the utterance so far to the decode thread as a speculative endpoint."""
+        self.speculation_id += 1
+        self.speculation_pending = True
+        self.decoder.submit(self._decode_speculation, self.audio_buffer.copy_float(), self.speculation_id)
+
+    def _force_segment(self):
+        """
+        Hands the first part of an over-long utterance to the decode thread and drops it from the buffer.
+        The cut is the quietest 20 ms near the end of the segment (usually a gap between words);
+        the decoded audio runs half an overlap past it and the retained audio starts half an overlap
+        before it, so a word straddling the cut is heard by both decodes and de-duplicated when stitching.
+        """
+        length = len(self.audio_buffer)
+        half_overlap = self.overlap_frames // 2
+        search_start = max(half_overlap, length - half_overlap - self.cut_search_frames)
+        cut = self.audio_buffer.quietest_point(search_start, length - half_overlap, self.sample_rate // 50)
+
+        segment = self.audio_buffer.copy_float(0, cut + half_overlap)
+        self.audio_buffer.drop_front(cut - half_overlap)
+        self.segments_in_utterance += 1
+        self.frames_since_partial = 0
+        self.decoder.submit(self._finish_segment, segment)
+
+    # --- Decode thread ---------------------------------------------------------------------------
+
+    def _timed_decode(self, audio_data):
+        decode_start = time.perf_counter()
+        text = self._decode(audio_data)
+        self.last_decode_seconds = time.perf_counter() - decode_start
+        return text
+
+    def _decode_speculation(self, audio_data, speculation_id):
+        if speculation_id != self.speculation_id or len(audio_data) < self.sample_rate:
+            return  # Speech already resumed, or too short to be worth decoding
+        try:
+            text = stitch_transcripts(self.committed_text, self._timed_decode(audio_data))
+        except Exception as e:
+            log.error("Speculative transcription failed: %s", e)
+            return
+        self.speculation = (speculation_id, text)
+        if self.speculation_queue is not None and text:
+            self.speculation_queue.put(text)
+
+    def _finish_utterance(self, audio_data, speculation_id=None):
+        """
+        Publishes an utterance: the speculative transcript when the provisional pause held until the
+        endpoint, otherwise a decode of the last segment stitched to the earlier ones.
+        """
+        speculation, self.speculation = self.speculation, None
+        if speculation is not None and speculation[0] == speculation_id:
+            self.speculation_hits += 1
+            self._reset_partial()
+            self._publish(speculation[1])
+            return
+
+        text = self.committed_text
         # 1.0 second minimum of audio required to attempt transcription (prevents mic bumps)
-        if len(self.audio_buffer) < self.sample_rate: 
-            self.audio_buffer = np.array([], dtype=np.float32)
+        if len(audio_data) >= self.sample_rate:
+            try:
+                text = stitch_transcripts(text, self._timed_decode(audio_data))
+            except Exception as e:
+                log.error("Transcription failed: %s", e)
+        self._reset_partial()
+        self._publish(text)
+
+    def _publish(self, text):
+        if text:
+            self.context.remember(text)
+            self.text_queue.put(text)
+
+    def _finish_segment(self, audio_data):
+        try:
+            self.committed_text = stitch_transcripts(self.committed_text, self._timed_decode(audio_data))
+        except Exception as e:
+            log.error("Segment transcription failed: %s", e)
+        # Local agreement restarts on the new segment; already committed words stay published
+        self.previous_hypothesis = []
+        self.stable_words = []
+
+    def _decode(self, audio_data, cheapest=False):
+        """
+        Runs faster-whisper on a float32 array with the session's decoding context and returns the filtered text.
+        With a tier controller, the model is picked per call (cheapest=True forces the lowest tier, e.g. partials).
+        """
+        audio_seconds = len(audio_data) / self.sample_rate
+        tier_index = None
+        model = self.models[self.default_model_key]
+        if self.tier_controller is not None:
+            tier_index = 0 if cheapest else self.tier_controller.select(audio_seconds)
+            model, tier_index = self._model_for_tier(tier_index)
+
+        decode_start = time.perf_counter()
+        segments, info = model.transcribe(audio_data, **self.context.options(self.committed_text))
+        self.context.observe(info)
+        
+        # Filter hallucinations: only keep segments where the model is confident someone is actually speaking
+        valid_texts = []
+        for segment in segments:
+            if segment.no_speech_prob < 0.60:
+                valid_texts.append(segment.text)
+
+        if tier_index is not None:
+            self.tier_controller.record(tier_index, time.perf_counter() - decode_start, audio_seconds,
+                                        backlog=self.decoder.jobs.qsize())
+        
+        return " ".join(valid_texts).strip()
+
+    def _load_model(self, key):
+        model_size, compute_type = key
+        log.info("Loading faster-whisper '%s' (%s) model ...", model_size, compute_type)
+        try:
+            model = WhisperModel(model_size, device="cpu", compute_type=compute_type)
+        except Exception as e:
+            if key == self.default_model_key:
+                # Every tier falls back to the default model: without it there is nothing to decode with
+                raise
+            log.error("Loading faster-whisper '%s' (%s) failed: %s", model_size, compute_type, e)
+            with self._models_lock:
+                self.models.pop(key, None)  # Drop the placeholder so a later switch to this tier retries
             return
+        with self._models_lock:
+            self.models[key] = model
+        log.info("faster-whisper '%s' (%s) loaded.", model_size, compute_type)
 
-        # Prepare audio for transcription
-        audio_data = self.audio_buffer.copy()
-        self.audio_buffer = np.array([], dtype=np.float32) # Clear buffer
+    def _model_for_tier(self, tier_index):
+        """
+        (model, tier index actually used). A tier whose model is not loaded yet starts loading in the
+        background and the decode falls back to the default model, so a tier switch never stalls a turn.
+        """
+        tier = self.tier_controller.tiers[tier_index]
+        key = (tier["model_size"], tier["compute_type"])
+        with self._models_lock:
+            model = self.models.get(key)
+            if model is None and key not in self.models:
+                self.models[key] = None  # Placeholder: loading
+                threading.Thread(target=self._load_model, args=(key,), daemon=True).start()
+        if model is not None:
+            return model, tier_index
 
+        default_index = next((i for i, t in enumerate(self.tier_controller.tiers)
+                              if (t["model_size"], t["compute_type"]) == self.default_model_key), None)
+        return self.models[self.default_model_key], default_index
+
+    def _update_partial(self, audio_data):
+        """
+        Re-decodes the growing utterance and publishes the prefix that the last two hypotheses
+        agree on (local agreement). Published words are never retracted; the endpoint decode is final.
+        """
         try:
-            segments, info = self.model.transcribe(audio_data, beam_size=1)
-            
-            # Filter hallucinations: only keep segments where the model is confident someone is actually speaking
-            valid_texts = []
-            for segment in segments:
-                if segment.no_speech_prob < 0.60:
-                    valid_texts.append(segment.text)
-            
-            text = " ".join(valid_texts).strip()
-            
-            if text:
-                self.text_queue.put(text)
+            hypothesis = self._decode(audio_data, cheapest=True).split()
         except Exception as e:
-            print(f"Transcription failed: {e}")
+            log.error("Partial transcription failed: %s", e)
+            return
+
+        agreed = common_prefix_length(self.previous_hypothesis, hypothesis)
+        self.previous_hypothesis = hypothesis
+        if agreed > len(self.stable_words) and common_prefix_length(self.stable_words, hypothesis) == len(self.stable_words):
+            self.stable_words = hypothesis[:agreed]
+            self.partial_queue.put(stitch_transcripts(self.committed_text, " ".join(self.stable_words)))
+
+    def _reset_partial(self):
+        self.committed_text = ""
+        self.previous_hypothesis = []
+        self.stable_words = []
 
     def stop(self):
         self.running = False
-        print("Stopped Streaming STT worker.")
+        self.decoder.stop()
+        log.info("Stopped Streaming STT worker.")
 
 if __name__ == "__main__":
     # Simple test setup
@@ -124,7 +384,7 @@ if __name__ == "__main__":
     print("Recording 3 seconds...")
     audio = sd.rec(int(3 * 16000), samplerate=16000, channels=1, dtype="float32")
     sd.wait()
-    audio_q.put(audio[:, 0])
+    audio_q.put(AudioChunk.from_samples(audio[:, 0]))
     
     print("Waiting for transcription...")
     try:
@@ -0,0 +1,133 @@
+import time
+import threading
+
+from src.streaming.rt_log import get_logger
+
+log = get_logger("tiering")
+
+# Tiers are ordered cheapest first. "cost" is a rough relative compute cost, only used to predict
+# the latency of a tier that has not been measured yet.
+STT_TIERS = [
+    {"name": "tiny-int8", "model_size": "tiny", "compute_type": "int8", "cost": 1.0},
+    {"name": "base-int8", "model_size": "base", "compute_type": "int8", "cost": 2.5},
+    {"name": "base-float32", "model_size": "base", "compute_type": "float32", "cost": 5.0},
+]
+
+# SER tiers always cover every second of speech (hop <= the 1 s window) and trade time resolution:
+# the top tier adds overlapping half-second hops. The live tiers classify every window exactly.
+SER_TIERS = [
+    {"name": "ser-hop1s", "hop_seconds": 1.0, "feature_cache": False, "cost": 1.0},
+    {"name": "ser-hop0.5s", "hop_seconds": 0.5, "feature_cache": False, "cost": 2.0},
+]
+
+# Cheaper tiers that reuse wav2vec2 CNN features across windows. The cache is approximate (see
+# Wav2Vec2FeatureCache); StreamingSER runs check_cache_parity() at load and keeps these tiers
+# uncached if it fails.
+CACHED_SER_TIERS = [
+    {"name": "ser-cached-hop1s", "hop_seconds": 1.0, "feature_cache": True, "cost": 0.85},
+    {"name": "ser-hop1s", "hop_seconds": 1.0, "feature_cache": False, "cost": 1.0},
+    {"name": "ser-cached-hop0.5s", "hop_seconds": 0.5, "feature_cache": True, "cost": 1.7},
+]
+
+class TierController:
+    def __init__(self, tiers, slo_seconds=1.0, start_tier=0, short_seconds=2.0, smoothing=0.3,
+                 upgrade_headroom=0.6, cooldown_seconds=10.0, name="tiers"):
+        """
+        Picks a model tier for one pipeline stage from its measured real-time factor and backlog,
+        so latency stays within an SLO on a shared CPU box without restarting anything.
+        - tiers: list of dicts ordered cheapest first (e.g. STT_TIERS, SER_TIERS)
+        - slo_seconds: target latency of one job (compute + waiting behind the backlog)
+        - short_seconds: jobs shorter than this always use the cheapest tier
+        - smoothing: EWMA weight of the newest RTF / length measurement
+        - upgrade_headroom: move up only if the next tier is predicted below slo x headroom
+        - cooldown_seconds: minimum time between two tier switches (hysteresis)
+        """
+        self.tiers = tiers
+        self.slo_seconds = slo_seconds
+        self.short_seconds = short_seconds
+        self.smoothing = smoothing
+        self.upgrade_headroom = upgrade_headroom
+        self.cooldown_seconds = cooldown_seconds
+        self.name = name
+
+        self.current = min(max(0, start_tier), len(tiers) - 1)
+        self.rtf = [None] * len(tiers)
+        self.typical_seconds = None
+        self.backlog = 0
+        self.switches = 0
+        self._last_switch = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def tier(self):
+        return self.tiers[self.current]
+
+    def select(self, audio_seconds):
+        """Tier index for a job of audio_seconds: the cheapest for short jobs, otherwise the current tier."""
+        if audio_seconds < self.short_seconds:
+            return 0
+        return self.current
+
+    def record(self, tier_index, compute_seconds, audio_seconds, backlog=0):
+        """Feeds one measurement back and switches tier if the SLO demands (or allows) it."""
+        if audio_seconds <= 0:
+            return
+        with self._lock:
+            rtf = compute_seconds / audio_seconds
+            previous = self.rtf[tier_index]
+            self.rtf[tier_index] = rtf if previous is None else previous + self.smoothing * (rtf - previous)
+            if previous:
+                # Host load affects every tier alike: carry the change over to the tiers not in use,
+                # so a stale measurement from a busy period does not block moving back up later
+                scale = self.rtf[tier_index] / previous
+                for i, other in enumerate(self.rtf):
+                    if i != tier_index and other is not None:
+                        self.rtf[i] = other * scale
+            if self.typical_seconds is None:
+                self.typical_seconds = audio_seconds
+            else:
+                self.typical_seconds += self.smoothing * (audio_seconds - self.typical_seconds)
+            self.backlog = backlog
+            self._decide()
+
+    def predicted_latency(self, tier_index):
+        """Expected latency of a typical job on the given tier, including the jobs queued ahead of it."""
+        rtf = self.rtf[tier_index]
+        if rtf is None:
+            # Not measured yet: scale the closest measured tier by the relative cost
+            measured = [i for i, r in enumerate(self.rtf) if r is not None]
+            if not measured or self.typical_seconds is None:
+                return None
+            ref = min(measured, key=lambda i: abs(i - tier_index))
+            rtf = self.rtf[ref] * self.tiers[tier_index]["cost"] / self.tiers[ref]["cost"]
+        return rtf * self.typical_seconds * (1 + self.backlog)
+
+    def _decide(self):
+        now = time.monotonic()
+        if now - self._last_switch < self.cooldown_seconds:
+            return
+
+        latency = self.predicted_latency(self.current)
+        if latency is None:
+            return
+        if latency > self.slo_seconds and self.current > 0:
+            self._switch(self.current - 1, latency, now)
+        elif self.current + 1 < len(self.tiers) and self.backlog == 0:
+            upgraded = self.predicted_latency(self.current + 1)
+            if upgraded is not None and upgraded < self.slo_seconds * self.upgrade_headroom:
+                self._switch(self.current + 1, latency, now)
+
+    def _switch(self, index, latency, now):
+        log.info("[Tiers] %s: %s -> %s (predicted latency %.2fs, SLO %.2fs, backlog %d)", self.name,
+                 self.tier["name"], self.tiers[index]["name"], latency, self.slo_seconds, self.backlog)
+        self.current = index
+        self.switches += 1
+        self._last_switch = now
+
+    def stats(self):
+        return {
+            "tier": self.tier["name"],
+            "switches": self.switches,
+            "rtf": {t["name"]: round(r, 3) for t, r in zip(self.tiers, self.rtf) if r is not None},
+            "backlog": self.backlog,
+        }
@@ -0,0 +1,37 @@
+import re
+
+_PUNCT = re.compile(r"[^\w']+")
+
+def normalize_word(word):
+    """Lower-cases a word and strips punctuation so hypotheses can be compared token by token."""
+    return _PUNCT.sub("", word.lower())
+
+def common_prefix_length(words_a, words_b):
+    """Number of leading words two hypotheses agree on (ignoring case and punctuation)."""
+    n = 0
+    for a, b in zip(words_a, words_b):
+        if normalize_word(a) != normalize_word(b):
+            break
+        n += 1
+    return n
+
+def stitch_transcripts(previous, current, max_overlap_words=8):
+    """
+    Joins the text of two consecutive, overlapping audio segments. The longest run of words that
+    ends `previous` and also starts `current` (up to max_overlap_words) was heard twice and is kept once.
+    """
+    prev_words = previous.split()
+    cur_words = current.split()
+    if not prev_words:
+        return current.strip()
+    if not cur_words:
+        return previous.strip()
+
+    prev_norm = [normalize_word(w) for w in prev_words[-max_overlap_words:]]
+    cur_norm = [normalize_word(w) for w in cur_words[:max_overlap_words]]
+    overlap = 0
+    for k in range(min(len(prev_norm), len(cur_norm)), 0, -1):
+        if prev_norm[-k:] == cur_norm[:k]:
+            overlap = k
+            break
+    return " ".join(prev_words + cur_words[overlap:])
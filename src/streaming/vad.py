@@ -0,0 +1,114 @@
+import numpy as np
+
+class VoiceActivityDetector:
+    def __init__(self, sample_rate=16000, frame_ms=20, hangover_ms=300):
+        """
+        Frame-level voice activity detector interface.
+        Subclasses implement _raw_decisions(frames) -> bool array (one per frame); this base class handles
+        framing across chunk boundaries and hangover (speech stays "on" for hangover_ms after the last
+        speech frame so short gaps between words do not end an utterance).
+        - frame_ms: 10-30 ms analysis frames
+        - hangover_ms: how long a speech decision is held after the detector drops
+        """
+        self.sample_rate = sample_rate
+        self.frame_samples = int(sample_rate * frame_ms / 1000)
+        self.hangover_frames = int(round(hangover_ms / frame_ms))
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._frames_since_speech = self.hangover_frames + 1
+        self.last_raw_speech_frames = 0
+
+    def _raw_decisions(self, frames):
+        raise NotImplementedError
+
+    def process(self, samples):
+        """
+        Consumes a chunk of float32 samples and returns per-frame speech decisions (with hangover).
+        Samples that do not fill a whole frame are carried over to the next call.
+        last_raw_speech_frames holds the number of frames detected as speech before hangover.
+        """
+        self.last_raw_speech_frames = 0
+        if len(self._remainder):
+            samples = np.concatenate((self._remainder, samples))
+        n_frames = len(samples) // self.frame_samples
+        used = n_frames * self.frame_samples
+        self._remainder = np.array(samples[used:], dtype=np.float32)
+        if n_frames == 0:
+            return np.zeros(0, dtype=bool)
+
+        frames = samples[:used].reshape(n_frames, self.frame_samples)
+        raw = self._raw_decisions(frames)
+        self.last_raw_speech_frames = int(np.count_nonzero(raw))
+
+        # Hangover, vectorized: distance from each frame back to the most recent raw speech frame
+        idx = np.arange(n_frames)
+        last_speech = np.where(raw, idx, -1)
+        np.maximum.accumulate(last_speech, out=last_speech)
+        since = np.where(last_speech >= 0, idx - last_speech, idx + self._frames_since_speech + 1)
+        decisions = since <= self.hangover_frames
+
+        self._frames_since_speech = int(since[-1])
+        return decisions
+
+    def reset(self):
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._frames_since_speech = self.hangover_frames + 1
+
+
+class EnergyVAD(VoiceActivityDetector):
+    def __init__(self, sample_rate=16000, frame_ms=20, hangover_ms=300, min_threshold=0.01,
+                 noise_ratio=3.0, floor_adaptation=0.05):
+        """
+        Fast built-in detector: per-frame RMS against an adaptive noise floor.
+        - min_threshold: absolute RMS below which a frame is never speech (the old silence_threshold)
+        - noise_ratio: a frame is speech when its RMS exceeds noise_ratio x the noise floor
+        - floor_adaptation: how quickly the floor rises towards a louder background (per chunk, 0..1)
+        Steady fans / HVAC raise the floor instead of triggering decodes; quiet speakers in a quiet
+        room are still caught because the threshold drops towards min_threshold.
+        """
+        super().__init__(sample_rate=sample_rate, frame_ms=frame_ms, hangover_ms=hangover_ms)
+        self.min_threshold = min_threshold
+        self.noise_ratio = noise_ratio
+        self.floor_adaptation = floor_adaptation
+        self.noise_floor = None
+
+    @property
+    def threshold(self):
+        if self.noise_floor is None:
+            return self.min_threshold
+        return max(self.min_threshold, self.noise_ratio * self.noise_floor)
+
+    def _raw_decisions(self, frames):
+        rms = np.sqrt(np.einsum("ij,ij->i", frames, frames) / frames.shape[1])
+        if self.noise_floor is None:
+            self.noise_floor = float(np.min(rms))
+
+        raw = rms >= self.threshold
+
+        # The quietest frame of the chunk tracks the floor: gaps between syllables bring it down
+        # within speech, so only sustained noise raises it. Falls quickly, rises slowly.
+        level = float(np.min(rms))
+        rate = 0.5 if level < self.noise_floor else self.floor_adaptation
+        self.noise_floor += rate * (level - self.noise_floor)
+        return raw
+
+    def reset(self):
+        super().reset()
+        self.noise_floor = None
+
+
+class WebRtcVAD(VoiceActivityDetector):
+    def __init__(self, sample_rate=16000, frame_ms=20, hangover_ms=300, aggressiveness=2):
+        """
+        Model-based detector backed by the optional `webrtcvad` package (pip install webrtcvad).
+        frame_ms must be 10, 20 or 30.
+        """
+        super().__init__(sample_rate=sample_rate, frame_ms=frame_ms, hangover_ms=hangover_ms)
+        try:
+            import webrtcvad
+        except ImportError as e:
+            raise ImportError("WebRtcVAD requires the 'webrtcvad' package: pip install webrtcvad") from e
+        self._vad = webrtcvad.Vad(aggressiveness)
+
+    def _raw_decisions(self, frames):
+        pcm = (np.clip(frames, -1.0, 1.0) * 32767).astype(np.int16)
+        return np.array([self._vad.is_speech(f.tobytes(), self.sample_rate) for f in pcm], dtype=bool)
@@ -0,0 +1,157 @@
+import os
+import sys
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from faster_whisper import WhisperModel
+
+# Ensure project root is in python path
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from src.ser.recorder import SILENCE_RMS, frame_rms, open_trimmed_audio, to_float_mono
+from src.streaming.resample import PolyphaseResampler
+
+MODEL_DIR = os.path.join(PROJECT_ROOT, "external", "faster-whisper")
+
+# Global cache so entry points that run repeatedly (Option 2 / 3) load the model only once
+_transcribers = {}
+
+def split_at_silences(audio, fs=16000, max_chunk_seconds=30.0, search_seconds=5.0, frame_duration=0.03):
+    """
+    Splits a long clip (mono or (time, channels), float or int16) into chunks of at most max_chunk_seconds,
+    each cut placed at the quietest frame within the last search_seconds of the chunk (a pause between words).
+    Chunks that contain no frame above the speech threshold are left out.
+
+    Returns:
+        list[(int, int)]: (start, end) sample indices.
+    """
+    frame = max(1, int(fs * frame_duration))
+    rms = frame_rms(audio, frame)
+    n_frames = len(rms)
+    if n_frames == 0:
+        return [(0, len(audio))] if len(audio) else []
+
+    max_frames = max(1, int(max_chunk_seconds / frame_duration))
+    search_frames = min(max_frames - 1, int(search_seconds / frame_duration))
+
+    cuts = [0]
+    while n_frames - cuts[-1] > max_frames:
+        lo = cuts[-1] + max_frames - search_frames
+        hi = cuts[-1] + max_frames
+        cuts.append(lo + int(np.argmin(rms[lo:hi])))
+    cuts.append(n_frames)
+
+    threshold = max(SILENCE_RMS, 3.0 * float(np.percentile(rms, 10)))
+    chunks = []
+    for a, b in zip(cuts[:-1], cuts[1:]):
+        if rms[a:b].max() >= threshold:
+            end = len(audio) if b == n_frames else b * frame
+            chunks.append((a * frame, end))
+    return chunks
+
+class BatchTranscriber:
+    def __init__(self, model_size="base", compute_type="int8", workers=None, max_chunk_seconds=30.0,
+                 beam_size=5, download_root=MODEL_DIR):
+        """
+        Offline transcription of recorded files with faster-whisper (CTranslate2, int8 on CPU).
+        Long recordings are split at silences and the chunks are decoded concurrently.
+        - workers: parallel decodes (default: half the cores, at most 4); CPU threads are divided between them
+        - max_chunk_seconds: upper bound per chunk; 30 s matches Whisper's native window
+        """
+        cores = os.cpu_count() or 1
+        self.workers = workers or max(1, min(4, cores // 2))
+        self.max_chunk_seconds = max_chunk_seconds
+        self.beam_size = beam_size
+        self.sample_rate = 16000
+
+        if download_root and not os.path.exists(download_root):
+            os.makedirs(download_root)
+        print(f"🧠 Loading faster-whisper '{model_size}' ({compute_type}, {self.workers} workers)...")
+        self.model = WhisperModel(model_size, device="cpu", compute_type=compute_type,
+                                  cpu_threads=max(1, cores // self.workers), num_workers=self.workers,
+                                  download_root=download_root)
+
+    def _decode_chunk(self, audio, offset, language):
+        """Returns ([{start, end, text}] with times in seconds from `offset`, detected language)."""
+        segments, info = self.model.transcribe(audio, language=language, beam_size=self.beam_size,
+                                               vad_filter=False, condition_on_previous_text=False)
+        # Decoding is lazy: consume the generator here so the work happens on this worker
+        kept = [{"start": offset + s.start, "end": offset + s.end, "text": s.text.strip()}
+                for s in segments if s.no_speech_prob < 0.60 and s.text.strip()]
+        return kept, info.language
+
+    def transcribe(self, audio, language=None, offset=0.0, fs=16000):
+        """
+        Transcribes an int16/float (time,) or (time, channels) array sampled at fs; a memmap is fine; only
+        the silence-split chunk being decoded is converted to 16 kHz float32 mono. offset (seconds) is added
+        to every timestamp, e.g. where a trimmed clip starts in the original recording.
+
+        Returns:
+            dict: text, language, segments [{start, end, text}] (Whisper segments, seconds),
+                  chunks [{start, end, text}] (decoded pieces), audio_seconds, decode_seconds, rtf
+        """
+        start_time = time.perf_counter()
+        bounds = split_at_silences(audio, fs, max_chunk_seconds=self.max_chunk_seconds)
+
+        def decode(bound):
+            # Chunks are cut at silences, so each is resampled on its own
+            chunk = to_float_mono(audio[bound[0]:bound[1]])
+            if fs != self.sample_rate:
+                chunk = PolyphaseResampler(fs, self.sample_rate).process(chunk).copy()
+            return self._decode_chunk(chunk, offset + bound[0] / fs, language)
+
+        chunk_segments = []
+        if bounds:
+            # The first chunk settles the language so the others decode with it pinned (and consistently)
+            first_segments, detected = decode(bounds[0])
+            language = language or detected
+            chunk_segments.append(first_segments)
+            if len(bounds) > 1:
+                with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                    chunk_segments += [segs for segs, _ in pool.map(decode, bounds[1:])]
+        texts = [" ".join(seg["text"] for seg in segs) for segs in chunk_segments]
+
+        decode_seconds = time.perf_counter() - start_time
+        audio_seconds = len(audio) / fs
+        return {
+            "text": " ".join(t for t in texts if t).strip(),
+            "language": language,
+            "segments": [seg for segs in chunk_segments for seg in segs],
+            "chunks": [{"start": offset + a / fs, "end": offset + b / fs, "text": t}
+                       for (a, b), t in zip(bounds, texts)],
+            "audio_seconds": audio_seconds,
+            "decode_seconds": decode_seconds,
+            "rtf": decode_seconds / audio_seconds if audio_seconds else 0.0,
+        }
+
+    def transcribe_file(self, wav_path, language=None):
+        """Trims leading/trailing silence from a WAV (memory-mapped) and transcribes it chunk by chunk."""
+        audio, fs, offset = open_trimmed_audio(wav_path)
+        return self.transcribe(audio, language=language, offset=offset, fs=fs)
+
+def get_batch_transcriber(model_size="base", compute_type="int8"):
+    key = (model_size, compute_type)
+    if key not in _transcribers:
+        _transcribers[key] = BatchTranscriber(model_size=model_size, compute_type=compute_type)
+    return _transcribers[key]
+
+def print_transcription_stats(result):
+    print(f"⚡ Transcribed {result['audio_seconds']:.1f}s of audio in {result['decode_seconds']:.1f}s "
+          f"(RTF {result['rtf']:.2f}, {len(result['chunks'])} chunk(s))")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Transcribe a recording with parallel chunked faster-whisper.")
+    parser.add_argument("wav", help="Recorded audio file")
+    parser.add_argument("--model", default="base", help="faster-whisper model size (default: base)")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel decodes (default: half the cores, max 4)")
+    args = parser.parse_args()
+
+    transcriber = BatchTranscriber(model_size=args.model, workers=args.workers)
+    result = transcriber.transcribe_file(args.wav)
+    print_transcription_stats(result)
+    print(f"📝 [{result['language']}] {result['text']}")
@@ -1,8 +1,5 @@
 import os
-import time
 import datetime
-import sounddevice as sd
-from scipy.io.wavfile import write
 import whisper
 import sys
 # Ensure project root is in python path
@@ -11,6 +8,8 @@ PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", ".."))
 if PROJECT_ROOT not in sys.path:
     sys.path.append(PROJECT_ROOT)
 
+from src.ser.recorder import record_until_silence, load_trimmed_audio
+
 try:
     from src.text_emotion.analysis import analyze_text_emotion
 except ImportError:
@@ -29,8 +28,9 @@ def stt_pipeline():
     # CONFIGURATION
     # ----------------------------
     fs = 16000                # Sample rate
-    total_seconds = 10        # Total listening time
-    countdown_seconds = 3     # Countdown before mic closes
+    min_seconds = 2           # Never close the mic before this
+    max_seconds = 15          # Hard limit on listening time
+    trailing_silence = 1.5    # Seconds of silence after speech that close the mic
 
     # ----------------------------
     # GENERATE TIMESTAMPED FILENAME
@@ -49,35 +49,26 @@ def stt_pipeline():
     # STEP 1: START RECORDING
     # ----------------------------
     print("🎤 Mic is OPEN")
-    print("👉 Speak now...")
-
-    audio = sd.rec(
-        int(total_seconds * fs),
-        samplerate=fs,
-        channels=1,
-        dtype="float32"
-    )
+    print("👉 Speak now... (the mic closes once you stop talking)")
 
     # ----------------------------
-    # STEP 2: COUNTDOWN
+    # STEP 2: RECORD UNTIL SPEECH ENDS
     # ----------------------------
-    time.sleep(total_seconds - countdown_seconds)
-
-    for i in range(countdown_seconds, 0, -1):
-        print(f"⏳ Mic closing in {i}...")
-        time.sleep(1)
-
-    sd.wait()  # Ensure recording is complete
-
-    write(audio_file, fs, audio)
+    record_until_silence(
+        filename=audio_file,
+        fs=fs,
+        min_duration=min_seconds,
+        max_duration=max_seconds,
+        trailing_silence=trailing_silence
+    )
 
     print("🔇 Mic CLOSED")
     print(f"✅ Audio saved as: {audio_file}")
 
     # ----------------------------
-    # STEP 3: WAIT BEFORE TRANSCRIPTION
+    # STEP 3: TRIM SILENCE BEFORE TRANSCRIPTION
     # ----------------------------
-    time.sleep(2)
+    audio, _, offset = load_trimmed_audio(audio_file)
 
     # ----------------------------
     # STEP 4: TRANSCRIBE
@@ -88,8 +79,8 @@ def stt_pipeline():
         os.makedirs(model_dir)
     model = whisper.load_model("base", download_root=model_dir)
 
-    print("📖 Transcribing audio...")
-    result = model.transcribe(audio_file)
+    print(f"📖 Transcribing {len(audio) / fs:.1f}s of speech...")
+    result = model.transcribe(audio)
 
     # ----------------------------
     # STEP 5: OUTPUT REPORT
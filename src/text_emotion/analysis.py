@@ -63,6 +63,67 @@ def analyze_text_emotion(text, threshold=0.1):
         print(f"❌ Error analyzing text emotion: {e}")
         return []
 
+def analyze_text_emotion_batch(texts, threshold=0.1, batch_size=16):
+    """
+    Batched version of analyze_text_emotion: one pipeline call for many short texts
+    (e.g. transcript segments) instead of one long sequence or one call per text.
+    Returns one list of {'label', 'score'} dicts per input text, in order.
+    """
+    outputs = [[] for _ in texts]
+    indices = [i for i, t in enumerate(texts) if t and t.strip()]
+    if not indices:
+        return outputs
+
+    pipe = load_emotion_model()
+    if pipe is None:
+        return outputs
+
+    try:
+        results = pipe([texts[i] for i in indices], batch_size=batch_size, truncation=True)
+        for i, predictions in zip(indices, results):
+            filtered = [{'label': p['label'], 'score': p['score']} for p in predictions if p['score'] > threshold]
+            filtered.sort(key=lambda x: x['score'], reverse=True)
+            outputs[i] = filtered
+    except Exception as e:
+        print(f"❌ Error analyzing text emotion batch: {e}")
+    return outputs
+
+def text_emotion_timeline(segments, threshold=0.1):
+    """
+    Text emotion per timestamped transcript segment ({'start', 'end', 'text'}), run as one batch.
+
+    Returns:
+        (list, str): Overall emotions (duration-weighted mean over segments, same format as
+        analyze_text_emotion) and a timeline in the face timeline format ("0.00s – 3.20s : joy"),
+        with consecutive segments of the same dominant emotion merged.
+    """
+    if not segments:
+        return [], ""
+
+    per_segment = analyze_text_emotion_batch([seg["text"] for seg in segments], threshold=0.0)
+
+    totals = {}
+    total_duration = 0.0
+    timeline = []
+    for seg, emotions in zip(segments, per_segment):
+        duration = max(seg["end"] - seg["start"], 1e-3)
+        total_duration += duration
+        for e in emotions:
+            totals[e['label']] = totals.get(e['label'], 0.0) + e['score'] * duration
+
+        label = emotions[0]['label'] if emotions else "neutral"
+        if timeline and timeline[-1][2] == label:
+            timeline[-1][1] = seg["end"]
+        else:
+            timeline.append([seg["start"], seg["end"], label])
+
+    overall = [{'label': label, 'score': score / total_duration}
+               for label, score in totals.items() if score / total_duration > threshold]
+    overall.sort(key=lambda x: x['score'], reverse=True)
+
+    timeline_str = "".join(f"{start:.2f}s – {end:.2f}s : {label}\n" for start, end, label in timeline)
+    return overall, timeline_str
+
 if __name__ == "__main__":
     # Test
     sample_text = "I am so happy that this is working!"
@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from src.ser.emotion_aggregate import SER_LABELS, aggregate_emotions, empty_voice_state
+
+def reference_aggregate(probs, energy_score=1.0):
+    """The per-window Peak + Average loop StreamingSER ran before aggregate_emotions was vectorized."""
+    idx_to_label = dict(enumerate(SER_LABELS))
+
+    avg_probs = probs.mean(axis=0)
+    avg_top_indices = np.argsort(-avg_probs, kind="stable")[:2]
+    avg_top_probs = avg_probs[avg_top_indices]
+    avg_emotion = idx_to_label[int(avg_top_indices[0])]
+    avg_conf = float(avg_top_probs[0])
+    if avg_emotion == 'Neutral' and avg_conf < 0.60:
+        sec_emotion = idx_to_label[int(avg_top_indices[1])]
+        if sec_emotion != 'Neutral':
+            avg_emotion = sec_emotion
+            avg_conf = float(avg_top_probs[1])
+
+    peak_emotion = avg_emotion
+    peak_conf = 0.0
+    for window in probs:
+        top_idx = np.argsort(-window, kind="stable")[:2]
+        top_p = window[top_idx]
+        em = idx_to_label[int(top_idx[0])]
+        conf = float(top_p[0])
+        if em != 'Neutral' and conf > peak_conf:
+            peak_emotion = em
+            peak_conf = conf
+        elif em == 'Neutral' and conf < 0.60:
+            sec_em = idx_to_label[int(top_idx[1])]
+            if sec_em != 'Neutral' and float(top_p[1]) > peak_conf:
+                peak_emotion = sec_em
+                peak_conf = float(top_p[1])
+    if peak_conf == 0.0:
+        peak_emotion = avg_emotion
+        peak_conf = avg_conf
+
+    final_emotion = peak_emotion
+    final_conf = (0.6 * avg_conf) + (0.4 * peak_conf)
+    if peak_emotion != avg_emotion:
+        if avg_emotion == 'Neutral' and peak_conf > 0.5:
+            final_emotion = peak_emotion
+            final_conf = peak_conf * 0.9
+        else:
+            final_emotion = avg_emotion
+            final_conf = avg_conf
+
+    spread_score = min(1.0, float(avg_top_probs[0] - avg_top_probs[1]) * 2.0)
+    return {
+        "source": "voice",
+        "emotion": final_emotion,
+        "confidence": final_conf,
+        "average_emotion": avg_emotion,
+        "peak_emotion": peak_emotion,
+        "reliability": (0.5 * energy_score) + (0.5 * spread_score),
+    }
+
+def assert_same_state(actual, expected):
+    for key in ("source", "emotion", "average_emotion", "peak_emotion"):
+        assert actual[key] == expected[key], key
+    for key in ("confidence", "reliability"):
+        assert actual[key] == pytest.approx(expected[key], abs=1e-6), key
+
+CASES = {
+    # Two different non-neutral emotions: the average wins over the peak
+    "conflicting_emotions": [[0.7, 0.1, 0.1, 0.1], [0.1, 0.55, 0.3, 0.05], [0.2, 0.6, 0.1, 0.1]],
+    # Weak Neutral windows offer their runner-up as the peak
+    "weak_neutral_windows": [[0.1, 0.3, 0.5, 0.1], [0.05, 0.1, 0.55, 0.3], [0.02, 0.02, 0.9, 0.06]],
+    # A weak peak (< 0.5) does not override a Neutral average
+    "weak_peak_under_neutral": [[0.02, 0.03, 0.93, 0.02], [0.45, 0.05, 0.1, 0.4], [0.03, 0.02, 0.92, 0.03]],
+    # Flat distributions: low spread, low reliability
+    "flat": [[0.26, 0.25, 0.24, 0.25], [0.25, 0.26, 0.25, 0.24]],
+}
+
+@pytest.mark.parametrize("name", sorted(CASES))
+@pytest.mark.parametrize("energy_score", [0.0, 0.6])
+def test_matches_per_window_loop(name, energy_score):
+    probs = np.array(CASES[name], dtype=np.float32)
+    assert_same_state(aggregate_emotions(probs, energy_score), reference_aggregate(probs, energy_score))
+
+def test_matches_per_window_loop_on_long_random_utterance():
+    rng = np.random.default_rng(0)
+    logits = rng.normal(scale=2.0, size=(200, len(SER_LABELS)))
+    logits[:, 2] += 1.0
+    probs = np.exp(logits)
+    probs = (probs / probs.sum(axis=1, keepdims=True)).astype(np.float32)
+    assert_same_state(aggregate_emotions(probs, 0.8), reference_aggregate(probs, 0.8))
+
+def test_single_window():
+    probs = np.array([[0.1, 0.7, 0.15, 0.05]], dtype=np.float32)
+    state = aggregate_emotions(probs)
+    assert state["emotion"] == "Happy"
+    assert_same_state(state, reference_aggregate(probs))
+
+def test_weak_neutral_yields_to_runner_up():
+    probs = np.array([[0.05, 0.05, 0.5, 0.4]], dtype=np.float32)
+    state = aggregate_emotions(probs)
+    assert state["average_emotion"] == "Sad"
+    assert_same_state(state, reference_aggregate(probs))
+
+def test_strong_peak_beats_neutral_average():
+    probs = np.array([[0.02, 0.02, 0.94, 0.02]] * 4 + [[0.9, 0.04, 0.03, 0.03]], dtype=np.float32)
+    state = aggregate_emotions(probs)
+    assert (state["average_emotion"], state["peak_emotion"], state["emotion"]) == ("Neutral", "Angry", "Angry")
+    assert state["confidence"] == pytest.approx(0.9 * 0.9)
+    assert_same_state(state, reference_aggregate(probs))
+
+def test_confident_neutral_only():
+    probs = np.array([[0.02, 0.02, 0.94, 0.02]] * 3, dtype=np.float32)
+    assert_same_state(aggregate_emotions(probs), reference_aggregate(probs))
+    assert aggregate_emotions(probs)["emotion"] == "Neutral"
+
+def test_empty_input():
+    assert aggregate_emotions(np.zeros((0, len(SER_LABELS)))) == empty_voice_state()
+
+def test_label_order_follows_classifier():
+    # Same windows with the classes in another output order (as a differently built label encoder would give)
+    probs = np.array([[0.02, 0.02, 0.94, 0.02]] * 4 + [[0.9, 0.04, 0.03, 0.03]], dtype=np.float32)
+    order = [3, 2, 0, 1]
+    state = aggregate_emotions(probs[:, order], labels=SER_LABELS[order])
+    assert state == aggregate_emotions(probs)
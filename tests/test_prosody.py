@@ -0,0 +1,17 @@
+import numpy as np
+
+from src.ser.prosody import FEATURE_NAMES, prosodic_features
+
+def test_shorter_than_one_frame_gives_zero_rows():
+    assert np.array_equal(prosodic_features(np.zeros(100)), np.zeros((1, len(FEATURE_NAMES)), dtype=np.float32))
+    assert prosodic_features(np.zeros((3, 399))).shape == (3, len(FEATURE_NAMES))
+
+def test_single_frame_window():
+    assert prosodic_features(np.zeros((2, 400))).shape == (2, len(FEATURE_NAMES))
+
+def test_voiced_tone_pitch():
+    t = np.arange(16000) / 16000
+    features = dict(zip(FEATURE_NAMES, prosodic_features(0.1 * np.sin(2 * np.pi * 200.0 * t))[0]))
+    # 200 Hz is 12 semitones above the 100 Hz reference
+    assert features["voiced_ratio"] > 0.9
+    assert abs(features["f0_mean_st"] - 12.0) < 0.5
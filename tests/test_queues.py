@@ -0,0 +1,72 @@
+import queue
+import time
+
+import pytest
+
+from src.streaming.queues import BLOCK, COALESCE, DROP_NEWEST, DROP_OLDEST, MonitoredQueue
+
+def drain(q):
+    items = []
+    while True:
+        try:
+            items.append(q.get_nowait())
+        except queue.Empty:
+            return items
+
+def test_drop_newest_rejects_incoming():
+    q = MonitoredQueue(maxsize=2, policy=DROP_NEWEST)
+    assert [q.offer(i) for i in range(4)] == [True, True, False, False]
+    assert drain(q) == [0, 1]
+    assert q.stats()["dropped"] == 2
+
+def test_drop_oldest_evicts_queued():
+    q = MonitoredQueue(maxsize=2, policy=DROP_OLDEST)
+    for i in range(5):
+        q.put(i)
+    assert drain(q) == [3, 4]
+    assert q.dropped == 3
+    assert q.high_watermark == 2
+
+def test_coalesce_keeps_latest_only():
+    q = MonitoredQueue(maxsize=0, policy=COALESCE)
+    for i in range(3):
+        q.put(i)
+    assert drain(q) == [2]
+    assert q.dropped == 2
+
+def test_block_drops_after_timeout():
+    q = MonitoredQueue(maxsize=1, policy=BLOCK, block_timeout=0.01)
+    assert q.offer("a")
+    assert not q.offer("b")
+    assert drain(q) == ["a"]
+    assert q.dropped == 1
+
+def test_block_put_nowait_never_waits():
+    q = MonitoredQueue(maxsize=1, policy=BLOCK, block_timeout=5.0)
+    q.put("a")
+    start = time.perf_counter()
+    assert not q.offer("b", block=False)
+    q.put_nowait("c")
+    q.put("d", block=False)
+    assert time.perf_counter() - start < 1.0
+    assert q.dropped == 3
+
+def test_block_caller_timeout_overrides_default():
+    q = MonitoredQueue(maxsize=1, policy=BLOCK, block_timeout=5.0)
+    q.put("a")
+    start = time.perf_counter()
+    q.put("b", timeout=0.01)
+    assert time.perf_counter() - start < 1.0
+    assert drain(q) == ["a"]
+
+def test_task_done_accounting_survives_drops():
+    q = MonitoredQueue(maxsize=1, policy=DROP_OLDEST)
+    q.put(1)
+    q.put(2)
+    q.get()
+    q.task_done()
+    q.join()  # Returns immediately: the evicted item is not left unfinished
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        MonitoredQueue(policy="spill")
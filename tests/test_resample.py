@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from src.streaming.resample import PolyphaseResampler
+
+def resample_in_blocks(audio, in_rate, block_sizes, channels=1):
+    resampler = PolyphaseResampler(in_rate, 16000, channels=channels)
+    out, start = [], 0
+    for size in block_sizes:
+        out.append(resampler.process(audio[start:start + size]).copy())
+        start += size
+    return np.concatenate(out)
+
+@pytest.mark.parametrize("in_rate", [44100, 48000, 22050])
+def test_output_does_not_depend_on_block_size(in_rate):
+    rng = np.random.default_rng(0)
+    audio = rng.standard_normal(in_rate).astype(np.float32) * 0.1
+    whole = resample_in_blocks(audio, in_rate, [len(audio)])
+    sizes = rng.integers(1, 2000, size=2000)
+    sizes = sizes[:np.searchsorted(np.cumsum(sizes), len(audio))]
+    chunked = resample_in_blocks(audio, in_rate, list(sizes) + [len(audio) - int(sizes.sum())])
+    assert len(chunked) == len(whole)
+    np.testing.assert_allclose(chunked, whole, atol=1e-5)
+
+def test_output_rate_and_tone():
+    in_rate = 48000
+    t = np.arange(in_rate) / in_rate
+    out = resample_in_blocks(np.sin(2 * np.pi * 440 * t).astype(np.float32), in_rate, [4800] * 10)
+    assert abs(len(out) - 16000) <= 1
+    spectrum = np.abs(np.fft.rfft(out[1000:]))
+    assert np.fft.rfftfreq(len(out) - 1000, 1 / 16000)[np.argmax(spectrum)] == pytest.approx(440, abs=2)
+
+def test_stereo_is_downmixed():
+    in_rate = 32000
+    left = np.random.default_rng(1).standard_normal(3200).astype(np.float32) * 0.1
+    stereo = np.stack([left, -left], axis=1)
+    out = resample_in_blocks(stereo, in_rate, [800] * 4, channels=2)
+    np.testing.assert_allclose(out, 0.0, atol=1e-6)
+
+def test_passthrough_at_target_rate():
+    audio = np.arange(10, dtype=np.float32)
+    np.testing.assert_array_equal(PolyphaseResampler(16000, 16000).process(audio), audio)
@@ -0,0 +1,49 @@
+import queue
+
+import numpy as np
+import pytest
+
+from src.streaming.queues import COALESCE, DROP_NEWEST, DROP_OLDEST
+from src.streaming.ring_buffer import AudioRingBuffer
+
+def write_blocks(ring, count, start=0):
+    for i in range(start, start + count):
+        ring.write(np.full(4, i, dtype=np.float32))
+
+def test_ring_readers_are_independent():
+    ring = AudioRingBuffer(slot_size=4, num_slots=8)
+    first, second = ring.reader(), ring.reader()
+    write_blocks(ring, 3)
+    assert [first.get(timeout=0).seq for _ in range(3)] == [0, 1, 2]
+    assert second.get(timeout=0).samples[0] == 0.0
+    assert second.qsize() == 2
+    with pytest.raises(queue.Empty):
+        first.get(timeout=0)
+
+def test_ring_drop_oldest_skips_to_max_lag():
+    ring = AudioRingBuffer(slot_size=4, num_slots=8)
+    reader = ring.reader(policy=DROP_OLDEST, max_lag=3)
+    write_blocks(ring, 7)
+    assert [reader.get(timeout=0).seq for _ in range(3)] == [4, 5, 6]
+    assert reader.stats()["dropped"] == 4
+
+def test_ring_coalesce_jumps_to_newest():
+    ring = AudioRingBuffer(slot_size=4, num_slots=8)
+    reader = ring.reader(policy=COALESCE, max_lag=2)
+    write_blocks(ring, 5)
+    chunk = reader.get(timeout=0)
+    assert chunk.seq == 4
+    assert np.all(chunk.samples == 4.0)
+    assert reader.overruns == 4
+
+def test_ring_lapped_reader_resumes_behind_writer():
+    ring = AudioRingBuffer(slot_size=4, num_slots=8)
+    reader = ring.reader()
+    write_blocks(ring, 20)
+    seqs = [reader.get(timeout=0).seq for _ in range(reader.qsize())]
+    assert seqs == list(range(14, 20))
+    assert reader.overruns == 14
+
+def test_ring_reader_rejects_blocking_policies():
+    with pytest.raises(ValueError):
+        AudioRingBuffer(slot_size=4).reader(policy=DROP_NEWEST)
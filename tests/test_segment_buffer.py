@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from src.streaming.segment_buffer import SegmentBuffer
+
+def test_append_grows_and_keeps_samples():
+    buffer = SegmentBuffer(initial_seconds=0.001, sample_rate=16000)
+    chunks = [np.full(7, i, dtype=np.float32) for i in range(10)]
+    for chunk in chunks:
+        buffer.append(chunk)
+    assert len(buffer) == 70
+    assert buffer.capacity >= 70
+    np.testing.assert_array_equal(buffer.as_float(), np.concatenate(chunks))
+
+def test_int16_storage_round_trips_within_quantization():
+    buffer = SegmentBuffer(sample_rate=16000, dtype=np.int16)
+    samples = np.linspace(-1.0, 1.0, 101, dtype=np.float32)
+    buffer.append(samples)
+    assert buffer.view().dtype == np.int16
+    np.testing.assert_allclose(buffer.as_float(), samples, atol=1.0 / 32768)
+
+def test_copy_float_survives_clear():
+    buffer = SegmentBuffer(sample_rate=16000)
+    buffer.append(np.ones(5, dtype=np.float32))
+    copy = buffer.copy_float()
+    buffer.clear()
+    buffer.append(np.zeros(5, dtype=np.float32))
+    np.testing.assert_array_equal(copy, np.ones(5))
+
+def test_quietest_point_and_drop_front():
+    buffer = SegmentBuffer(sample_rate=16000)
+    loud = np.full(40, 0.5, dtype=np.float32)
+    buffer.append(np.concatenate([loud, np.zeros(10, dtype=np.float32), loud]))
+    assert buffer.quietest_point(0, len(buffer), 10) == 40
+    buffer.drop_front(45)
+    assert len(buffer) == 45
+    np.testing.assert_array_equal(buffer.as_float(0, 5), np.zeros(5))
+
+def test_clear_releases_oversized_storage():
+    buffer = SegmentBuffer(initial_seconds=0.01, sample_rate=1000, max_retained_seconds=0.02)
+    buffer.append(np.zeros(100, dtype=np.float32))
+    buffer.clear()
+    assert len(buffer) == 0
+    assert buffer.capacity == 10
+
+def test_rejects_other_dtypes():
+    with pytest.raises(ValueError):
+        SegmentBuffer(dtype=np.float64)
@@ -0,0 +1,22 @@
+from src.streaming.transcript_utils import common_prefix_length, stitch_transcripts
+
+def test_overlap_is_kept_once():
+    assert stitch_transcripts("we should meet on", "meet on Friday at noon") == "we should meet on Friday at noon"
+
+def test_overlap_ignores_case_and_punctuation():
+    assert stitch_transcripts("I think, so.", "So we go") == "I think, so. we go"
+
+def test_no_overlap_joins_both():
+    assert stitch_transcripts("hello there", "how are you") == "hello there how are you"
+
+def test_empty_sides():
+    assert stitch_transcripts("", " next part ") == "next part"
+    assert stitch_transcripts(" first part ", "") == "first part"
+
+def test_overlap_longer_than_limit_is_not_removed():
+    words = "one two three four"
+    assert stitch_transcripts(words, words, max_overlap_words=3) == "one two three four one two three four"
+
+def test_common_prefix_length():
+    assert common_prefix_length("Hello, world again".split(), "hello world there".split()) == 2
+    assert common_prefix_length([], ["a"]) == 0
@@ -0,0 +1,48 @@
+import numpy as np
+
+from src.streaming.vad import EnergyVAD
+
+FS = 16000
+
+def noise(seconds, level, seed=0):
+    return (np.random.default_rng(seed).standard_normal(int(seconds * FS)) * level).astype(np.float32)
+
+def speech(seconds, level=0.1):
+    # 4 Hz syllable envelope with short gaps between syllables
+    t = np.arange(int(seconds * FS)) / FS
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0.0, None)
+    return (level * envelope * np.sin(2 * np.pi * 150 * t)).astype(np.float32)
+
+def run(vad, audio, chunk=1600):
+    return np.concatenate([vad.process(audio[i:i + chunk]) for i in range(0, len(audio), chunk)])
+
+def test_quiet_room_speech_is_detected():
+    vad = EnergyVAD()
+    decisions = run(vad, np.concatenate([noise(1.0, 0.001), speech(1.0)]))
+    frames = len(decisions) // 2
+    assert not decisions[:frames].any()
+    assert decisions[frames:].mean() > 0.9
+
+def test_steady_noise_raises_the_floor_instead_of_triggering():
+    vad = EnergyVAD()
+    decisions = run(vad, noise(5.0, 0.02))
+    assert decisions[-50:].sum() == 0
+    assert vad.threshold > vad.min_threshold
+
+def test_long_speech_stays_detected():
+    vad = EnergyVAD()
+    run(vad, noise(0.5, 0.001))
+    decisions = run(vad, speech(10.0))
+    assert decisions[-100:].mean() > 0.9
+
+def test_hangover_bridges_short_gaps():
+    vad = EnergyVAD(hangover_ms=300)
+    audio = np.concatenate([noise(0.5, 0.001), speech(0.5), np.zeros(int(0.05 * FS), np.float32), speech(0.5)])
+    decisions = run(vad, audio)
+    first_speech = np.argmax(decisions)
+    assert decisions[first_speech:].all()
+
+def test_partial_frames_carry_over():
+    vad = EnergyVAD(frame_ms=20)
+    assert len(vad.process(np.zeros(100, np.float32))) == 0
+    assert len(vad.process(np.zeros(300, np.float32))) == 1